@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.common.tracing import register_tracing
+
 
 class CodeGenRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -14,6 +16,7 @@ def success(data=None) -> dict:
 
 
 app = FastAPI(title="python-ai-mother-ai-service", version="0.1.0")
+register_tracing(app, "ai-service")
 
 
 @app.get("/health")
@@ -9,6 +9,8 @@ from fastapi import FastAPI, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.common.tracing import SPAN_KIND_CLIENT, inject_traceparent, register_tracing, start_span
+
 
 SESSION_COOKIE_NAME = "python_ai_mother_sid"
 USER_SERVICE_BASE_URL = os.getenv("USER_SERVICE_BASE_URL", "http://localhost:8201")
@@ -66,14 +68,20 @@ def sse_event(event: str, data: Any) -> str:
 
 
 async def call_get(base_url: str, path: str, params: dict[str, Any] | None = None) -> dict:
-    async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
-        response = await client.get(path, params=params)
+    with start_span(f"GET {path}", SPAN_KIND_CLIENT, {"server.address": base_url}):
+        headers: dict[str, str] = {}
+        inject_traceparent(headers)
+        async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
+            response = await client.get(path, params=params, headers=headers)
     return response.json()
 
 
 async def call_post(base_url: str, path: str, payload: dict[str, Any]) -> dict:
-    async with httpx.AsyncClient(base_url=base_url, timeout=15.0) as client:
-        response = await client.post(path, json=payload)
+    with start_span(f"POST {path}", SPAN_KIND_CLIENT, {"server.address": base_url}):
+        headers: dict[str, str] = {}
+        inject_traceparent(headers)
+        async with httpx.AsyncClient(base_url=base_url, timeout=15.0) as client:
+            response = await client.post(path, json=payload, headers=headers)
     return response.json()
 
 
@@ -104,6 +112,7 @@ def to_app_vo(app_row: dict[str, Any]) -> dict[str, Any]:
 
 
 app = FastAPI(title="python-ai-mother-app-service", version="0.1.0")
+register_tracing(app, "app-service")
 
 
 @app.get("/health")
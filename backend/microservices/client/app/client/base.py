@@ -4,6 +4,7 @@ import httpx
 
 from app.common.error_codes import ErrorCode
 from app.common.exceptions import BusinessException
+from app.common.tracing import SPAN_KIND_CLIENT, inject_traceparent, start_span
 
 
 class BaseServiceClient:
@@ -12,8 +13,11 @@ class BaseServiceClient:
         self.timeout = timeout
 
     async def _post_json(self, path: str, payload: dict[str, Any]) -> Any:
-        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout) as client:
-            response = await client.post(path, json=payload)
+        with start_span(f"POST {path}", SPAN_KIND_CLIENT, {"server.address": self.base_url}):
+            headers: dict[str, str] = {}
+            inject_traceparent(headers)
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout) as client:
+                response = await client.post(path, json=payload, headers=headers)
         if response.status_code != 200:
             raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Downstream HTTP error: {response.status_code}")
         body = response.json()
@@ -22,8 +26,11 @@ class BaseServiceClient:
         return body.get("data")
 
     async def _get_json(self, path: str, params: dict[str, Any] | None = None) -> Any:
-        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout) as client:
-            response = await client.get(path, params=params)
+        with start_span(f"GET {path}", SPAN_KIND_CLIENT, {"server.address": self.base_url}):
+            headers: dict[str, str] = {}
+            inject_traceparent(headers)
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout) as client:
+                response = await client.get(path, params=params, headers=headers)
         if response.status_code != 200:
             raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Downstream HTTP error: {response.status_code}")
         body = response.json()
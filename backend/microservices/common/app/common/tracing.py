@@ -0,0 +1,305 @@
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections.abc import Iterator, MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TextIO
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+_STATUS_UNSET = 0
+_STATUS_ERROR = 2
+_EXPORT_BATCH_SIZE = 256
+_EXPORT_INTERVAL_SECONDS = 1.0
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+@dataclass(frozen=True, slots=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+_current: ContextVar[SpanContext | None] = ContextVar("trace_span_context", default=None)
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128) or 1:032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64) or 1:016x}"
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    """Parse a W3C ``traceparent`` header; returns ``None`` for anything malformed."""
+    if not value:
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    trace_id, span_id, flags = parts[1], parts[2], parts[3]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    if not _HEX_DIGITS.issuperset(parts[0] + trace_id + span_id + flags):
+        return None
+    if int(trace_id, 16) == 0 or int(span_id, 16) == 0:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+class _SpanExporter:
+    """Writes finished spans as OTLP/JSON lines (one ``resourceSpans`` batch per line) from a
+    background thread, so request handlers never block on the output stream.
+
+    The format is what the OpenTelemetry Collector ``otlpjsonfile`` receiver reads, so a file can
+    be replayed into Jaeger, Tempo or any OTLP backend.
+    """
+
+    def __init__(self, stream: TextIO, service_name: str, service_version: str, close_stream: bool) -> None:
+        self.stream = stream
+        self.close_stream = close_stream
+        self.resource = {
+            "attributes": [
+                _attribute("service.name", service_name),
+                _attribute("service.version", service_version),
+            ]
+        }
+        self._queue: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: dict[str, Any]) -> None:
+        self._queue.put(span)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        if self.close_stream:
+            self.stream.close()
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch: list[dict[str, Any]] = []
+            deadline = time.monotonic() + _EXPORT_INTERVAL_SECONDS
+            while len(batch) < _EXPORT_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+
+    def _write(self, spans: list[dict[str, Any]]) -> None:
+        payload = {
+            "resourceSpans": [
+                {"resource": self.resource, "scopeSpans": [{"scope": {"name": "app"}, "spans": spans}]}
+            ]
+        }
+        try:
+            self.stream.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass
+
+
+_exporter: _SpanExporter | None = None
+_sample_rate = 1.0
+
+
+def _attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    __slots__ = ("name", "context", "parent_span_id", "kind", "attributes", "error", "_start_ns", "_start_perf")
+
+    def __init__(self, name: str, context: SpanContext, parent_span_id: str, kind: int, started_perf: float) -> None:
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes: dict[str, Any] = {}
+        self.error: str | None = None
+        self._start_perf = started_perf
+        self._start_ns = time.time_ns() - int((time.perf_counter() - started_perf) * 1e9)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, exc: BaseException | str) -> None:
+        self.error = exc if isinstance(exc, str) else f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        exporter = _exporter
+        if exporter is None or not self.context.sampled:
+            return
+        end_ns = self._start_ns + int((time.perf_counter() - self._start_perf) * 1e9)
+        span: dict[str, Any] = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self._start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_UNSET},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        exporter.export(span)
+
+
+def _new_span(name: str, kind: int, parent: SpanContext | None = None) -> Span | None:
+    if _exporter is None:
+        return None
+    parent = parent or _current.get()
+    if parent is None:
+        context = SpanContext(_new_trace_id(), _new_span_id(), _sample_rate >= 1.0 or random.random() < _sample_rate)
+        parent_span_id = ""
+    else:
+        context = SpanContext(parent.trace_id, _new_span_id(), parent.sampled)
+        parent_span_id = parent.span_id
+    return Span(name, context, parent_span_id, kind, time.perf_counter())
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: int = SPAN_KIND_INTERNAL,
+    attributes: dict[str, Any] | None = None,
+) -> Iterator[Span | None]:
+    """Run the block inside a new span that is current for everything it awaits or calls."""
+    span = _new_span(name, kind)
+    if span is None:
+        yield None
+        return
+    for key, value in (attributes or {}).items():
+        span.set_attribute(key, value)
+    token = _current.set(span.context)
+    try:
+        yield span
+    except Exception as exc:
+        span.record_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+def inject_traceparent(headers: MutableMapping[str, str], span: Span | None = None) -> None:
+    context = span.context if span is not None else _current.get()
+    if context is not None:
+        headers["traceparent"] = context.traceparent()
+
+
+def configure_tracing(
+    exporter: str,
+    file_path: str,
+    sample_rate: float,
+    service_name: str,
+    service_version: str,
+) -> None:
+    """Select the span exporter: ``none`` (default, spans are not created), ``stdout`` or ``file``."""
+    global _exporter, _sample_rate
+    shutdown_tracing()
+    _sample_rate = min(1.0, max(0.0, float(sample_rate)))
+    mode = exporter.strip().lower()
+    if mode == "stdout":
+        _exporter = _SpanExporter(sys.stdout, service_name, service_version, close_stream=False)
+    elif mode == "file":
+        path = Path(file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _exporter = _SpanExporter(path.open("a", encoding="utf-8"), service_name, service_version, close_stream=True)
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the exporter; registered with ``atexit`` so the last spans are written."""
+    global _exporter
+    if _exporter is not None:
+        exporter, _exporter = _exporter, None
+        exporter.shutdown()
+
+
+atexit.register(shutdown_tracing)
+
+
+class TraceContextMiddleware:
+    """Pure ASGI middleware: continue an incoming ``traceparent`` in a server span for the request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+        incoming = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"traceparent"), None)
+        span = _new_span(f"{scope['method']} {scope['path']}", SPAN_KIND_SERVER, parse_traceparent(incoming))
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Trace-Id"] = span.context.trace_id
+            await send(message)
+
+        token = _current.set(span.context)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            span.name = f"{scope['method']} {route}"
+            span.set_attribute("http.request.method", scope["method"])
+            span.set_attribute("http.route", str(route))
+            span.set_attribute("http.response.status_code", status_code)
+            if status_code >= 500:
+                span.record_error(f"HTTP {status_code}")
+            span.end()
+
+
+def register_tracing(app: FastAPI, service_name: str) -> None:
+    """Configure export from ``TRACING_EXPORTER`` / ``TRACING_FILE_PATH`` / ``TRACING_SAMPLE_RATE``
+    and continue incoming ``traceparent`` headers; every service calls this when it builds its app."""
+    configure_tracing(
+        os.getenv("TRACING_EXPORTER", "none"),
+        os.getenv("TRACING_FILE_PATH", "./traces/spans.jsonl"),
+        float(os.getenv("TRACING_SAMPLE_RATE", "1.0")),
+        service_name,
+        app.version,
+    )
+    app.add_middleware(TraceContextMiddleware)
@@ -6,6 +6,8 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, ConfigDict, Field
 from PIL import Image, ImageDraw
 
+from app.common.tracing import register_tracing
+
 
 class ScreenshotRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -23,6 +25,7 @@ SCREENSHOT_DIR = ARTIFACT_DIR / "screenshots"
 SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 app = FastAPI(title="python-ai-mother-screenshot-service", version="0.1.0")
+register_tracing(app, "screenshot-service")
 app.mount("/static", StaticFiles(directory=str(ARTIFACT_DIR), html=True), name="static")
 
 
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Services import the shared ``app.common`` package; the images copy it next to each service's app.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
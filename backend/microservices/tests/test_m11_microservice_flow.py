@@ -1,10 +1,13 @@
 import importlib.util
+import json
 from pathlib import Path
 from uuid import uuid4
 
 import httpx
 from fastapi.testclient import TestClient
 
+from app.common import tracing
+
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
@@ -113,3 +116,53 @@ def test_m11_cross_service_smoke(monkeypatch) -> None:
         assert shot_resp.status_code == 200
         assert shot_resp.json()["code"] == 0
         assert str(shot_resp.json()["data"]).startswith("/static/screenshots/")
+
+
+def test_m11_services_continue_w3c_traceparent(tmp_path: Path, monkeypatch) -> None:
+    user_module = _load_module("m11_user_service_tracing", BASE_DIR / "user-service" / "app" / "main.py")
+    app_module = _load_module("m11_app_service_tracing", BASE_DIR / "app-service" / "app" / "main.py")
+    trace_id, span_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert tracing.parse_traceparent(f"00-{trace_id}-{span_id}-03") == tracing.SpanContext(trace_id, span_id, True)
+    assert tracing.parse_traceparent(f"00-{trace_id}-{span_id}-00") == tracing.SpanContext(trace_id, span_id, False)
+    assert tracing.parse_traceparent(f"00-{'0' * 32}-{span_id}-01") is None
+    assert tracing.parse_traceparent(f"00-{trace_id}-{span_id}-0x") is None
+
+    real_async_client = httpx.AsyncClient
+
+    def _routed_client(base_url: str, timeout: float) -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=user_module.app)
+        return real_async_client(transport=transport, base_url=base_url, timeout=timeout)
+
+    monkeypatch.setattr(app_module.httpx, "AsyncClient", _routed_client)
+    span_file = tmp_path / "spans.jsonl"
+    tracing.configure_tracing("file", str(span_file), 1.0, "m11", "0.1.0")
+    try:
+        with TestClient(app_module.app) as client:
+            # The second request is unsampled upstream: it propagates but exports nothing.
+            for incoming_trace_id, flags in ((trace_id, "01"), ("a" * 32, "00")):
+                resp = client.post(
+                    "/api/user/register",
+                    json={
+                        "userAccount": f"trace_{uuid4().hex[:8]}",
+                        "userPassword": "Pass12345",
+                        "checkPassword": "Pass12345",
+                    },
+                    headers={"traceparent": f"00-{incoming_trace_id}-{span_id}-{flags}"},
+                )
+                assert resp.json()["code"] == 0
+                assert resp.headers["X-Trace-Id"] == incoming_trace_id
+    finally:
+        tracing.shutdown_tracing()
+
+    spans = [
+        span
+        for line in span_file.read_text(encoding="utf-8").splitlines()
+        for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    # app-service server span -> client span -> user-service server span, all in the caller's trace.
+    assert {span["traceId"] for span in spans} == {trace_id}
+    by_parent = {span.get("parentSpanId"): span for span in spans}
+    app_server = by_parent[span_id]
+    client_span = by_parent[app_server["spanId"]]
+    user_server = by_parent[client_span["spanId"]]
+    assert (app_server["kind"], client_span["kind"], user_server["kind"]) == (2, 3, 2)
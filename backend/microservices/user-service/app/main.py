@@ -4,6 +4,8 @@ from threading import Lock
 from fastapi import FastAPI, Query, Request, Response
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.common.tracing import register_tracing
+
 
 SESSION_COOKIE_NAME = "python_ai_mother_sid"
 _LOCK = Lock()
@@ -36,6 +38,7 @@ def fail(code: int, message: str) -> dict:
 
 
 app = FastAPI(title="python-ai-mother-user-service", version="0.1.0")
+register_tracing(app, "user-service")
 
 
 @app.get("/health")
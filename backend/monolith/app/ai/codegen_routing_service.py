@@ -50,7 +50,11 @@ class AiCodeGenTypeRoutingService:
     async def _llm_route(self, prompt: str) -> CodeGenRouteDecision | None:
         try:
             system_prompt = load_prompt("codegen-routing-system-prompt.txt")
-            text = await self.ai_service.generate_text(system_prompt=system_prompt, user_prompt=prompt)
+            text = await self.ai_service.generate_text(
+                system_prompt=system_prompt,
+                user_prompt=prompt,
+                code_gen_type="routing",
+            )
             if not text:
                 return None
             decision = self._parse_llm_response(text)
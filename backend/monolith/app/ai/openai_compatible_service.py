@@ -1,12 +1,54 @@
 import asyncio
+import contextlib
 import json
+import time
 from collections.abc import AsyncIterator
+from urllib.parse import urlparse
 
 import httpx
 
 from app.core.config import Settings
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
+from app.core.metrics import (
+    observe_llm_chunk_gap,
+    observe_llm_first_token,
+    observe_llm_generation,
+    observe_llm_queue_wait,
+    record_llm_failure,
+)
+from app.core.tracing import SPAN_KIND_CLIENT, Span, inject_traceparent, new_span
+
+
+@contextlib.asynccontextmanager
+async def _llm_span(labels: tuple[str, str, str], attempt: int) -> AsyncIterator[Span | None]:
+    """Client span around one HTTP attempt; it is never made current, so it is safe to hold
+    across the ``yield`` of the streaming generator."""
+    span = new_span("llm.chat.completions", SPAN_KIND_CLIENT)
+    if span is None:
+        yield None
+        return
+    model, endpoint, code_gen_type = labels
+    span.set_attribute("gen_ai.system", "openai")
+    span.set_attribute("gen_ai.request.model", model)
+    span.set_attribute("server.address", endpoint)
+    span.set_attribute("code_gen_type", code_gen_type)
+    span.set_attribute("llm.attempt", attempt)
+    try:
+        yield span
+    except Exception as exc:
+        span.record_error(exc)
+        raise
+    finally:
+        span.end()
+
+
+def _with_traceparent(headers: dict[str, str], span: Span | None) -> dict[str, str]:
+    if span is None:
+        return headers
+    traced = dict(headers)
+    inject_traceparent(traced, span)
+    return traced
 
 
 class OpenAICompatibleService:
@@ -17,7 +59,16 @@ class OpenAICompatibleService:
         if OpenAICompatibleService._semaphore is None:
             OpenAICompatibleService._semaphore = asyncio.Semaphore(max(1, settings.ai_concurrency_limit))
 
-    async def generate_stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    def _metric_labels(self, code_gen_type: str) -> tuple[str, str, str]:
+        endpoint = urlparse(self.settings.llm_base_url).netloc or self.settings.llm_base_url
+        return (self.settings.llm_model_name, endpoint, code_gen_type or "none")
+
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        code_gen_type: str = "none",
+    ) -> AsyncIterator[str]:
         if not self.settings.llm_base_url or not self.settings.llm_api_key:
             raise BusinessException(ErrorCode.SYSTEM_ERROR, "LLM config is missing")
 
@@ -38,10 +89,14 @@ class OpenAICompatibleService:
         semaphore = OpenAICompatibleService._semaphore
         if semaphore is None:
             semaphore = asyncio.Semaphore(1)
+        labels = self._metric_labels(code_gen_type)
 
         for attempt in range(retries + 1):
             try:
-                async with semaphore:
+                wait_started = time.perf_counter()
+                async with semaphore, _llm_span(labels, attempt) as span:
+                    started = time.perf_counter()
+                    observe_llm_queue_wait(labels, started - wait_started)
                     async with httpx.AsyncClient(
                         base_url=self.settings.llm_base_url,
                         timeout=self.settings.llm_timeout_seconds,
@@ -49,14 +104,19 @@ class OpenAICompatibleService:
                         async with client.stream(
                             "POST",
                             "/chat/completions",
-                            headers=headers,
+                            headers=_with_traceparent(headers, span),
                             json=payload,
                         ) as response:
                             if response.status_code != 200:
+                                record_llm_failure(labels, f"http_{response.status_code}", retrying=False)
                                 body = await response.aread()
                                 error_text = body.decode("utf-8", errors="ignore")
                                 raise BusinessException(ErrorCode.SYSTEM_ERROR, f"LLM request failed: {error_text[:300]}")
 
+                            last_chunk_at: float | None = None
+                            output_chars = 0
+                            chunk_count = 0
+                            usage_tokens: int | None = None
                             async for line in response.aiter_lines():
                                 if not line or not line.startswith("data: "):
                                     continue
@@ -65,17 +125,33 @@ class OpenAICompatibleService:
                                     break
                                 try:
                                     payload_json = json.loads(data_str)
+                                    usage = payload_json.get("usage") or {}
+                                    if usage.get("completion_tokens") is not None:
+                                        usage_tokens = int(usage["completion_tokens"])
                                     choices = payload_json.get("choices") or []
                                     if not choices:
                                         continue
                                     delta = choices[0].get("delta") or {}
                                     content = delta.get("content")
                                     if content:
+                                        now = time.perf_counter()
+                                        if last_chunk_at is None:
+                                            observe_llm_first_token(labels, now - started)
+                                        else:
+                                            observe_llm_chunk_gap(labels, now - last_chunk_at)
+                                        last_chunk_at = now
+                                        output_chars += len(content)
+                                        chunk_count += 1
                                         yield str(content)
                                 except json.JSONDecodeError:
                                     continue
+                            output_tokens = usage_tokens if usage_tokens is not None else chunk_count
+                            observe_llm_generation(labels, time.perf_counter() - started, output_chars, output_tokens)
+                            if span is not None:
+                                span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
                             return
             except httpx.TimeoutException as exc:
+                record_llm_failure(labels, "timeout", retrying=attempt < retries)
                 if attempt >= retries:
                     raise BusinessException(
                         ErrorCode.SYSTEM_ERROR,
@@ -83,11 +159,12 @@ class OpenAICompatibleService:
                     ) from exc
                 continue
             except httpx.HTTPError as exc:
+                record_llm_failure(labels, "network", retrying=attempt < retries)
                 if attempt >= retries:
                     raise BusinessException(ErrorCode.SYSTEM_ERROR, f"LLM request network error: {exc}") from exc
                 continue
 
-    async def generate_text(self, system_prompt: str, user_prompt: str) -> str:
+    async def generate_text(self, system_prompt: str, user_prompt: str, code_gen_type: str = "none") -> str:
         if not self.settings.llm_base_url or not self.settings.llm_api_key:
             raise BusinessException(ErrorCode.SYSTEM_ERROR, "LLM config is missing")
 
@@ -108,30 +185,39 @@ class OpenAICompatibleService:
         semaphore = OpenAICompatibleService._semaphore
         if semaphore is None:
             semaphore = asyncio.Semaphore(1)
+        labels = self._metric_labels(code_gen_type)
 
         for attempt in range(retries + 1):
             try:
-                async with semaphore:
+                wait_started = time.perf_counter()
+                async with semaphore, _llm_span(labels, attempt) as span:
+                    started = time.perf_counter()
+                    observe_llm_queue_wait(labels, started - wait_started)
                     async with httpx.AsyncClient(
                         base_url=self.settings.llm_base_url,
                         timeout=self.settings.llm_timeout_seconds,
                     ) as client:
                         response = await client.post(
                             "/chat/completions",
-                            headers=headers,
+                            headers=_with_traceparent(headers, span),
                             json=payload,
                         )
                         if response.status_code != 200:
+                            record_llm_failure(labels, f"http_{response.status_code}", retrying=False)
                             error_text = response.text
                             raise BusinessException(ErrorCode.SYSTEM_ERROR, f"LLM request failed: {error_text[:300]}")
                         data = response.json()
                         choices = data.get("choices") or []
-                        if not choices:
-                            return ""
-                        message = choices[0].get("message") or {}
-                        content = message.get("content")
-                        return str(content or "").strip()
+                        message = (choices[0].get("message") or {}) if choices else {}
+                        content = str(message.get("content") or "").strip()
+                        completion_tokens = (data.get("usage") or {}).get("completion_tokens")
+                        output_tokens = int(completion_tokens) if completion_tokens is not None else 0
+                        observe_llm_generation(labels, time.perf_counter() - started, len(content), output_tokens)
+                        if span is not None:
+                            span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
+                        return content
             except httpx.TimeoutException as exc:
+                record_llm_failure(labels, "timeout", retrying=attempt < retries)
                 if attempt >= retries:
                     raise BusinessException(
                         ErrorCode.SYSTEM_ERROR,
@@ -139,6 +225,7 @@ class OpenAICompatibleService:
                     ) from exc
                 continue
             except (httpx.HTTPError, json.JSONDecodeError) as exc:
+                record_llm_failure(labels, "network", retrying=attempt < retries)
                 if attempt >= retries:
                     raise BusinessException(ErrorCode.SYSTEM_ERROR, f"LLM request network error: {exc}") from exc
                 continue
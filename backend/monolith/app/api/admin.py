@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query, Response
+
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.memory import build_memory_report
+from app.core.profiler import MAX_PROFILE_SECONDS, profile_busy, profile_for
+from app.core.response import BaseResponse, success_response
+from app.dependencies import require_role
+from app.models.user import User
+from app.services.user_service import USER_ROLE_ADMIN
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/profile", response_class=Response)
+async def sample_profile(
+    seconds: float = Query(default=10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: int = Query(default=10, alias="intervalMs", ge=1, le=1000),
+    _: User = Depends(require_role(USER_ROLE_ADMIN)),
+) -> Response:
+    """Sample every thread of this worker and return collapsed stacks for a flame graph."""
+    if profile_busy():
+        raise BusinessException(ErrorCode.PARAMS_ERROR, "A profile is already running in this worker")
+    stacks, samples = await profile_for(seconds, interval_ms)
+    return Response(
+        content=stacks,
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Profile-Samples": str(samples)},
+    )
+
+
+@router.get("/memory", response_model=BaseResponse[dict[str, Any]])
+async def memory_report(
+    top: int = Query(default=20, ge=1, le=200),
+    group_by: str = Query(default="lineno", alias="groupBy"),
+    _: User = Depends(require_role(USER_ROLE_ADMIN)),
+) -> BaseResponse[dict[str, Any]]:
+    """RSS, top allocation sites (when ``MEMORY_TRACEMALLOC_FRAMES`` > 0), cache and stream buffer sizes."""
+    return success_response(await asyncio.to_thread(build_memory_report, top, group_by))
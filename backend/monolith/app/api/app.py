@@ -1,6 +1,8 @@
 import logging
+import time
 from collections.abc import AsyncIterator
 
+import anyio
 from fastapi import APIRouter, Depends, Path, Query
 from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,7 +14,9 @@ from app.core.config import Settings
 from app.core.edit_modes import EDIT_MODE_FULL
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
-from app.core.response import BaseResponse, success_response
+from app.core.memory import StreamBuffer
+from app.core.metrics import finish_generation_stage
+from app.core.response import BaseResponse, success_json_response, success_response
 from app.core.sse import build_sse_data, build_sse_event
 from app.dependencies import (
     get_ai_codegen_facade,
@@ -21,6 +25,7 @@ from app.dependencies import (
     get_app_settings,
     get_chat_history_service,
     get_codegen_workflow_runner,
+    get_concurrency_limit_service,
     get_db_session,
     get_login_user,
     get_rate_limit_service,
@@ -44,17 +49,70 @@ from app.schemas.app import (
     PageAppVO,
 )
 from app.schemas.user import DeleteRequest
-from app.services.app_service import AppService
+from app.services.app_service import AppService, CachedApp
 from app.services.chat_history_service import (
     MESSAGE_TYPE_ASSISTANT,
     MESSAGE_TYPE_USER,
     ChatHistoryService,
 )
+from app.services.concurrency_limit_service import ConcurrencyLimitService, GenerationLease
 from app.services.rate_limit_service import RateLimitService
 from app.services.screenshot_service import ScreenshotService
 from app.services.user_service import USER_ROLE_ADMIN
 
 logger = logging.getLogger(__name__)
+
+
+def _stage_event(tool: str, message: str, duration_ms: float) -> str:
+    return build_sse_data({"type": "tool", "event": "end", "tool": tool, "message": message, "durationMs": duration_ms})
+
+
+async def _save_generation_results(
+    db: AsyncSession,
+    app_service: AppService,
+    chat_history_service: ChatHistoryService,
+    settings: Settings,
+    login_user: User,
+    app_entity: CachedApp,
+    user_message: str,
+    assistant_message: str,
+    edit_mode: str,
+    history_seconds: float,
+) -> AsyncIterator[str]:
+    """Store the assistant reply and a version snapshot after a generation, yielding stage events.
+
+    ``history_seconds`` is the time already spent writing the user message before the stream.
+    """
+    history_started = time.perf_counter()
+    if assistant_message:
+        await chat_history_service.add_chat_message(
+            db,
+            app_id=app_entity.id,
+            user_id=login_user.id,
+            message_type=MESSAGE_TYPE_ASSISTANT,
+            message=assistant_message,
+        )
+    # Both history writes count towards one stage: shift the start back by the first write.
+    history_ms = finish_generation_stage("chat.history", app_entity.code_gen_type, history_started - history_seconds)
+    yield _stage_event("chat.history", "对话记录已保存", history_ms)
+    snapshot_started = time.perf_counter()
+    snapshot_message = "版本快照已保存"
+    try:
+        await app_service.create_version_snapshot(
+            db=db,
+            app_id=app_entity.id,
+            login_user=login_user,
+            generated_root=settings.generated_code_path(),
+            message=user_message,
+            edit_mode=edit_mode,
+        )
+    except BusinessException as snapshot_exc:
+        logger.warning("Create version snapshot skipped: %s", snapshot_exc.message)
+        snapshot_message = f"版本快照已跳过：{snapshot_exc.message}"
+    snapshot_ms = finish_generation_stage("version.snapshot", app_entity.code_gen_type, snapshot_started)
+    yield _stage_event("version.snapshot", snapshot_message, snapshot_ms)
+
+
 router = APIRouter(prefix="/app", tags=["app"])
 
 
@@ -113,9 +171,9 @@ async def list_my_app_vo_by_page(
     login_user: User = Depends(get_login_user),
     db: AsyncSession = Depends(get_db_session),
     app_service: AppService = Depends(get_app_service),
-) -> BaseResponse[PageAppVO]:
-    page = await app_service.list_my_app_vo_by_page(db, payload, login_user)
-    return success_response(page)
+) -> Response:
+    page_json = await app_service.list_my_app_vo_by_page(db, payload, login_user)
+    return success_json_response(page_json)
 
 
 @router.post("/good/list/page/vo", response_model=BaseResponse[PageAppVO])
@@ -123,9 +181,9 @@ async def list_good_app_vo_by_page(
     payload: AppQueryRequest,
     db: AsyncSession = Depends(get_db_session),
     app_service: AppService = Depends(get_app_service),
-) -> BaseResponse[PageAppVO]:
-    page = await app_service.list_good_app_vo_by_page(db, payload)
-    return success_response(page)
+) -> Response:
+    page_json = await app_service.list_good_app_vo_by_page(db, payload)
+    return success_json_response(page_json)
 
 
 @router.post("/admin/delete", response_model=BaseResponse[bool])
@@ -156,9 +214,9 @@ async def list_app_vo_by_page_by_admin(
     _: User = Depends(require_role(USER_ROLE_ADMIN)),
     db: AsyncSession = Depends(get_db_session),
     app_service: AppService = Depends(get_app_service),
-) -> BaseResponse[PageAppVO]:
-    page = await app_service.list_app_vo_by_page_by_admin(db, payload)
-    return success_response(page)
+) -> Response:
+    page_json = await app_service.list_app_vo_by_page_by_admin(db, payload)
+    return success_json_response(page_json)
 
 
 @router.get("/admin/get/vo", response_model=BaseResponse[AppVO])
@@ -328,9 +386,10 @@ async def chat_to_gen_code(
     app_service: AppService = Depends(get_app_service),
     chat_history_service: ChatHistoryService = Depends(get_chat_history_service),
     rate_limit_service: RateLimitService = Depends(get_rate_limit_service),
+    concurrency_limit_service: ConcurrencyLimitService = Depends(get_concurrency_limit_service),
     ai_facade: AiCodeGeneratorFacade = Depends(get_ai_codegen_facade),
 ) -> StreamingResponse:
-    app_entity = await app_service.get_app_entity_by_id(db, app_id)
+    app_entity = await app_service.get_cached_app_by_id(db, app_id)
     if app_entity.user_id != login_user.id and login_user.user_role != USER_ROLE_ADMIN:
         raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
     normalized_edit_mode = app_service.normalize_edit_mode(edit_mode)
@@ -341,8 +400,11 @@ async def chat_to_gen_code(
         user_prompt = f"{app_entity.init_prompt}\n\n{user_prompt}"
 
     async def _stream() -> AsyncIterator[str]:
+        lease: GenerationLease | None = None
         try:
             await rate_limit_service.assert_chat_rate_limit(login_user.id, route="gen-code")
+            lease = await concurrency_limit_service.acquire(login_user.id, app_entity.id)
+            history_started = time.perf_counter()
             await chat_history_service.add_chat_message(
                 db,
                 app_id=app_entity.id,
@@ -350,38 +412,33 @@ async def chat_to_gen_code(
                 message_type=MESSAGE_TYPE_USER,
                 message=user_message,
             )
-            ai_chunks: list[str] = []
-            async for chunk in ai_facade.generate_and_save_code_stream(
-                app_id=app_entity.id,
-                user_message=user_prompt,
-                code_gen_type=app_entity.code_gen_type,
-                edit_mode=normalized_edit_mode,
-            ):
-                if isinstance(chunk, str):
-                    ai_chunks.append(chunk)
-                    yield build_sse_data({"d": chunk})
-                else:
-                    yield build_sse_data(chunk)
-            assistant_message = "".join(ai_chunks).strip()
-            if assistant_message:
-                await chat_history_service.add_chat_message(
-                    db,
-                    app_id=app_entity.id,
-                    user_id=login_user.id,
-                    message_type=MESSAGE_TYPE_ASSISTANT,
-                    message=assistant_message,
-                )
-            try:
-                await app_service.create_version_snapshot(
-                    db=db,
+            history_seconds = time.perf_counter() - history_started
+            with StreamBuffer() as ai_output:
+                async for chunk in ai_facade.generate_and_save_code_stream(
                     app_id=app_entity.id,
-                    login_user=login_user,
-                    generated_root=settings.generated_code_path(),
-                    message=user_message,
+                    user_message=user_prompt,
+                    code_gen_type=app_entity.code_gen_type,
                     edit_mode=normalized_edit_mode,
-                )
-            except BusinessException as snapshot_exc:
-                logger.warning("Create version snapshot skipped: %s", snapshot_exc.message)
+                ):
+                    if isinstance(chunk, str):
+                        ai_output.append(chunk)
+                        yield build_sse_data({"d": chunk})
+                    else:
+                        yield build_sse_data(chunk)
+                assistant_message = ai_output.text().strip()
+            async for event in _save_generation_results(
+                db,
+                app_service,
+                chat_history_service,
+                settings,
+                login_user,
+                app_entity,
+                user_message,
+                assistant_message,
+                normalized_edit_mode,
+                history_seconds,
+            ):
+                yield event
             yield build_sse_event("done", "done")
         except BusinessException as exc:
             yield build_sse_event(
@@ -394,6 +451,11 @@ async def chat_to_gen_code(
                 "business-error",
                 {"code": int(ErrorCode.SYSTEM_ERROR), "message": "System error"},
             )
+        finally:
+            if lease is not None:
+                # A client disconnect cancels this generator; the release must still reach Redis.
+                with anyio.CancelScope(shield=True):
+                    await lease.release()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -414,9 +476,10 @@ async def chat_to_gen_code_workflow(
     app_service: AppService = Depends(get_app_service),
     chat_history_service: ChatHistoryService = Depends(get_chat_history_service),
     rate_limit_service: RateLimitService = Depends(get_rate_limit_service),
+    concurrency_limit_service: ConcurrencyLimitService = Depends(get_concurrency_limit_service),
     workflow_runner: CodeGenWorkflowRunner = Depends(get_codegen_workflow_runner),
 ) -> StreamingResponse:
-    app_entity = await app_service.get_app_entity_by_id(db, app_id)
+    app_entity = await app_service.get_cached_app_by_id(db, app_id)
     if app_entity.user_id != login_user.id and login_user.user_role != USER_ROLE_ADMIN:
         raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
     normalized_edit_mode = app_service.normalize_edit_mode(edit_mode)
@@ -427,8 +490,11 @@ async def chat_to_gen_code_workflow(
         user_prompt = f"{app_entity.init_prompt}\n\n{user_prompt}"
 
     async def _stream() -> AsyncIterator[str]:
+        lease: GenerationLease | None = None
         try:
             await rate_limit_service.assert_chat_rate_limit(login_user.id, route="gen-workflow")
+            lease = await concurrency_limit_service.acquire(login_user.id, app_entity.id)
+            history_started = time.perf_counter()
             await chat_history_service.add_chat_message(
                 db,
                 app_id=app_entity.id,
@@ -436,38 +502,33 @@ async def chat_to_gen_code_workflow(
                 message_type=MESSAGE_TYPE_USER,
                 message=user_message,
             )
-            ai_chunks: list[str] = []
-            async for chunk in workflow_runner.run_stream(
-                app_id=app_entity.id,
-                user_message=user_prompt,
-                code_gen_type=app_entity.code_gen_type,
-                edit_mode=normalized_edit_mode,
-            ):
-                if isinstance(chunk, str):
-                    ai_chunks.append(chunk)
-                    yield build_sse_data({"d": chunk})
-                else:
-                    yield build_sse_data(chunk)
-            assistant_message = "".join(ai_chunks).strip()
-            if assistant_message:
-                await chat_history_service.add_chat_message(
-                    db,
-                    app_id=app_entity.id,
-                    user_id=login_user.id,
-                    message_type=MESSAGE_TYPE_ASSISTANT,
-                    message=assistant_message,
-                )
-            try:
-                await app_service.create_version_snapshot(
-                    db=db,
+            history_seconds = time.perf_counter() - history_started
+            with StreamBuffer() as ai_output:
+                async for chunk in workflow_runner.run_stream(
                     app_id=app_entity.id,
-                    login_user=login_user,
-                    generated_root=settings.generated_code_path(),
-                    message=user_message,
+                    user_message=user_prompt,
+                    code_gen_type=app_entity.code_gen_type,
                     edit_mode=normalized_edit_mode,
-                )
-            except BusinessException as snapshot_exc:
-                logger.warning("Create version snapshot skipped: %s", snapshot_exc.message)
+                ):
+                    if isinstance(chunk, str):
+                        ai_output.append(chunk)
+                        yield build_sse_data({"d": chunk})
+                    else:
+                        yield build_sse_data(chunk)
+                assistant_message = ai_output.text().strip()
+            async for event in _save_generation_results(
+                db,
+                app_service,
+                chat_history_service,
+                settings,
+                login_user,
+                app_entity,
+                user_message,
+                assistant_message,
+                normalized_edit_mode,
+                history_seconds,
+            ):
+                yield event
             yield build_sse_event("done", "done")
         except BusinessException as exc:
             yield build_sse_event(
@@ -480,6 +541,11 @@ async def chat_to_gen_code_workflow(
                 "business-error",
                 {"code": int(ErrorCode.SYSTEM_ERROR), "message": "System error"},
             )
+        finally:
+            if lease is not None:
+                # A client disconnect cancels this generator; the release must still reach Redis.
+                with anyio.CancelScope(shield=True):
+                    await lease.release()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -23,6 +23,7 @@ async def list_app_chat_history(
     app_id: int = Path(gt=0),
     page_size: int = Query(default=10, alias="pageSize", ge=1, le=50),
     last_create_time: datetime | None = Query(default=None, alias="lastCreateTime"),
+    count_mode: str | None = Query(default=None, alias="countMode"),
     login_user: User = Depends(get_login_user),
     db: AsyncSession = Depends(get_db_session),
     chat_history_service: ChatHistoryService = Depends(get_chat_history_service),
@@ -33,6 +34,7 @@ async def list_app_chat_history(
         page_size=page_size,
         last_create_time=last_create_time,
         login_user=login_user,
+        count_mode=count_mode,
     )
     return success_response(page)
 
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from app.api.admin import router as admin_router
 from app.api.app import router as app_router
 from app.api.chat_history import router as chat_history_router
 from app.api.health import router as health_router
@@ -10,4 +11,5 @@ api_router.include_router(health_router)
 api_router.include_router(user_router)
 api_router.include_router(app_router)
 api_router.include_router(chat_history_router)
+api_router.include_router(admin_router)
 
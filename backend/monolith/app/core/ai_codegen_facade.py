@@ -1,3 +1,4 @@
+import time
 from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
@@ -14,6 +15,8 @@ from app.core.config import Settings
 from app.core.edit_modes import EDIT_MODE_INCREMENTAL
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
+from app.core.memory import StreamBuffer
+from app.core.metrics import finish_generation_stage
 from app.core.prompt_loader import load_prompt
 
 
@@ -37,21 +40,39 @@ class AiCodeGeneratorFacade:
         final_user_message = self._build_edit_mode_message(guarded_message, edit_mode)
 
         yield self._tool_event("start", "llm.generate", "开始调用模型生成代码")
-        chunks: list[str] = []
-        async for chunk in self.ai_service.generate_stream(system_prompt=system_prompt, user_prompt=final_user_message):
-            chunks.append(chunk)
-            yield chunk
-        yield self._tool_event("end", "llm.generate", f"模型输出完成，累计 {sum(len(item) for item in chunks)} 字符")
+        started = time.perf_counter()
+        with StreamBuffer() as output:
+            async for chunk in self.ai_service.generate_stream(
+                system_prompt=system_prompt,
+                user_prompt=final_user_message,
+                code_gen_type=code_gen_type,
+            ):
+                output.append(chunk)
+                yield chunk
+            raw_text = output.text()
+        final_text = raw_text.strip()
+        yield self._tool_event(
+            "end",
+            "llm.generate",
+            f"模型输出完成，累计 {len(raw_text)} 字符",
+            finish_generation_stage("llm.generate", code_gen_type, started),
+        )
 
-        final_text = "".join(chunks).strip()
         if not final_text:
             raise BusinessException(ErrorCode.SYSTEM_ERROR, "LLM empty response")
 
         yield self._tool_event("start", "parse.output", "开始解析生成内容")
+        started = time.perf_counter()
         parsed_code = self.parser_executor.parse(code_gen_type=code_gen_type, raw_text=final_text)
-        yield self._tool_event("end", "parse.output", f"解析完成，长度 {len(parsed_code)} 字符")
+        yield self._tool_event(
+            "end",
+            "parse.output",
+            f"解析完成，长度 {len(parsed_code)} 字符",
+            finish_generation_stage("parse.output", code_gen_type, started),
+        )
 
         yield self._tool_event("start", "write.files", "开始落盘生成文件")
+        started = time.perf_counter()
         output_dir = self.saver_executor.save(
             code_gen_type=code_gen_type,
             app_id=app_id,
@@ -70,6 +91,7 @@ class AiCodeGeneratorFacade:
             "end",
             "write.files",
             f"文件落盘完成，共 {len(written_files)} 个文件，目录 {output_dir.name}",
+            finish_generation_stage("write.files", code_gen_type, started),
         )
 
     @staticmethod
@@ -83,8 +105,11 @@ class AiCodeGeneratorFacade:
         raise BusinessException(ErrorCode.PARAMS_ERROR, f"Unsupported code_gen_type: {code_gen_type}")
 
     @staticmethod
-    def _tool_event(event: str, tool: str, message: str) -> dict[str, Any]:
-        return {"type": "tool", "event": event, "tool": tool, "message": message}
+    def _tool_event(event: str, tool: str, message: str, duration_ms: float | None = None) -> dict[str, Any]:
+        payload: dict[str, Any] = {"type": "tool", "event": event, "tool": tool, "message": message}
+        if duration_ms is not None:
+            payload["durationMs"] = duration_ms
+        return payload
 
     @staticmethod
     def _list_written_files(output_dir: Path) -> list[str]:
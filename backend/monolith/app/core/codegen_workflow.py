@@ -1,9 +1,11 @@
 ﻿import asyncio
-from collections.abc import AsyncIterator
+import time
+from collections.abc import AsyncIterator, Awaitable
 from typing import Any
 
 from app.core.ai_codegen_facade import AiCodeGeneratorFacade
 from app.core.config import Settings
+from app.core.metrics import finish_generation_stage
 
 
 class CodeGenWorkflowRunner:
@@ -20,20 +22,29 @@ class CodeGenWorkflowRunner:
         edit_mode: str,
     ) -> AsyncIterator[str | dict[str, Any]]:
         yield self._event("router", "start", "开始路由生成策略")
+        started = time.perf_counter()
         route = "simple"
         if code_gen_type in {"multi_file", "vue_project"}:
             route = "project"
-        yield self._event("router", "end", f"路由完成：{route}")
+        router_ms = finish_generation_stage("router", code_gen_type, started)
+        yield self._event("router", "end", f"路由完成：{route}", router_ms)
 
         yield self._event("parallel", "start", "并行执行资源计划与质量检查")
-        assets_task = asyncio.create_task(self._collect_assets(user_message))
-        quality_task = asyncio.create_task(self._quality_plan(user_message))
-        assets, quality = await asyncio.gather(assets_task, quality_task)
-        yield self._event("asset_collector", "end", assets)
-        yield self._event("quality_checker", "end", quality)
-        yield self._event("parallel", "end", "并行节点完成")
+        started = time.perf_counter()
+        assets_task = asyncio.create_task(
+            self._timed("asset_collector", code_gen_type, self._collect_assets(user_message))
+        )
+        quality_task = asyncio.create_task(
+            self._timed("quality_checker", code_gen_type, self._quality_plan(user_message))
+        )
+        (assets, assets_ms), (quality, quality_ms) = await asyncio.gather(assets_task, quality_task)
+        yield self._event("asset_collector", "end", assets, assets_ms)
+        yield self._event("quality_checker", "end", quality, quality_ms)
+        parallel_ms = finish_generation_stage("parallel", code_gen_type, started)
+        yield self._event("parallel", "end", "并行节点完成", parallel_ms)
 
         yield self._event("code_generator", "start", "开始执行代码生成节点")
+        started = time.perf_counter()
         async for chunk in self.facade.generate_and_save_code_stream(
             app_id=app_id,
             user_message=user_message,
@@ -41,7 +52,18 @@ class CodeGenWorkflowRunner:
             edit_mode=edit_mode,
         ):
             yield chunk
-        yield self._event("code_generator", "end", "代码生成节点完成")
+        yield self._event(
+            "code_generator",
+            "end",
+            "代码生成节点完成",
+            finish_generation_stage("code_generator", code_gen_type, started),
+        )
+
+    @staticmethod
+    async def _timed(stage: str, code_gen_type: str, node: Awaitable[str]) -> tuple[str, float]:
+        started = time.perf_counter()
+        result = await node
+        return result, finish_generation_stage(stage, code_gen_type, started)
 
     @staticmethod
     async def _collect_assets(user_message: str) -> str:
@@ -58,10 +80,13 @@ class CodeGenWorkflowRunner:
         return "启用默认质量检查策略"
 
     @staticmethod
-    def _event(node: str, event: str, message: str) -> dict[str, Any]:
-        return {
+    def _event(node: str, event: str, message: str, duration_ms: float | None = None) -> dict[str, Any]:
+        payload: dict[str, Any] = {
             "type": "workflow",
             "node": node,
             "event": event,
             "message": message,
         }
+        if duration_ms is not None:
+            payload["durationMs"] = duration_ms
+        return payload
@@ -11,14 +11,42 @@ class Settings(BaseSettings):
     api_prefix: str = "/api"
     debug: bool = False
     log_level: str = "INFO"
+    log_format: str = "text"
+    request_log_sample_rate: float = 1.0
+    request_log_probe_sample_rate: float = 0.01
+    request_log_slow_ms: int = 1000
+    metrics_multiproc_dir: str = ""
+    metrics_flush_interval_seconds: int = 5
+    metrics_histogram_mode: str = "classic"
+    metrics_histogram_buckets: str = ""
+    metrics_sparse_max_buckets: int = 160
+    tracing_exporter: str = "none"
+    tracing_file_path: str = "./traces/spans.jsonl"
+    tracing_sample_rate: float = 1.0
+    db_slow_query_ms: int = 200
+    event_loop_monitor_interval_seconds: float = 0.5
+    event_loop_stall_ms: int = 100
+    event_loop_stall_capture: bool = False
+    profiler_continuous_dir: str = ""
+    profiler_continuous_interval_ms: int = 100
+    profiler_continuous_rotate_seconds: int = 300
+    profiler_continuous_max_files: int = 24
+    memory_tracemalloc_frames: int = 0
     cors_origins: str = "*"
     database_url: str = "sqlite+aiosqlite:///./python_ai_mother.db"
     redis_url: str = "redis://localhost:6379/0"
     password_salt: str = "python-ai-mother"
+    password_hash_algorithm: str = "pbkdf2_sha256"
+    password_hash_cost: int = 200_000
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
     session_cookie_name: str = "python_ai_mother_sid"
     session_ttl_seconds: int = 86400
     session_cookie_secure: bool = False
     session_cookie_samesite: str = "lax"
+    session_user_cache_ttl_seconds: int = 30
+    session_memory_max_entries: int = 100_000
+    session_memory_sweep_interval_seconds: int = 60
     llm_base_url: str = ""
     llm_api_key: str = ""
     llm_model_name: str = "gpt-4o-mini"
@@ -31,8 +59,22 @@ class Settings(BaseSettings):
     generated_code_dir: str = "./generated"
     deploy_domain: str = "http://localhost:8123/api/static"
     app_query_cache_ttl_seconds: int = 30
+    app_query_cache_local_ttl_seconds: int = 5
+    app_query_cache_stale_seconds: int = 30
+    app_entity_cache_ttl_seconds: int = 10
+    list_count_cache_ttl_seconds: int = 10
+    user_profile_cache_ttl_seconds: int = 300
+    user_profile_cache_local_ttl_seconds: int = 30
+    user_profile_batch_window_ms: int = 2
     chat_rate_limit_count: int = 20
     chat_rate_limit_window_seconds: int = 60
+    chat_rate_limit_algorithm: str = "gcra"
+    chat_rate_limit_routes: str = ""
+    chat_rate_limit_local_tolerance: float = 0.1
+    generation_max_concurrent_per_user: int = 2
+    generation_max_concurrent_per_app: int = 1
+    generation_max_concurrent_global: int = 32
+    generation_lease_ttl_seconds: int = 30
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -0,0 +1,125 @@
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import Pool, QueuePool
+
+from app.core.metrics import observe_db_pool_wait, observe_db_query, set_db_pool_usage
+from app.core.tracing import SPAN_KIND_CLIENT, new_span, tracing_enabled
+
+logger = logging.getLogger("app.db.slow")
+
+_MAX_FINGERPRINTS = 500
+_FINGERPRINT_LENGTH = 160
+_WHITESPACE = re.compile(r"\s+")
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|\$\d+|(?<![:\w]):\w+|%s")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_IDENT = r'(?:"\w+"|\w+)\.(?:"\w+"|\w+)(?: AS \w+)?'
+_COLUMN_LISTS = re.compile(rf"{_IDENT}(?:, {_IDENT})+")
+_seen_fingerprints: set[str] = set()
+
+
+@lru_cache(maxsize=2048)
+def statement_fingerprint(statement: str) -> str:
+    """Normalize SQL to a low-cardinality label: literals and placeholders become ``?``."""
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _PLACEHOLDER_LISTS.sub("(?)", text)
+    text = _COLUMN_LISTS.sub("…", text)
+    text = text[:_FINGERPRINT_LENGTH]
+    if text not in _seen_fingerprints:
+        if len(_seen_fingerprints) >= _MAX_FINGERPRINTS:
+            return "other"
+        _seen_fingerprints.add(text)
+    return text
+
+
+def timed_pool_class(database_url: str | URL) -> type[Pool] | None:
+    """Subclass the dialect's default queue pool so checkout wait time is measured.
+
+    Returns ``None`` for non-queue pools (e.g. SQLite ``:memory:`` uses ``StaticPool``), which
+    never make a caller wait.
+    """
+    url = make_url(database_url)
+    base = url.get_dialect().get_pool_class(url)
+    if not issubclass(base, QueuePool):
+        return None
+
+    class TimedQueuePool(base):  # type: ignore[misc, valid-type]
+        def _do_get(self) -> Any:
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                observe_db_pool_wait(time.perf_counter() - started)
+
+    # Keep the pool's logger under the ``sqlalchemy`` namespace (and its default WARN level).
+    TimedQueuePool.__name__ = TimedQueuePool.__qualname__ = f"Timed{base.__name__}"
+    TimedQueuePool.__module__ = base.__module__
+    return TimedQueuePool
+
+
+def _trace_statement(engine: Engine, fingerprint: str, started: float, rowcount: int) -> None:
+    span = new_span(f"db {fingerprint.split(' ', 1)[0]}", SPAN_KIND_CLIENT, started_perf=started)
+    if span is None:
+        return
+    span.set_attribute("db.system", engine.dialect.name)
+    span.set_attribute("db.statement", fingerprint)
+    if rowcount >= 0:
+        span.set_attribute("db.rows_affected", rowcount)
+    span.end()
+
+
+def instrument_engine(engine: Engine, slow_query_ms: int) -> None:
+    """Record per-statement latency and row counts, pool usage, and log slow statements."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["query_started_at"].pop()
+        elapsed = time.perf_counter() - started
+        rowcount = getattr(cursor, "rowcount", -1)
+        rowcount = rowcount if isinstance(rowcount, int) else -1
+        fingerprint = statement_fingerprint(statement)
+        observe_db_query(fingerprint, elapsed, rowcount)
+        if tracing_enabled():
+            _trace_statement(engine, fingerprint, started, rowcount)
+        duration_ms = elapsed * 1000
+        if slow_query_ms > 0 and duration_ms >= slow_query_ms:
+            logger.warning(
+                "Slow query %.2fms: %s",
+                duration_ms,
+                fingerprint,
+                extra={"duration_ms": round(duration_ms, 2), "statement": fingerprint, "rowcount": rowcount},
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context) -> None:
+        # Keep the start-time stack balanced when a statement fails.
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+
+        @event.listens_for(pool, "checkout")
+        def _on_checkout(*_args: Any) -> None:
+            set_db_pool_usage(pool.checkedout(), capacity)
+
+        @event.listens_for(pool, "checkin")
+        def _on_checkin(*_args: Any) -> None:
+            # The connection is returned to the queue right after this event fires.
+            set_db_pool_usage(max(0, pool.checkedout() - 1), capacity)
@@ -0,0 +1,107 @@
+import heapq
+import time
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+from app.core.metrics import record_cache_eviction, record_cache_lookup, register_cache
+from app.core.ttl_cache import approximate_size
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class ExpiringStore(Generic[K, V]):
+    """Key/value store with per-entry expiry backed by a dict and a min-heap of deadlines.
+
+    Reads are O(1) and check the entry's own deadline. Expired entries are removed lazily: heap
+    items whose deadline no longer matches the live entry (overwritten or deleted keys) are skipped
+    when they surface. ``purge_expired`` pops only what is due, so sweeping costs
+    O(expired * log n) instead of a full scan. When ``max_entries`` is exceeded the entries closest
+    to expiry are evicted first. A ``name`` exports lookups, evictions and size like ``TTLCache``.
+    """
+
+    def __init__(self, max_entries: int | None = None, name: str = "") -> None:
+        self.max_entries = max_entries if max_entries is None else max(1, int(max_entries))
+        self.name = name
+        self._entries: dict[K, tuple[V, float]] = {}
+        self._deadlines: list[tuple[float, int, K]] = []
+        self._sequence = 0
+        if name:
+            register_cache(name, self.__len__, self.size_bytes)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._record("miss")
+            return None
+        value, expire_at = entry
+        if expire_at <= time.monotonic():
+            del self._entries[key]
+            self._evicted("expired")
+            self._record("miss")
+            return None
+        self._record("hit")
+        return value
+
+    def set(self, key: K, value: V, ttl_seconds: float) -> None:
+        expire_at = time.monotonic() + max(0.0, float(ttl_seconds))
+        self._entries[key] = (value, expire_at)
+        self._sequence += 1
+        heapq.heappush(self._deadlines, (expire_at, self._sequence, key))
+        self.purge_expired()
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries and self._pop_earliest():
+                self._evicted("capacity")
+        self._compact_if_needed()
+
+    def pop(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._deadlines.clear()
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expire_at, _, key = heapq.heappop(self._deadlines)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expire_at:
+                del self._entries[key]
+                removed += 1
+        self._evicted("expired", removed)
+        return removed
+
+    def _pop_earliest(self) -> bool:
+        while self._deadlines:
+            expire_at, _, key = heapq.heappop(self._deadlines)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expire_at:
+                del self._entries[key]
+                return True
+        return False
+
+    def _compact_if_needed(self) -> None:
+        # Overwrites and deletes leave stale heap items behind; rebuild once they dominate.
+        if len(self._deadlines) <= 2 * len(self._entries) + 64:
+            return
+        self._deadlines = [
+            (expire_at, index, key) for index, (key, (_, expire_at)) in enumerate(self._entries.items())
+        ]
+        heapq.heapify(self._deadlines)
+        self._sequence = len(self._deadlines)
+
+    def size_bytes(self) -> int:
+        return sum(approximate_size(value) for value, _ in list(self._entries.values()))
+
+    def _record(self, result: str) -> None:
+        if self.name:
+            record_cache_lookup(self.name, result)
+
+    def _evicted(self, reason: str, count: int = 1) -> None:
+        if self.name:
+            record_cache_eviction(self.name, reason, count)
+
+    def __len__(self) -> int:
+        return len(self._entries)
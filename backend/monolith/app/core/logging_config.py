@@ -1,10 +1,107 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
+_STANDARD_RECORD_FIELDS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+_TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+_listener: QueueListener | None = None
 
-def configure_logging(level: str = "INFO") -> None:
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields are emitted as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, object] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_FIELDS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = record.stack_info
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """Enqueue records without formatting them on the caller's thread.
+
+    Only the message and traceback are rendered eagerly (args and tracebacks may reference
+    objects that change later); the final formatter runs on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestLogSampler:
+    """Decide which access-log lines to keep.
+
+    Errors (status >= 400) and requests slower than ``slow_ms`` are always logged; health and
+    metrics probes are sampled at ``probe_rate`` and everything else at ``success_rate``.
+    """
+
+    def __init__(self, success_rate: float, probe_rate: float, slow_ms: float, probe_paths: tuple[str, ...]) -> None:
+        self.success_rate = min(1.0, max(0.0, float(success_rate)))
+        self.probe_rate = min(1.0, max(0.0, float(probe_rate)))
+        self.slow_ms = max(0.0, float(slow_ms))
+        self.probe_paths = probe_paths
+
+    def should_log(self, path: str, status_code: int, duration_ms: float) -> bool:
+        if status_code >= 400 or duration_ms >= self.slow_ms:
+            return True
+        rate = self.probe_rate if path.startswith(self.probe_paths) else self.success_rate
+        return rate >= 1.0 or random.random() < rate
+
+
+def configure_logging(level: str = "INFO", log_format: str = "text") -> None:
+    """Route all records through a queue so request handlers never block on stream writes."""
+    global _listener
     numeric_level = getattr(logging, level.upper(), logging.INFO)
-    logging.basicConfig(
-        level=numeric_level,
-        format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
-    )
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if log_format.strip().lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(_TEXT_FORMAT))
+
+    if _listener is not None:
+        _listener.stop()
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in [item for item in root.handlers if isinstance(item, _DeferredFormatQueueHandler)]:
+        root.removeHandler(handler)
+    root.addHandler(_DeferredFormatQueueHandler(log_queue))
+    root.setLevel(numeric_level)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records; registered with ``atexit`` so the last lines are not lost."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
+atexit.register(shutdown_logging)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.core.metrics import observe_event_loop_lag, record_event_loop_stall
+
+logger = logging.getLogger("app.loop")
+
+
+class _StallWatchdog(threading.Thread):
+    """Daemon thread that snapshots the loop thread's stack when the loop stops ticking.
+
+    Reading another thread's frame via ``sys._current_frames`` does not pause it, so this is
+    cheap enough to leave on; it only does work once a stall passes the threshold.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stall_seconds: float) -> None:
+        super().__init__(name="event-loop-watchdog", daemon=True)
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.stall_seconds = stall_seconds
+        self.last_beat = time.monotonic()
+        self._stop_event = threading.Event()
+
+    def beat(self) -> None:
+        self.last_beat = time.monotonic()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        reported_beat = 0.0
+        while not self._stop_event.wait(self.stall_seconds / 2):
+            beat = self.last_beat
+            stalled_for = time.monotonic() - beat
+            if stalled_for < self.stall_seconds or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            task = asyncio.tasks._current_tasks.get(self.loop)  # read-only peek from another thread
+            logger.warning(
+                "Event loop blocked for %.0fms in task %s\n%s",
+                stalled_for * 1000,
+                task.get_name() if task is not None else "<none>",
+                "".join(traceback.format_stack(frame)),
+                extra={"stalled_ms": round(stalled_for * 1000, 2)},
+            )
+
+
+async def monitor_event_loop(interval_seconds: float, stall_ms: int, capture_stacks: bool) -> None:
+    """Sample scheduling lag every ``interval_seconds``; count (and optionally trace) stalls."""
+    loop = asyncio.get_running_loop()
+    stall_seconds = max(0.01, stall_ms / 1000)
+    watchdog: _StallWatchdog | None = None
+    if capture_stacks:
+        # The heartbeat only moves once per interval, so the watchdog must allow for it.
+        watchdog = _StallWatchdog(loop, stall_seconds + interval_seconds)
+        watchdog.start()
+    try:
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval_seconds)
+            lag = max(0.0, loop.time() - started - interval_seconds)
+            observe_event_loop_lag(lag)
+            if lag >= stall_seconds:
+                record_event_loop_stall()
+            if watchdog is not None:
+                watchdog.beat()
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
@@ -0,0 +1,112 @@
+import linecache
+import tracemalloc
+from typing import Any
+
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.metrics import cache_sizes, process_rss_bytes, set_stream_buffer_usage
+
+MEMORY_REPORT_GROUPS = ("lineno", "filename", "traceback")
+_IGNORED_ALLOCATION_FILES = (tracemalloc.__file__, linecache.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+class StreamBuffer:
+    """Collects streamed text chunks and keeps the in-flight buffer count and UTF-8 size on ``/metrics``.
+
+    Every live buffer counts: a generation streamed through the API holds two, the facade's copy
+    for parsing and the endpoint's copy for the chat history. Use as a context manager: leaving
+    it drops the chunks and removes them from the totals, also when the client disconnects
+    mid-stream, so read ``text()`` inside the block.
+    """
+
+    _in_flight = 0
+    _in_flight_bytes = 0
+
+    def __init__(self) -> None:
+        self._chunks: list[str] = []
+        self.size_bytes = 0
+        self._open = False
+
+    def __enter__(self) -> "StreamBuffer":
+        self._open = True
+        StreamBuffer._in_flight += 1
+        self._publish()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def append(self, chunk: str) -> None:
+        self._chunks.append(chunk)
+        size = len(chunk.encode())
+        self.size_bytes += size
+        if self._open:
+            StreamBuffer._in_flight_bytes += size
+            self._publish()
+
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def close(self) -> None:
+        if not self._open:
+            return
+        self._open = False
+        self._chunks = []
+        StreamBuffer._in_flight -= 1
+        StreamBuffer._in_flight_bytes -= self.size_bytes
+        self._publish()
+
+    @classmethod
+    def usage(cls) -> tuple[int, int]:
+        return cls._in_flight, cls._in_flight_bytes
+
+    @classmethod
+    def _publish(cls) -> None:
+        set_stream_buffer_usage(cls._in_flight, cls._in_flight_bytes)
+
+
+def configure_tracemalloc(frames: int) -> None:
+    """Start tracing allocations with ``frames`` frames per traceback; ``0`` leaves it off."""
+    if frames > 0 and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def _top_allocations(limit: int, group_by: str) -> list[dict[str, Any]]:
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, pattern) for pattern in _IGNORED_ALLOCATION_FILES]
+    )
+    top = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        # Frames run from the oldest to the allocation site; ``lineno``/``filename`` keep only the latter.
+        frames = [
+            frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+            for frame in stat.traceback
+        ]
+        top.append({"location": frames[-1], "traceback": frames, "sizeBytes": stat.size, "count": stat.count})
+    return top
+
+
+def build_memory_report(limit: int, group_by: str) -> dict[str, Any]:
+    """Process RSS, tracemalloc top allocators, per-cache sizes and in-flight stream buffers.
+
+    Taking a tracemalloc snapshot walks every traced block, so call this off the event loop.
+    """
+    if group_by not in MEMORY_REPORT_GROUPS:
+        raise BusinessException(ErrorCode.PARAMS_ERROR, f"Unsupported groupBy: {group_by}")
+    tracing = tracemalloc.is_tracing()
+    traced_current, traced_peak = tracemalloc.get_traced_memory()
+    streams, stream_bytes = StreamBuffer.usage()
+    return {
+        "rssBytes": process_rss_bytes(),
+        "tracemalloc": {
+            "tracing": tracing,
+            "currentBytes": traced_current,
+            "peakBytes": traced_peak,
+            "top": _top_allocations(limit, group_by) if tracing else [],
+        },
+        "caches": [
+            {"cache": name, "entries": entries, "sizeBytes": size}
+            for name, (entries, size) in sorted(cache_sizes().items(), key=lambda item: -(item[1][1] or 0))
+        ],
+        "streamBuffers": {"inFlight": streams, "sizeBytes": stream_bytes},
+    }
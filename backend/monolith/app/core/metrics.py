@@ -1,17 +1,68 @@
+import asyncio
+import bisect
+import json
+import logging
+import math
+import os
+import tempfile
 import threading
 import time
-from collections import defaultdict
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 
+from app.core.config import Settings
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.tracing import record_span
 
-_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.3, 0.5, 1.0, 2.0, 5.0)
-_LOCK = threading.Lock()
-_REQUEST_TOTAL: dict[tuple[str, str, str], int] = defaultdict(int)
-_REQUEST_DURATION_SUM: dict[tuple[str, str], float] = defaultdict(float)
-_REQUEST_DURATION_COUNT: dict[tuple[str, str], int] = defaultdict(int)
-_REQUEST_DURATION_BUCKET: dict[tuple[str, str, float], int] = defaultdict(int)
+logger = logging.getLogger(__name__)
+
+# Spans cached list calls (~1ms) through SSE generations (minutes).
+_DURATION_BUCKETS = (0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+_LLM_FIRST_TOKEN_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+_LLM_CHUNK_GAP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_LLM_GENERATION_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0, 320.0)
+_LLM_LABELS = ("model", "endpoint", "code_gen_type")
+_DB_QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_CACHE_LOAD_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+_STAGE_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Sparse histograms start at 2**(1/8) growth (~4.5% relative error) and halve resolution while a
+# series holds more than METRICS_SPARSE_MAX_BUCKETS buckets.
+_SPARSE_INITIAL_SCHEMA = 3
+_SPARSE_MIN_SCHEMA = -4
+_SPARSE_MAX_BUCKETS = 160
+_SPARSE_ZERO_THRESHOLD = 1e-9
+_METRIC_PREFIX = "python_ai_mother_"
+
+Labels = tuple[str, ...]
+
+# Counters and histograms are written to a per-thread shard, so observing never takes a lock;
+# shards are only merged when /metrics is scraped. Gauges hold a single value per label set and
+# are plain dict assignments.
+_THREAD_LOCAL = threading.local()
+_SHARDS: list[dict[str, dict[Labels, Any]]] = []
+_SHARDS_LOCK = threading.Lock()
+_FLUSH_LOCK = threading.Lock()
+_REGISTRY: dict[str, "_Metric"] = {}
+# (cache name, entry count, approximate bytes or None); read when metrics are collected.
+_CACHE_SOURCES: list[tuple[str, Callable[[], int], Callable[[], int | None] | None]] = []
+_multiproc_dir: Path | None = None
+_stale_snapshot_seconds = 30.0
+
+
+def _shard() -> dict[str, dict[Labels, Any]]:
+    shard = getattr(_THREAD_LOCAL, "shard", None)
+    if shard is None:
+        shard = {}
+        with _SHARDS_LOCK:
+            _SHARDS.append(shard)
+        _THREAD_LOCAL.shard = shard
+    return shard
 
 
 def _escape_label(value: str) -> str:
@@ -25,67 +76,642 @@ def _fmt_labels(labels: dict[str, str]) -> str:
     return "{" + ",".join(parts) + "}"
 
 
-def _observe_duration(method: str, route: str, seconds: float) -> None:
-    key = (method, route)
-    _REQUEST_DURATION_SUM[key] += seconds
-    _REQUEST_DURATION_COUNT[key] += 1
-    for boundary in _DURATION_BUCKETS:
-        if seconds <= boundary:
-            _REQUEST_DURATION_BUCKET[(method, route, boundary)] += 1
-    _REQUEST_DURATION_BUCKET[(method, route, float("inf"))] += 1
+def _clear_samples(name: str) -> None:
+    with _SHARDS_LOCK:
+        shards = list(_SHARDS)
+    for shard in shards:
+        shard.pop(name, None)
+
+
+class _Metric:
+    """Rendered series prefixes are cached per label set, so a scrape only formats numbers for
+    series it has seen before; series are emitted in first-seen order rather than sorted."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._header = f"# HELP {name} {help_text}\n# TYPE {name} {self.kind}\n"
+        self._prefixes: dict[Labels, Any] = {}
+        _REGISTRY[name] = self
+
+    def collect(self) -> dict[Labels, Any]:
+        merged: dict[Labels, Any] = {}
+        with _SHARDS_LOCK:
+            shards = list(_SHARDS)
+        for shard in shards:
+            self.merge_into(merged, list(shard.get(self.name, {}).items()))
+        return merged
+
+    def merge_into(self, merged: dict[Labels, Any], samples: Iterable[tuple[Labels, Any]]) -> None:
+        for labels, value in samples:
+            merged[labels] = merged.get(labels, 0) + value
+
+    def _label_text(self, labels: Labels) -> str:
+        return _fmt_labels(dict(zip(self.labelnames, labels)))
+
+    def render(self, samples: dict[Labels, Any]) -> str:
+        lines = [self._header]
+        for labels, value in samples.items():
+            prefix = self._prefixes.get(labels)
+            if prefix is None:
+                prefix = self._prefixes[labels] = f"{self.name}{self._label_text(labels)} "
+            lines.append(f"{prefix}{value}\n")
+        return "".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        samples = _shard().setdefault(self.name, {})
+        samples[labels] = samples.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Last-set value per label set; across workers the values of live processes are summed, or
+    maxed when ``aggregate="max"`` (for ratios)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), aggregate: str = "sum") -> None:
+        super().__init__(name, help_text, labelnames)
+        self.aggregate = aggregate
+        self._values: dict[Labels, float] = {} if self.labelnames else {(): 0}
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self._values[labels] = value
+
+    def collect(self) -> dict[Labels, Any]:
+        return dict(self._values)
+
+    def merge_into(self, merged: dict[Labels, Any], samples: Iterable[tuple[Labels, Any]]) -> None:
+        if self.aggregate != "max":
+            super().merge_into(merged, samples)
+            return
+        for labels, value in samples:
+            merged[labels] = max(merged.get(labels, value), value)
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> tuple[float, ...]:
+    return tuple(start * factor**index for index in range(max(1, count)))
+
+
+def _sparse_index(value: float, schema: int) -> int:
+    # Bucket ``i`` covers (base**(i-1), base**i] with base = 2 ** (2 ** -schema).
+    return math.ceil(math.log2(value) * 2**schema)
+
+
+def _downscale(counts: dict[int, int], steps: int) -> dict[int, int]:
+    if steps <= 0:
+        return dict(counts)
+    merged: dict[int, int] = {}
+    for index, count in counts.items():
+        target = -((-index) >> steps)
+        merged[target] = merged.get(target, 0) + count
+    return merged
+
+
+class Histogram(_Metric):
+    """Classic layout: per label set ``[count per bucket..., count above the last bucket, sum]``.
+
+    Sparse (exponential) layout: ``[schema, zero count, sum, {bucket index: count}]`` with only
+    populated buckets stored, like Prometheus native histograms. When a series holds more than
+    ``max_buckets`` buckets its resolution is halved, so memory stays bounded whatever the value
+    range. Sparse series are exposed as classic buckets at the populated boundaries.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = _DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = self.default_buckets = tuple(sorted(float(item) for item in buckets))
+        self.sparse = False
+        self.max_buckets = _SPARSE_MAX_BUCKETS
+
+    def configure(self, buckets: Iterable[float] | None = None, sparse: bool = False, max_buckets: int = 0) -> None:
+        layout = tuple(sorted({float(item) for item in buckets})) if buckets is not None else self.buckets
+        if (layout, sparse) != (self.buckets, self.sparse):
+            # Existing state has the old shape; start the series over.
+            _clear_samples(self.name)
+            self._prefixes.clear()
+        self.buckets = layout
+        self.sparse = sparse
+        self.max_buckets = max(8, int(max_buckets or _SPARSE_MAX_BUCKETS))
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        samples = _shard().setdefault(self.name, {})
+        state = samples.get(labels)
+        if self.sparse:
+            if state is None:
+                state = samples[labels] = [_SPARSE_INITIAL_SCHEMA, 0, 0.0, {}]
+            self._observe_sparse(state, value)
+            return
+        if state is None:
+            state = samples[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _observe_sparse(self, state: list[Any], value: float) -> None:
+        state[2] += value
+        if value <= _SPARSE_ZERO_THRESHOLD:
+            state[1] += 1
+            return
+        counts: dict[int, int] = state[3]
+        index = _sparse_index(value, state[0])
+        counts[index] = counts.get(index, 0) + 1
+        while len(counts) > self.max_buckets and state[0] > _SPARSE_MIN_SCHEMA:
+            counts = state[3] = _downscale(counts, 1)
+            state[0] -= 1
+
+    def merge_into(self, merged: dict[Labels, Any], samples: Iterable[tuple[Labels, Any]]) -> None:
+        if self.sparse:
+            for labels, state in samples:
+                self._merge_sparse(merged, labels, state)
+            return
+        width = len(self.buckets) + 2
+        for labels, state in samples:
+            if not isinstance(state, list) or len(state) != width:
+                continue  # written with another bucket layout (e.g. a snapshot from before a config change)
+            current = merged.get(labels)
+            if current is None:
+                merged[labels] = list(state)
+            else:
+                merged[labels] = [left + right for left, right in zip(current, state, strict=True)]
+
+    @staticmethod
+    def _merge_sparse(merged: dict[Labels, Any], labels: Labels, state: Any) -> None:
+        if not isinstance(state, list) or len(state) != 4:
+            return
+        schema, zero_count, total, raw_counts = state
+        # Bucket indexes become strings in worker snapshot files.
+        counts = {int(index): count for index, count in raw_counts.items()}
+        current = merged.get(labels)
+        if current is None:
+            merged[labels] = [schema, zero_count, total, counts]
+            return
+        target = min(schema, current[0])
+        combined = _downscale(current[3], current[0] - target)
+        for index, count in _downscale(counts, schema - target).items():
+            combined[index] = combined.get(index, 0) + count
+        merged[labels] = [target, current[1] + zero_count, current[2] + total, combined]
+
+    def _series_prefixes(self, labels: Labels) -> tuple[str, list[str], str, str, str]:
+        prefixes = self._prefixes.get(labels)
+        if prefixes is None:
+            base = dict(zip(self.labelnames, labels))
+            label_text = _fmt_labels(base)
+            bucket_base = f"{self.name}_bucket{label_text[:-1]}," if label_text else f"{self.name}_bucket{{"
+            prefixes = self._prefixes[labels] = (
+                bucket_base,
+                [f'{bucket_base}le="{boundary}"}} ' for boundary in self.buckets],
+                f'{bucket_base}le="+Inf"}} ',
+                f"{self.name}_sum{label_text} ",
+                f"{self.name}_count{label_text} ",
+            )
+        return prefixes
+
+    def render(self, samples: dict[Labels, Any]) -> str:
+        lines = [self._header]
+        for labels, state in samples.items():
+            bucket_base, bucket_prefixes, inf_prefix, sum_prefix, count_prefix = self._series_prefixes(labels)
+            cumulative = 0
+            if self.sparse:
+                schema, cumulative, total, counts = state
+                for index in sorted(counts):
+                    cumulative += counts[index]
+                    lines.append(f'{bucket_base}le="{2 ** (index * 2**-schema):.6g}"}} {cumulative}\n')
+            else:
+                total = state[-1]
+                for prefix, count in zip(bucket_prefixes, state, strict=False):
+                    cumulative += count
+                    lines.append(f"{prefix}{cumulative}\n")
+                cumulative += state[len(self.buckets)]
+            lines.append(f"{inf_prefix}{cumulative}\n{sum_prefix}{total}\n{count_prefix}{cumulative}\n")
+        return "".join(lines)
+
+
+_HTTP_REQUESTS = Counter(
+    "python_ai_mother_http_requests_total",
+    "Total HTTP requests",
+    ("method", "route", "status_code"),
+)
+_HTTP_DURATION = Histogram(
+    "python_ai_mother_http_request_duration_seconds",
+    "HTTP request duration in seconds",
+    ("method", "route"),
+)
+_CACHE_REQUESTS = Counter(
+    "python_ai_mother_cache_requests_total",
+    "Cache lookups by result: hit, miss, or stale (an expired entry served as a fallback)",
+    ("cache", "result"),
+)
+_CACHE_EVICTIONS = Counter(
+    "python_ai_mother_cache_evictions_total",
+    "Cache entries removed by the cache itself, by reason: capacity or expired",
+    ("cache", "reason"),
+)
+_CACHE_ENTRIES = Gauge(
+    "python_ai_mother_cache_entries",
+    "Entries currently held by in-process caches",
+    ("cache",),
+)
+_CACHE_BYTES = Gauge(
+    "python_ai_mother_cache_bytes",
+    "Approximate memory held by in-process cache values",
+    ("cache",),
+)
+_CACHE_LOAD = Histogram(
+    "python_ai_mother_cache_load_seconds",
+    "Time spent producing a value after a miss on every cache tier",
+    ("cache",),
+    buckets=_CACHE_LOAD_BUCKETS,
+)
+_PASSWORD_HASH_PENDING = Gauge(
+    "python_ai_mother_password_hash_pending",
+    "Password hash jobs queued or running",
+)
+_PASSWORD_HASH_WAIT = Histogram(
+    "python_ai_mother_password_hash_queue_wait_seconds",
+    "Time password hash jobs wait for a worker",
+    ("operation",),
+    buckets=_QUEUE_WAIT_BUCKETS,
+)
+_LLM_QUEUE_WAIT = Histogram(
+    "python_ai_mother_llm_queue_wait_seconds",
+    "Time LLM calls wait for the concurrency semaphore",
+    _LLM_LABELS,
+    buckets=_QUEUE_WAIT_BUCKETS,
+)
+_LLM_FIRST_TOKEN = Histogram(
+    "python_ai_mother_llm_time_to_first_token_seconds",
+    "Time from sending a streaming LLM request to the first content chunk",
+    _LLM_LABELS,
+    buckets=_LLM_FIRST_TOKEN_BUCKETS,
+)
+_LLM_CHUNK_GAP = Histogram(
+    "python_ai_mother_llm_inter_chunk_seconds",
+    "Gap between consecutive streamed LLM content chunks",
+    _LLM_LABELS,
+    buckets=_LLM_CHUNK_GAP_BUCKETS,
+)
+_LLM_GENERATION = Histogram(
+    "python_ai_mother_llm_generation_seconds",
+    "Total LLM generation time of successful calls, excluding queue wait",
+    _LLM_LABELS,
+    buckets=_LLM_GENERATION_BUCKETS,
+)
+_LLM_OUTPUT_CHARS = Counter(
+    "python_ai_mother_llm_output_chars_total",
+    "Characters of LLM output",
+    _LLM_LABELS,
+)
+_LLM_OUTPUT_TOKENS = Counter(
+    "python_ai_mother_llm_output_tokens_total",
+    "LLM completion tokens as reported by usage, or streamed chunks when usage is absent",
+    _LLM_LABELS,
+)
+_LLM_RETRIES = Counter(
+    "python_ai_mother_llm_retries_total",
+    "LLM call attempts that failed and were retried",
+    (*_LLM_LABELS, "reason"),
+)
+_LLM_ERRORS = Counter(
+    "python_ai_mother_llm_errors_total",
+    "LLM calls that failed after all retries",
+    (*_LLM_LABELS, "reason"),
+)
+_GENERATION_STAGE = Histogram(
+    "python_ai_mother_generation_stage_seconds",
+    "Wall-clock time of each code generation pipeline stage",
+    ("stage", "code_gen_type"),
+    buckets=_STAGE_BUCKETS,
+)
+_DB_QUERY = Histogram(
+    "python_ai_mother_db_query_seconds",
+    "Database statement execution time by normalized statement",
+    ("statement",),
+    buckets=_DB_QUERY_BUCKETS,
+)
+_DB_QUERY_ROWS = Counter(
+    "python_ai_mother_db_query_rows_total",
+    "Rows affected by database statements, where the driver reports a row count",
+    ("statement",),
+)
+_DB_POOL_WAIT = Histogram(
+    "python_ai_mother_db_pool_checkout_wait_seconds",
+    "Time spent obtaining a connection from the database pool",
+    buckets=_QUEUE_WAIT_BUCKETS,
+)
+_DB_POOL_IN_USE = Gauge(
+    "python_ai_mother_db_pool_in_use",
+    "Database connections currently checked out",
+)
+_DB_POOL_SATURATION = Gauge(
+    "python_ai_mother_db_pool_saturation_ratio",
+    "Checked-out connections divided by pool size plus max overflow",
+    aggregate="max",
+)
+_LOOP_LAG = Histogram(
+    "python_ai_mother_event_loop_lag_seconds",
+    "Delay between when a periodic timer was due and when the event loop ran it",
+    buckets=_LOOP_LAG_BUCKETS,
+)
+_LOOP_STALLS = Counter(
+    "python_ai_mother_event_loop_stalls_total",
+    "Lag samples above EVENT_LOOP_STALL_MS",
+)
+_PROCESS_RSS = Gauge(
+    "python_ai_mother_process_resident_memory_bytes",
+    "Resident set size of the worker process (summed across workers)",
+)
+_STREAM_BUFFERS = Gauge(
+    "python_ai_mother_stream_buffers_in_flight",
+    "Generation streams currently accumulating model output",
+)
+_STREAM_BUFFER_BYTES = Gauge(
+    "python_ai_mother_stream_buffer_bytes",
+    "Model output held by in-flight generation streams",
+)
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def record_http_request(method: str, route: str, status_code: int, seconds: float) -> None:
+    _HTTP_REQUESTS.inc((method, route, str(status_code)))
+    _HTTP_DURATION.observe(seconds, (method, route))
+
+
+def record_cache_lookup(cache: str, result: str, count: int = 1) -> None:
+    if count > 0:
+        _CACHE_REQUESTS.inc((cache, result), count)
+
+
+def record_cache_eviction(cache: str, reason: str, count: int = 1) -> None:
+    if count > 0:
+        _CACHE_EVICTIONS.inc((cache, reason), count)
+
+
+def observe_cache_load(cache: str, seconds: float) -> None:
+    _CACHE_LOAD.observe(max(0.0, seconds), (cache,))
+
+
+def register_cache(
+    name: str,
+    entries: Callable[[], int],
+    size_bytes: Callable[[], int | None] | None = None,
+) -> None:
+    """Export a cache's size as ``python_ai_mother_cache_entries``/``_bytes``, sampled at collection."""
+    _CACHE_SOURCES.append((name, entries, size_bytes))
+
+
+def cache_sizes() -> dict[str, tuple[int, int | None]]:
+    """Entry count and approximate bytes per registered cache name, summed over instances."""
+    sizes: dict[str, tuple[int, int | None]] = {}
+    for name, count, size_bytes in _CACHE_SOURCES:
+        entries, total = sizes.get(name, (0, None))
+        size = size_bytes() if size_bytes is not None else None
+        if size is not None:
+            total = (total or 0) + size
+        sizes[name] = (entries + count(), total)
+    return sizes
+
+
+def _refresh_cache_sizes() -> None:
+    for name, (entries, size) in cache_sizes().items():
+        _CACHE_ENTRIES.set(entries, (name,))
+        if size is not None:
+            _CACHE_BYTES.set(size, (name,))
+
+
+def process_rss_bytes() -> int | None:
+    """Current resident set size from ``/proc/self/statm``; ``None`` where procfs is unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _refresh_process_memory() -> None:
+    rss = process_rss_bytes()
+    if rss is not None:
+        _PROCESS_RSS.set(rss)
+
+
+def set_stream_buffer_usage(in_flight: int, size_bytes: int) -> None:
+    _STREAM_BUFFERS.set(in_flight)
+    _STREAM_BUFFER_BYTES.set(size_bytes)
+
+
+def observe_password_hash_wait(operation: str, seconds: float) -> None:
+    _PASSWORD_HASH_WAIT.observe(max(0.0, seconds), (operation,))
+
+
+def set_password_hash_pending(pending: int) -> None:
+    _PASSWORD_HASH_PENDING.set(pending)
+
+
+def observe_llm_queue_wait(labels: Labels, seconds: float) -> None:
+    _LLM_QUEUE_WAIT.observe(max(0.0, seconds), labels)
+
+
+def observe_llm_first_token(labels: Labels, seconds: float) -> None:
+    _LLM_FIRST_TOKEN.observe(max(0.0, seconds), labels)
+
+
+def observe_llm_chunk_gap(labels: Labels, seconds: float) -> None:
+    _LLM_CHUNK_GAP.observe(max(0.0, seconds), labels)
+
+
+def observe_llm_generation(labels: Labels, seconds: float, output_chars: int, output_tokens: int) -> None:
+    _LLM_GENERATION.observe(max(0.0, seconds), labels)
+    _LLM_OUTPUT_CHARS.inc(labels, output_chars)
+    _LLM_OUTPUT_TOKENS.inc(labels, output_tokens)
+
+
+def record_llm_failure(labels: Labels, reason: str, retrying: bool) -> None:
+    (_LLM_RETRIES if retrying else _LLM_ERRORS).inc((*labels, reason))
+
+
+def observe_db_query(statement: str, seconds: float, rowcount: int) -> None:
+    _DB_QUERY.observe(max(0.0, seconds), (statement,))
+    if rowcount > 0:
+        _DB_QUERY_ROWS.inc((statement,), rowcount)
+
+
+def observe_db_pool_wait(seconds: float) -> None:
+    _DB_POOL_WAIT.observe(max(0.0, seconds))
+
+
+def set_db_pool_usage(in_use: int, capacity: int) -> None:
+    _DB_POOL_IN_USE.set(in_use)
+    _DB_POOL_SATURATION.set(round(in_use / capacity, 4) if capacity > 0 else 0)
+
+
+def observe_event_loop_lag(seconds: float) -> None:
+    _LOOP_LAG.observe(seconds)
+
+
+def record_event_loop_stall() -> None:
+    _LOOP_STALLS.inc()
+
+
+def finish_generation_stage(stage: str, code_gen_type: str, started_at: float) -> float:
+    """Observe (and trace) a stage that began at ``started_at`` (``time.perf_counter()``); returns ms."""
+    seconds = max(0.0, time.perf_counter() - started_at)
+    _GENERATION_STAGE.observe(seconds, (stage, code_gen_type or "none"))
+    record_span(f"generation.{stage}", started_at, {"code_gen_type": code_gen_type or "none"})
+    return round(seconds * 1000, 2)
+
+
+def _snapshot() -> dict[str, list[list[Any]]]:
+    _refresh_cache_sizes()
+    _refresh_process_memory()
+    return {
+        name: [[list(labels), value] for labels, value in metric.collect().items()]
+        for name, metric in _REGISTRY.items()
+    }
+
+
+def flush_metrics() -> None:
+    """Write this worker's snapshot to ``metrics_<pid>.json`` in the multiprocess directory."""
+    if _multiproc_dir is None:
+        return
+    target = _multiproc_dir / f"metrics_{os.getpid()}.json"
+    # The periodic flush and scrape-time flushes run on different threads: serialize them so an
+    # older snapshot never replaces a newer one, and give each write its own temp file.
+    with _FLUSH_LOCK:
+        payload = json.dumps({"pid": os.getpid(), "metrics": _snapshot()})
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=_multiproc_dir, prefix=f"{target.stem}.", suffix=".tmp", delete=False
+        ) as temp:
+            temp.write(payload)
+        try:
+            os.replace(temp.name, target)
+        except OSError:
+            Path(temp.name).unlink(missing_ok=True)
+            raise
+
+
+def _flush_quietly() -> None:
+    try:
+        flush_metrics()
+    except OSError as exc:
+        logger.warning("Failed to flush metrics snapshot: %s", exc)
+
+
+async def flush_metrics_periodically(interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await asyncio.to_thread(_flush_quietly)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _collect_all() -> dict[str, dict[Labels, Any]]:
+    if _multiproc_dir is None:
+        _refresh_cache_sizes()
+        _refresh_process_memory()
+        return {name: metric.collect() for name, metric in _REGISTRY.items()}
+
+    _flush_quietly()
+    merged: dict[str, dict[Labels, Any]] = {name: {} for name in _REGISTRY}
+    now = time.time()
+    for path in sorted(_multiproc_dir.glob("metrics_*.json")):
+        try:
+            stale = now - path.stat().st_mtime > _stale_snapshot_seconds
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if stale or not _pid_alive(int(snapshot.get("pid", 0))):
+            # Exited workers and files left by an earlier run (whose PID may since have been reused)
+            # drop out. A live worker that merely missed flushes writes its full snapshot again.
+            path.unlink(missing_ok=True)
+            continue
+        for name, samples in snapshot.get("metrics", {}).items():
+            metric = _REGISTRY.get(name)
+            if metric is None:
+                continue
+            metric.merge_into(merged[name], [(tuple(labels), value) for labels, value in samples])
+    return merged
 
 
 def _render_metrics() -> str:
-    lines: list[str] = []
-    lines.append("# HELP python_ai_mother_http_requests_total Total HTTP requests")
-    lines.append("# TYPE python_ai_mother_http_requests_total counter")
-    for (method, route, status_code), count in sorted(_REQUEST_TOTAL.items()):
-        labels = _fmt_labels({"method": method, "route": route, "status_code": status_code})
-        lines.append(f"python_ai_mother_http_requests_total{labels} {count}")
-
-    lines.append("# HELP python_ai_mother_http_request_duration_seconds HTTP request duration in seconds")
-    lines.append("# TYPE python_ai_mother_http_request_duration_seconds histogram")
-    duration_keys = sorted(_REQUEST_DURATION_COUNT.keys())
-    for method, route in duration_keys:
-        cumulative = 0
-        for boundary in _DURATION_BUCKETS:
-            cumulative += _REQUEST_DURATION_BUCKET.get((method, route, boundary), 0)
-            labels = _fmt_labels({"method": method, "route": route, "le": str(boundary)})
-            lines.append(f"python_ai_mother_http_request_duration_seconds_bucket{labels} {cumulative}")
-        inf_count = _REQUEST_DURATION_BUCKET.get((method, route, float("inf")), 0)
-        labels_inf = _fmt_labels({"method": method, "route": route, "le": "+Inf"})
-        lines.append(f"python_ai_mother_http_request_duration_seconds_bucket{labels_inf} {inf_count}")
-        labels = _fmt_labels({"method": method, "route": route})
-        lines.append(
-            f"python_ai_mother_http_request_duration_seconds_sum{labels} {_REQUEST_DURATION_SUM[(method, route)]}"
-        )
-        lines.append(f"python_ai_mother_http_request_duration_seconds_count{labels} {_REQUEST_DURATION_COUNT[(method, route)]}")
-    return "\n".join(lines) + "\n"
-
-
-def register_metrics(app: FastAPI) -> None:
-    @app.middleware("http")
-    async def metrics_middleware(request: Request, call_next: Callable):
-        start = time.perf_counter()
-        method = request.method
-        route = request.url.path
-        status_code = 500
+    samples = _collect_all()
+    return "".join(metric.render(samples[name]) for name, metric in _REGISTRY.items())
 
+
+def parse_histogram_layouts(raw: str) -> dict[str, tuple[float, ...] | None]:
+    """Parse ``family=b1,b2,...`` or ``family=sparse`` entries separated by ``;``.
+
+    ``family`` is a histogram name with or without the ``python_ai_mother_`` prefix, e.g.
+    ``http_request_duration_seconds=0.005,0.05,0.5,5,60;llm_generation_seconds=sparse``.
+    ``exp:start:factor:count`` expands to exponential boundaries. ``None`` means sparse.
+    """
+    layouts: dict[str, tuple[float, ...] | None] = {}
+    for item in raw.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        family, _, spec = item.partition("=")
+        name = family.strip()
+        if not name.startswith(_METRIC_PREFIX):
+            name = _METRIC_PREFIX + name
+        if not isinstance(_REGISTRY.get(name), Histogram):
+            raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Unknown histogram in METRICS_HISTOGRAM_BUCKETS: {family}")
+        spec = spec.strip().lower()
         try:
-            response = await call_next(request)
-            route_template = request.scope.get("route")
-            if route_template is not None and hasattr(route_template, "path"):
-                route = str(route_template.path)
-            status_code = response.status_code
-            return response
-        finally:
-            elapsed = max(0.0, time.perf_counter() - start)
-            with _LOCK:
-                _REQUEST_TOTAL[(method, route, str(status_code))] += 1
-                _observe_duration(method, route, elapsed)
+            if spec == "sparse":
+                layouts[name] = None
+            elif spec.startswith("exp:"):
+                start, factor, count = spec[4:].split(":")
+                layouts[name] = exponential_buckets(float(start), float(factor), int(count))
+            else:
+                layouts[name] = tuple(float(value) for value in spec.split(",") if value.strip())
+        except ValueError as exc:
+            raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Invalid histogram buckets: {item}") from exc
+        if layouts[name] == ():
+            raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Invalid histogram buckets: {item}")
+    return layouts
+
+
+def configure_histograms(settings: Settings) -> None:
+    """Apply ``METRICS_HISTOGRAM_MODE`` and per-family ``METRICS_HISTOGRAM_BUCKETS`` overrides."""
+    default_sparse = settings.metrics_histogram_mode.strip().lower() == "sparse"
+    layouts = parse_histogram_layouts(settings.metrics_histogram_buckets)
+    for name, metric in _REGISTRY.items():
+        if not isinstance(metric, Histogram):
+            continue
+        layout = layouts.get(name, metric.default_buckets)
+        sparse = layout is None or (default_sparse and name not in layouts)
+        metric.configure(layout, sparse=sparse, max_buckets=settings.metrics_sparse_max_buckets)
+
+
+def register_metrics(app: FastAPI, settings: Settings) -> None:
+    global _multiproc_dir, _stale_snapshot_seconds
+    configure_histograms(settings)
+    if settings.metrics_multiproc_dir:
+        _multiproc_dir = Path(settings.metrics_multiproc_dir)
+        _stale_snapshot_seconds = max(30.0, 3.0 * settings.metrics_flush_interval_seconds)
+        _multiproc_dir.mkdir(parents=True, exist_ok=True)
 
     @app.get("/metrics", include_in_schema=False)
     async def metrics_endpoint() -> Response:
-        with _LOCK:
-            text = _render_metrics()
+        text = await asyncio.to_thread(_render_metrics) if _multiproc_dir is not None else _render_metrics()
         return Response(content=text, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,14 +2,102 @@ import logging
 import time
 from uuid import uuid4
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import Settings
+from app.core.logging_config import RequestLogSampler
+from app.core.metrics import record_http_request
+from app.core.tracing import SPAN_KIND_SERVER, activate_span, new_span, parse_traceparent
 
 logger = logging.getLogger("app.request")
 
 
+class RequestContextMiddleware:
+    """Pure ASGI middleware for request id, timing headers, access log and HTTP metrics.
+
+    It only intercepts ``http.response.start`` to add headers, so response bodies (including SSE
+    chunks) pass straight through without an extra task, queue or body wrapper per request.
+    Access-log lines go through ``sampler`` when one is given. When tracing is on, the request
+    runs inside a server span that continues an incoming W3C ``traceparent``.
+    """
+
+    def __init__(self, app: ASGIApp, sampler: RequestLogSampler | None = None) -> None:
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header(scope, b"x-request-id") or str(uuid4())
+        start = time.perf_counter()
+        status_code = 500
+        span = new_span(
+            f"{scope['method']} {scope['path']}",
+            SPAN_KIND_SERVER,
+            parent=parse_traceparent(_header(scope, b"traceparent")),
+            started_perf=start,
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time-Ms"] = f"{(time.perf_counter() - start) * 1000:.2f}"
+                if span is not None:
+                    headers["X-Trace-Id"] = span.context.trace_id
+            await send(message)
+
+        try:
+            with activate_span(span):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = max(0.0, time.perf_counter() - start)
+            # The router stores the matched route on the shared scope; fall back to the raw path.
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            record_http_request(scope["method"], str(route), status_code, elapsed)
+            if span is not None:
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.request.method", scope["method"])
+                span.set_attribute("url.path", scope["path"])
+                span.set_attribute("http.route", str(route))
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.record_error(f"HTTP {status_code}")
+                span.end()
+            duration_ms = elapsed * 1000
+            if self.sampler is None or self.sampler.should_log(scope["path"], status_code, duration_ms):
+                logger.info(
+                    "%s %s -> %s %.2fms request_id=%s",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    duration_ms,
+                    request_id,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(duration_ms, 2),
+                        "request_id": request_id,
+                        "trace_id": span.context.trace_id if span is not None else None,
+                    },
+                )
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
 def register_middlewares(app: FastAPI, settings: Settings) -> None:
     app.add_middleware(
         CORSMiddleware,
@@ -18,24 +106,10 @@ def register_middlewares(app: FastAPI, settings: Settings) -> None:
         allow_methods=["*"],
         allow_headers=["*"],
     )
-
-    @app.middleware("http")
-    async def request_log_middleware(request: Request, call_next):
-        request_id = request.headers.get("X-Request-ID", str(uuid4()))
-        start = time.perf_counter()
-        response = await call_next(request)
-        duration_ms = (time.perf_counter() - start) * 1000
-
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time-Ms"] = f"{duration_ms:.2f}"
-
-        logger.info(
-            "%s %s -> %s %.2fms request_id=%s",
-            request.method,
-            request.url.path,
-            response.status_code,
-            duration_ms,
-            request_id,
-        )
-        return response
-
+    sampler = RequestLogSampler(
+        success_rate=settings.request_log_sample_rate,
+        probe_rate=settings.request_log_probe_sample_rate,
+        slow_ms=settings.request_log_slow_ms,
+        probe_paths=(f"{settings.api_prefix}/health", "/metrics"),
+    )
+    app.add_middleware(RequestContextMiddleware, sampler=sampler)
@@ -0,0 +1,101 @@
+import json
+import logging
+from math import ceil
+
+from sqlalchemy import Select, literal_column, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+COUNT_MODE_EXACT = "exact"
+COUNT_MODE_CACHED = "cached"
+COUNT_MODE_ESTIMATED = "estimated"
+COUNT_MODE_NONE = "none"
+
+SUPPORTED_COUNT_MODES = {
+    COUNT_MODE_EXACT,
+    COUNT_MODE_CACHED,
+    COUNT_MODE_ESTIMATED,
+    COUNT_MODE_NONE,
+}
+
+# Same sentinel MyBatis-Flex pages use for "total not computed".
+UNKNOWN_TOTAL = -1
+
+
+def normalize_count_mode(count_mode: str | None) -> str:
+    value = (count_mode or COUNT_MODE_EXACT).strip().lower()
+    if value not in SUPPORTED_COUNT_MODES:
+        raise BusinessException(ErrorCode.PARAMS_ERROR, f"Unsupported countMode: {value}")
+    return value
+
+
+def build_total_page(total_row: int, page_size: int) -> int:
+    if total_row < 0:
+        return UNKNOWN_TOTAL
+    return ceil(total_row / page_size) if total_row > 0 else 0
+
+
+class PageCounter:
+    """Resolve list totals according to the requested ``countMode``.
+
+    ``cached`` memoizes exact counts per filter set for a short TTL. ``estimated`` reads the
+    planner's row estimate where the dialect exposes one (PostgreSQL) and falls back to
+    ``cached`` elsewhere. ``none`` skips the count query and returns ``UNKNOWN_TOTAL``.
+    """
+
+    _memory_cache: TTLCache[str, int] = TTLCache(max_size=4096, name="page_count")
+
+    def __init__(self, ttl_seconds: int = 10) -> None:
+        self.ttl_seconds = max(1, int(ttl_seconds))
+
+    async def count(self, db: AsyncSession, count_stmt: Select, count_mode: str | None) -> int:
+        mode = normalize_count_mode(count_mode)
+        if mode == COUNT_MODE_NONE:
+            return UNKNOWN_TOTAL
+        if mode == COUNT_MODE_ESTIMATED:
+            estimated = await self._estimate(db, count_stmt)
+            if estimated is not None:
+                return estimated
+            mode = COUNT_MODE_CACHED
+        if mode == COUNT_MODE_EXACT:
+            return int(await db.scalar(count_stmt) or 0)
+
+        async def load() -> int:
+            return int(await db.scalar(count_stmt) or 0)
+
+        return await self._memory_cache.get_or_load(self._cache_key(count_stmt), load, self.ttl_seconds)
+
+    @staticmethod
+    def _cache_key(count_stmt: Select) -> str:
+        compiled = count_stmt.compile()
+        params = sorted((key, repr(value)) for key, value in compiled.params.items())
+        return f"{compiled}|{params}"
+
+    @staticmethod
+    async def _estimate(db: AsyncSession, count_stmt: Select) -> int | None:
+        bind = db.bind
+        if bind is None or bind.dialect.name != "postgresql":
+            return None
+        froms = count_stmt.get_final_froms()
+        if not froms:
+            return None
+        row_stmt = select(literal_column("1")).select_from(froms[0])
+        if count_stmt.whereclause is not None:
+            row_stmt = row_stmt.where(count_stmt.whereclause)
+        try:
+            sql = str(row_stmt.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+            connection = await db.connection()
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return max(0, int(plan[0]["Plan"]["Plan Rows"]))
+        except (SQLAlchemyError, KeyError, IndexError, TypeError, ValueError) as exc:
+            logger.warning("Count estimate failed, fallback to cached count: %s", exc)
+            return None
@@ -0,0 +1,190 @@
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.expiring_store import ExpiringStore
+
+RATE_LIMIT_FIXED_WINDOW = "fixed_window"
+RATE_LIMIT_TOKEN_BUCKET = "token_bucket"
+RATE_LIMIT_SLIDING_LOG = "sliding_log"
+RATE_LIMIT_GCRA = "gcra"
+
+SUPPORTED_RATE_LIMIT_ALGORITHMS = {
+    RATE_LIMIT_FIXED_WINDOW,
+    RATE_LIMIT_TOKEN_BUCKET,
+    RATE_LIMIT_SLIDING_LOG,
+    RATE_LIMIT_GCRA,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitRule:
+    limit: int
+    window_seconds: int
+
+    @property
+    def window_ms(self) -> int:
+        return self.window_seconds * 1000
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after_ms: int = 0
+
+
+def normalize_rate_limit_algorithm(algorithm: str | None) -> str:
+    value = (algorithm or RATE_LIMIT_GCRA).strip().lower()
+    if value not in SUPPORTED_RATE_LIMIT_ALGORITHMS:
+        raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Unsupported rate limit algorithm: {value}")
+    return value
+
+
+def parse_rate_limit_routes(raw: str) -> dict[str, RateLimitRule]:
+    """Parse ``route:limit/windowSeconds`` pairs, e.g. ``gen-code:20/60,gen-workflow:5/60``."""
+    rules: dict[str, RateLimitRule] = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        route, _, spec = item.partition(":")
+        limit, _, window = spec.partition("/")
+        try:
+            rules[route.strip()] = RateLimitRule(limit=max(1, int(limit)), window_seconds=max(1, int(window)))
+        except ValueError as exc:
+            raise BusinessException(ErrorCode.SYSTEM_ERROR, f"Invalid rate limit route rule: {item}") from exc
+    return rules
+
+
+# Every script takes KEYS[1] = bucket key, ARGV[1] = limit, ARGV[2] = window in ms, ARGV[3] = a
+# unique member id and optional ARGV[4] = tokens wanted (default 1). The clock is read from Redis
+# TIME so all workers share one time source. Scripts grant up to the wanted count and return
+# {granted, retry_after_ms}, so a worker can lease a batch of tokens in one round-trip.
+_LUA_NOW_MS = (
+    "local t = redis.call('TIME') local now = t[1] * 1000 + math.floor(t[2] / 1000) "
+    "local want = tonumber(ARGV[4] or '1') "
+)
+
+LUA_SCRIPTS: dict[str, str] = {
+    RATE_LIMIT_FIXED_WINDOW: _LUA_NOW_MS
+    + """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local grant = math.min(want, tonumber(ARGV[1]) - current)
+if grant > 0 then
+  if redis.call('INCRBY', KEYS[1], grant) == grant then redis.call('PEXPIRE', KEYS[1], ARGV[2]) end
+  return {grant, 0}
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then redis.call('PEXPIRE', KEYS[1], ARGV[2]) ttl = tonumber(ARGV[2]) end
+return {0, ttl}
+""",
+    RATE_LIMIT_TOKEN_BUCKET: _LUA_NOW_MS
+    + """
+local capacity = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local rate = capacity / window_ms
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then tokens = capacity ts = now end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local grant = math.min(want, math.floor(tokens))
+local retry = 0
+if grant >= 1 then
+  tokens = tokens - grant
+else
+  grant = 0
+  retry = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window_ms)
+return {grant, retry}
+""",
+    RATE_LIMIT_SLIDING_LOG: _LUA_NOW_MS
+    + """
+local limit = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window_ms)
+local grant = math.min(want, limit - redis.call('ZCARD', KEYS[1]))
+if grant > 0 then
+  for i = 1, grant do redis.call('ZADD', KEYS[1], now, ARGV[3] .. ':' .. i) end
+  redis.call('PEXPIRE', KEYS[1], window_ms)
+  return {grant, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, math.max(1, tonumber(oldest[2]) + window_ms - now)}
+""",
+    RATE_LIMIT_GCRA: _LUA_NOW_MS
+    + """
+local window_ms = tonumber(ARGV[2])
+local interval = window_ms / tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then tat = now end
+local grant = math.min(want, math.floor((now + window_ms - tat) / interval + 1e-9))
+if grant < 1 then return {0, math.ceil(tat + interval - window_ms - now)} end
+local new_tat = tat + grant * interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.max(1, math.ceil(new_tat - now)))
+return {grant, 0}
+""",
+}
+
+
+class MemoryRateLimiter:
+    """Single-process equivalents of ``LUA_SCRIPTS`` for when Redis cannot run scripts.
+
+    Grants one token per call. State lives in the caller-owned ``ExpiringStore``, which drops
+    expired keys from its deadline heap as they fall due instead of scanning every key; callers
+    serialize access per key (the service holds striped ``asyncio.Lock`` objects).
+    """
+
+    def __init__(self, store: ExpiringStore[str, Any]) -> None:
+        self.store = store
+
+    def _save(self, key: str, state: Any, expire_at_ms: float, now_ms: float) -> None:
+        self.store.set(key, state, (expire_at_ms - now_ms) / 1000)
+
+    def check(self, algorithm: str, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        now_ms = time.monotonic() * 1000
+        state = self.store.get(key)
+
+        if algorithm == RATE_LIMIT_FIXED_WINDOW:
+            count, window_end = state or (0, now_ms + rule.window_ms)
+            count += 1
+            self._save(key, (count, window_end), window_end, now_ms)
+            if count <= rule.limit:
+                return RateLimitDecision(True)
+            return RateLimitDecision(False, math.ceil(window_end - now_ms))
+
+        if algorithm == RATE_LIMIT_TOKEN_BUCKET:
+            rate = rule.limit / rule.window_ms
+            tokens, ts = state or (float(rule.limit), now_ms)
+            tokens = min(float(rule.limit), tokens + max(0.0, now_ms - ts) * rate)
+            if tokens >= 1:
+                self._save(key, (tokens - 1, now_ms), now_ms + rule.window_ms, now_ms)
+                return RateLimitDecision(True)
+            self._save(key, (tokens, now_ms), now_ms + rule.window_ms, now_ms)
+            return RateLimitDecision(False, math.ceil((1 - tokens) / rate))
+
+        if algorithm == RATE_LIMIT_SLIDING_LOG:
+            log: deque[float] = state if state is not None else deque()
+            while log and log[0] <= now_ms - rule.window_ms:
+                log.popleft()
+            if len(log) < rule.limit:
+                log.append(now_ms)
+                self._save(key, log, now_ms + rule.window_ms, now_ms)
+                return RateLimitDecision(True)
+            self._save(key, log, log[-1] + rule.window_ms, now_ms)
+            return RateLimitDecision(False, max(1, math.ceil(log[0] + rule.window_ms - now_ms)))
+
+        interval = rule.window_ms / rule.limit
+        tat = max(state if state is not None else now_ms, now_ms)
+        new_tat = tat + interval
+        allow_at = new_tat - rule.window_ms
+        if now_ms < allow_at:
+            return RateLimitDecision(False, math.ceil(allow_at - now_ms))
+        self._save(key, new_tat, new_tat, now_ms)
+        return RateLimitDecision(True)
@@ -1,3 +1,5 @@
+from typing import Any
+
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     async_sessionmaker,
@@ -7,6 +9,7 @@ from sqlalchemy.ext.asyncio import (
 from redis.asyncio import Redis
 
 from app.core.config import Settings
+from app.core.db_metrics import instrument_engine, timed_pool_class
 
 
 class ResourceManager:
@@ -18,11 +21,17 @@ class ResourceManager:
 
     async def start(self) -> None:
         if self.engine is None:
+            engine_options: dict[str, Any] = {}
+            pool_class = timed_pool_class(self.settings.database_url)
+            if pool_class is not None:
+                engine_options["poolclass"] = pool_class
             self.engine = create_async_engine(
                 self.settings.database_url,
                 echo=self.settings.debug,
                 pool_pre_ping=True,
+                **engine_options,
             )
+            instrument_engine(self.engine.sync_engine, slow_query_ms=self.settings.db_slow_query_ms)
             self.session_factory = async_sessionmaker(
                 bind=self.engine,
                 expire_on_commit=False,
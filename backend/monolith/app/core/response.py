@@ -1,5 +1,7 @@
+import json
 from typing import Generic, Optional, TypeVar
 
+from fastapi.responses import Response
 from pydantic import BaseModel
 
 from app.core.error_codes import ErrorCode
@@ -20,3 +22,9 @@ def success_response(data: Optional[T] = None, message: str = "ok") -> BaseRespo
 def error_response(code: ErrorCode, message: str, data: Optional[T] = None) -> BaseResponse[T]:
     return BaseResponse(code=int(code), message=message, data=data)
 
+
+def success_json_response(data_json: bytes, message: str = "ok") -> Response:
+    """Wrap pre-serialized JSON ``data`` in the standard envelope without re-validating it."""
+    head = f'{{"code":{int(ErrorCode.SUCCESS)},"message":{json.dumps(message, ensure_ascii=False)},"data":'
+    body = head.encode("utf-8") + data_json + b"}"
+    return Response(content=body, media_type="application/json")
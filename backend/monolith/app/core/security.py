@@ -1,8 +1,30 @@
+import asyncio
+import base64
 import hashlib
 import hmac
+import secrets
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.metrics import observe_password_hash_wait, set_password_hash_pending
+
+T = TypeVar("T")
+
+PASSWORD_ALGORITHM_PBKDF2 = "pbkdf2_sha256"
+PASSWORD_ALGORITHM_SCRYPT = "scrypt"
+SUPPORTED_PASSWORD_ALGORITHMS = {PASSWORD_ALGORITHM_PBKDF2, PASSWORD_ALGORITHM_SCRYPT}
+# scrypt stores N in the cost field; block size and parallelism are fixed.
+_SCRYPT_R = 8
+_SCRYPT_P = 1
 
 
 def hash_password(raw_password: str, salt: str) -> str:
+    """Legacy format: hex PBKDF2 digest with the deployment-wide ``password_salt``."""
     derived = hashlib.pbkdf2_hmac(
         "sha256",
         raw_password.encode("utf-8"),
@@ -15,3 +37,122 @@ def hash_password(raw_password: str, salt: str) -> str:
 def verify_password(raw_password: str, hashed_password: str, salt: str) -> bool:
     current_hash = hash_password(raw_password, salt)
     return hmac.compare_digest(current_hash, hashed_password)
+
+
+def _derive(algorithm: str, raw_password: str, salt: str, cost: int) -> bytes:
+    if algorithm == PASSWORD_ALGORITHM_PBKDF2:
+        return hashlib.pbkdf2_hmac("sha256", raw_password.encode("utf-8"), salt.encode("utf-8"), cost)
+    if algorithm == PASSWORD_ALGORITHM_SCRYPT:
+        return hashlib.scrypt(
+            raw_password.encode("utf-8"),
+            salt=salt.encode("utf-8"),
+            n=cost,
+            r=_SCRYPT_R,
+            p=_SCRYPT_P,
+            maxmem=256 * cost * _SCRYPT_R * _SCRYPT_P,
+            dklen=32,
+        )
+    raise ValueError(f"Unsupported password algorithm: {algorithm}")
+
+
+def make_password_hash(raw_password: str, algorithm: str = PASSWORD_ALGORITHM_PBKDF2, cost: int = 200_000) -> str:
+    """Hash with a per-user random salt as ``algorithm$cost$salt$digest``."""
+    salt = secrets.token_hex(16)
+    digest = base64.b64encode(_derive(algorithm, raw_password, salt, cost)).decode("ascii")
+    return f"{algorithm}${cost}${salt}${digest}"
+
+
+def check_password_hash(raw_password: str, stored_hash: str, legacy_salt: str) -> bool:
+    """Verify against the self-describing format, or the legacy hex digest when there is no ``$``."""
+    if "$" not in stored_hash:
+        return verify_password(raw_password, stored_hash, legacy_salt)
+    parts = stored_hash.split("$")
+    if len(parts) != 4 or parts[0] not in SUPPORTED_PASSWORD_ALGORITHMS:
+        return False
+    algorithm, cost, salt, digest = parts
+    try:
+        expected = base64.b64decode(digest.encode("ascii"), validate=True)
+        derived = _derive(algorithm, raw_password, salt, int(cost))
+    except ValueError:
+        return False
+    return hmac.compare_digest(derived, expected)
+
+
+def password_needs_rehash(stored_hash: str, algorithm: str, cost: int) -> bool:
+    parts = stored_hash.split("$")
+    if len(parts) != 4:
+        return True
+    return parts[0] != algorithm or parts[1] != str(cost)
+
+
+class PasswordHasher:
+    """Run password hashing on a dedicated, bounded thread pool.
+
+    ``hashlib.pbkdf2_hmac`` releases the GIL, so worker threads keep the event loop responsive
+    without the pickling overhead of a process pool. Calls beyond ``max_pending`` queued jobs are
+    rejected instead of piling up behind the pool.
+
+    New hashes use the configured algorithm and cost; ``legacy_salt`` is only used to verify
+    hashes written before the self-describing format.
+    """
+
+    _executor: ThreadPoolExecutor | None = None
+    _executor_lock = threading.Lock()
+    _pending = 0
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 64,
+        algorithm: str = PASSWORD_ALGORITHM_PBKDF2,
+        cost: int = 200_000,
+        legacy_salt: str = "",
+    ) -> None:
+        algorithm = algorithm.strip().lower()
+        if algorithm not in SUPPORTED_PASSWORD_ALGORITHMS:
+            raise ValueError(f"Unsupported password algorithm: {algorithm}")
+        if algorithm == PASSWORD_ALGORITHM_SCRYPT and (cost < 2 or cost & (cost - 1)):
+            raise ValueError("scrypt cost (N) must be a power of two")
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.algorithm = algorithm
+        self.cost = max(1, int(cost))
+        self.legacy_salt = legacy_salt
+
+    async def hash(self, raw_password: str) -> str:
+        return await self._run("hash", make_password_hash, raw_password, self.algorithm, self.cost)
+
+    async def verify(self, raw_password: str, stored_hash: str) -> bool:
+        return await self._run("verify", check_password_hash, raw_password, stored_hash, self.legacy_salt)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        return password_needs_rehash(stored_hash, self.algorithm, self.cost)
+
+    async def _run(self, operation: str, fn: Callable[..., T], *args: object) -> T:
+        cls = type(self)
+        if cls._pending >= self.max_pending:
+            raise BusinessException(ErrorCode.SYSTEM_ERROR, "Server busy, please retry later")
+        cls._pending += 1
+        set_password_hash_pending(cls._pending)
+        enqueued_at = time.perf_counter()
+
+        def _job() -> T:
+            observe_password_hash_wait(operation, time.perf_counter() - enqueued_at)
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), _job)
+        finally:
+            cls._pending -= 1
+            set_password_hash_pending(cls._pending)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        cls = type(self)
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hash",
+                    )
+        return cls._executor
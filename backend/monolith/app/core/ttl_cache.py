@@ -0,0 +1,107 @@
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+from app.core.metrics import observe_cache_load, record_cache_eviction, record_cache_lookup, register_cache
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def approximate_size(value: Any) -> int:
+    """Byte size for bytes/str values; shallow ``sys.getsizeof`` for anything else."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded per-process cache with per-entry expiry and LRU eviction.
+
+    Not shared across workers: callers invalidate on their own writes and rely on a short TTL to
+    bound staleness of writes made by other processes.
+
+    A ``name`` exports hits, misses, stale serves, evictions, size and load latency under that
+    cache label. Expired entries are kept for ``stale_seconds`` so ``get_stale`` can serve them
+    when the source of truth is unavailable.
+    """
+
+    def __init__(self, max_size: int = 1024, name: str = "", stale_seconds: float = 0.0) -> None:
+        self.max_size = max(1, int(max_size))
+        self.name = name
+        self.stale_seconds = max(0.0, float(stale_seconds))
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        if name:
+            register_cache(name, self.__len__, self.size_bytes)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._record("miss")
+            return None
+        value, expires_at = entry
+        now = time.monotonic()
+        if now >= expires_at:
+            if now >= expires_at + self.stale_seconds:
+                self._entries.pop(key, None)
+                self._evicted("expired")
+            self._record("miss")
+            return None
+        self._entries.move_to_end(key)
+        self._record("hit")
+        return value
+
+    def get_stale(self, key: K) -> V | None:
+        """Return an entry that expired less than ``stale_seconds`` ago (or is still fresh)."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[1] + self.stale_seconds:
+            return None
+        self._record("stale")
+        return entry[0]
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]], ttl_seconds: float) -> V:
+        value = self.get(key)
+        if value is not None:
+            return value
+        started = time.perf_counter()
+        value = await loader()
+        if self.name:
+            observe_cache_load(self.name, time.perf_counter() - started)
+        self.set(key, value, ttl_seconds)
+        return value
+
+    def set(self, key: K, value: V, ttl_seconds: float) -> None:
+        self._entries[key] = (value, time.monotonic() + max(0.0, float(ttl_seconds)))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evicted("capacity")
+
+    def items(self) -> list[tuple[K, V]]:
+        now = time.monotonic()
+        return [(key, value) for key, (value, expires_at) in self._entries.items() if now < expires_at]
+
+    def keys(self) -> list[K]:
+        return list(self._entries)
+
+    def pop(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def size_bytes(self) -> int:
+        return sum(approximate_size(value) for value, _ in list(self._entries.values()))
+
+    def _record(self, result: str) -> None:
+        if self.name:
+            record_cache_lookup(self.name, result)
+
+    def _evicted(self, reason: str) -> None:
+        if self.name:
+            record_cache_eviction(self.name, reason)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -13,6 +13,7 @@ from app.core.codegen_workflow import CodeGenWorkflowRunner
 from app.models.user import User
 from app.services.app_service import AppService
 from app.services.chat_history_service import ChatHistoryService
+from app.services.concurrency_limit_service import ConcurrencyLimitService
 from app.services.rate_limit_service import RateLimitService
 from app.services.screenshot_service import ScreenshotService
 from app.services.session_service import SessionService
@@ -49,8 +50,8 @@ def get_app_service(
     return AppService(settings=settings, redis_client=redis_client)
 
 
-def get_chat_history_service() -> ChatHistoryService:
-    return ChatHistoryService()
+def get_chat_history_service(settings: Settings = Depends(get_app_settings)) -> ChatHistoryService:
+    return ChatHistoryService(settings=settings)
 
 
 def get_rate_limit_service(
@@ -60,6 +61,13 @@ def get_rate_limit_service(
     return RateLimitService(redis_client=redis_client, settings=settings)
 
 
+def get_concurrency_limit_service(
+    settings: Settings = Depends(get_app_settings),
+    redis_client: Redis | None = Depends(get_redis_client),
+) -> ConcurrencyLimitService:
+    return ConcurrencyLimitService(redis_client=redis_client, settings=settings)
+
+
 def get_ai_codegen_facade(settings: Settings = Depends(get_app_settings)) -> AiCodeGeneratorFacade:
     return AiCodeGeneratorFacade(settings=settings)
 
@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from contextlib import asynccontextmanager
 
@@ -8,9 +9,15 @@ from app.api.router import api_router
 from app.core.config import get_settings
 from app.core.exception_handlers import register_exception_handlers
 from app.core.logging_config import configure_logging
-from app.core.metrics import register_metrics
+from app.core.loop_monitor import monitor_event_loop
+from app.core.memory import configure_tracemalloc
+from app.core.metrics import flush_metrics_periodically, register_metrics
 from app.core.middleware import register_middlewares
+from app.core.profiler import ContinuousProfiler, start_continuous_profiler
 from app.core.resources import ResourceManager
+from app.core.tracing import configure_tracing
+from app.services.login_user_cache import listen_session_invalidations
+from app.services.session_service import sweep_memory_sessions
 
 settings = get_settings()
 resources = ResourceManager(settings)
@@ -20,14 +27,54 @@ resources = ResourceManager(settings)
 async def lifespan(app: FastAPI):
     await resources.start()
     app.state.resources = resources
+    background_tasks: list[asyncio.Task] = [
+        asyncio.create_task(sweep_memory_sessions(max(1, settings.session_memory_sweep_interval_seconds))),
+    ]
+    if resources.redis_client is not None and settings.session_user_cache_ttl_seconds > 0:
+        background_tasks.append(asyncio.create_task(listen_session_invalidations(resources.redis_client)))
+    if settings.event_loop_monitor_interval_seconds > 0:
+        background_tasks.append(
+            asyncio.create_task(
+                monitor_event_loop(
+                    settings.event_loop_monitor_interval_seconds,
+                    settings.event_loop_stall_ms,
+                    capture_stacks=settings.debug or settings.event_loop_stall_capture,
+                )
+            )
+        )
+    if settings.metrics_multiproc_dir:
+        background_tasks.append(
+            asyncio.create_task(flush_metrics_periodically(max(1, settings.metrics_flush_interval_seconds)))
+        )
+    profiler: ContinuousProfiler | None = None
+    if settings.profiler_continuous_dir:
+        profiler = start_continuous_profiler(
+            settings.profiler_continuous_dir,
+            max(1, settings.profiler_continuous_interval_ms),
+            settings.profiler_continuous_rotate_seconds,
+            settings.profiler_continuous_max_files,
+        )
     try:
         yield
     finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        if profiler is not None:
+            await asyncio.to_thread(profiler.stop)
         await resources.stop()
 
 
 def create_app() -> FastAPI:
-    configure_logging(settings.log_level)
+    configure_logging(settings.log_level, settings.log_format)
+    configure_tracemalloc(settings.memory_tracemalloc_frames)
+    configure_tracing(
+        settings.tracing_exporter,
+        settings.tracing_file_path,
+        settings.tracing_sample_rate,
+        settings.app_name,
+        settings.app_version,
+    )
     generated_root = settings.generated_code_path()
     Path(generated_root).mkdir(parents=True, exist_ok=True)
     fastapi_app = FastAPI(
@@ -37,7 +84,7 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
     register_middlewares(fastapi_app, settings)
-    register_metrics(fastapi_app)
+    register_metrics(fastapi_app, settings)
     register_exception_handlers(fastapi_app)
     fastapi_app.include_router(api_router, prefix=settings.api_prefix)
     fastapi_app.mount(
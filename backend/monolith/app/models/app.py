@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, SmallInteger, String, Text, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, SmallInteger, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -8,6 +8,13 @@ from app.db.base import Base
 
 class App(Base):
     __tablename__ = "app"
+    __table_args__ = (
+        Index("ix_app_user_id_create_time_id", "user_id", "create_time", "id"),
+        Index("ix_app_priority_create_time_id", "priority", "create_time", "id"),
+        Index("ix_app_priority_id", "priority", "id"),
+        Index("ix_app_create_time_id", "create_time", "id"),
+        Index("ix_app_update_time_id", "update_time", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     app_name: Mapped[str] = mapped_column(String(128), nullable=False, default="My App", server_default="My App")
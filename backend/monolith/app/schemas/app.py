@@ -97,6 +97,10 @@ class AppQueryRequest(BaseModel):
     deploy_key: str | None = Field(default=None, alias="deployKey")
     priority: int | None = None
     user_id: int | None = Field(default=None, alias="userId")
+    page_mode: str | None = Field(default=None, alias="pageMode")
+    cursor: str | None = None
+    search_text: str | None = Field(default=None, alias="searchText")
+    count_mode: str | None = Field(default=None, alias="countMode")
 
 
 class AppVO(BaseModel):
@@ -125,6 +129,7 @@ class PageAppVO(BaseModel):
     total_page: int = Field(alias="totalPage")
     total_row: int = Field(alias="totalRow")
     optimize_count_query: bool = Field(default=True, alias="optimizeCountQuery")
+    next_cursor: str | None = Field(default=None, alias="nextCursor")
 
 
 class ChatToGenCodeParams(BaseModel):
@@ -16,6 +16,7 @@ class ChatHistoryQueryRequest(BaseModel):
     app_id: int | None = Field(default=None, alias="appId")
     user_id: int | None = Field(default=None, alias="userId")
     last_create_time: datetime | None = Field(default=None, alias="lastCreateTime")
+    count_mode: str | None = Field(default=None, alias="countMode")
 
 
 class ChatHistoryVO(BaseModel):
@@ -69,6 +69,7 @@ class UserQueryRequest(BaseModel):
     user_account: str | None = Field(default=None, alias="userAccount")
     user_profile: str | None = Field(default=None, alias="userProfile")
     user_role: str | None = Field(default=None, alias="userRole")
+    count_mode: str | None = Field(default=None, alias="countMode")
 
 
 class UserData(BaseModel):
@@ -1,5 +1,6 @@
 from app.services.app_service import AppService
 from app.services.chat_history_service import ChatHistoryService
+from app.services.concurrency_limit_service import ConcurrencyLimitService
 from app.services.rate_limit_service import RateLimitService
 from app.services.screenshot_service import ScreenshotService
 from app.services.session_service import SessionPayload, SessionService
@@ -8,6 +9,7 @@ from app.services.user_service import UserService
 __all__ = [
     "AppService",
     "ChatHistoryService",
+    "ConcurrencyLimitService",
     "RateLimitService",
     "ScreenshotService",
     "SessionPayload",
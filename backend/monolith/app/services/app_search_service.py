@@ -0,0 +1,118 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, Subquery, column, desc, func, literal_column, or_, select, table, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.app import App
+
+logger = logging.getLogger(__name__)
+
+APP_FTS_TABLE = "app_fts"
+# FTS5 trigram tokens are three characters long; shorter terms cannot hit the index.
+_MIN_TRIGRAM_TERM_CHARS = 3
+# A missing index is probed again after this long, so running the migration needs no restart.
+_MISSING_INDEX_RETRY_SECONDS = 60.0
+# Must match the expression indexed by ix_app_search_trgm for PostgreSQL to use it.
+_PG_SEARCH_DOCUMENT = literal_column("(coalesce(app.app_name, '') || ' ' || coalesce(app.init_prompt, ''))")
+
+_app_fts = table(APP_FTS_TABLE, column("rowid"))
+
+
+@dataclass(slots=True)
+class AppSearchClause:
+    filters: list[Any] = field(default_factory=list)
+    ranked: Subquery | None = None
+    rank: ColumnElement | None = None
+
+    def join(self, stmt: Select) -> Select:
+        if self.ranked is None:
+            return stmt
+        return stmt.join(self.ranked, self.ranked.c.app_id == App.id)
+
+    def order_by_rank(self, stmt: Select) -> Select:
+        if self.rank is None:
+            return stmt
+        return stmt.order_by(desc(self.rank), desc(App.id))
+
+
+class AppSearchService:
+    """Search app name and init prompt through the dialect's full-text index.
+
+    SQLite uses the ``app_fts`` FTS5 table (kept in sync by triggers) ranked by bm25, PostgreSQL
+    uses the ``pg_trgm`` GIN index ranked by word similarity. Terms the index cannot serve and
+    databases without the index fall back to ``LIKE``; a missing index is probed again every
+    minute.
+    """
+
+    _availability: dict[str, bool] = {}
+    _missing_until: dict[str, float] = {}
+
+    async def build_clause(self, db: AsyncSession, search_text: str) -> AppSearchClause:
+        terms = [item for item in search_text.split() if item]
+        if not terms:
+            return AppSearchClause()
+
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+        if dialect == "sqlite" and await self._is_available(db, dialect):
+            return self._build_sqlite_clause(terms)
+        if dialect == "postgresql" and await self._is_available(db, dialect):
+            return self._build_postgresql_clause(search_text.strip(), terms)
+        return AppSearchClause(filters=[self._like_filter(term) for term in terms])
+
+    @staticmethod
+    def _build_sqlite_clause(terms: list[str]) -> AppSearchClause:
+        indexed_terms = [term for term in terms if len(term) >= _MIN_TRIGRAM_TERM_CHARS]
+        filters = [AppSearchService._like_filter(term) for term in terms if len(term) < _MIN_TRIGRAM_TERM_CHARS]
+        if not indexed_terms:
+            return AppSearchClause(filters=filters)
+
+        match_query = " ".join('"' + term.replace('"', '""') + '"' for term in indexed_terms)
+        fts_column = literal_column(APP_FTS_TABLE)
+        ranked = (
+            select(
+                _app_fts.c.rowid.label("app_id"),
+                (-func.bm25(fts_column)).label("rank"),
+            )
+            .where(fts_column.op("MATCH")(match_query))
+            .subquery("app_search")
+        )
+        return AppSearchClause(filters=filters, ranked=ranked, rank=ranked.c.rank)
+
+    @staticmethod
+    def _build_postgresql_clause(search_text: str, terms: list[str]) -> AppSearchClause:
+        filters = [_PG_SEARCH_DOCUMENT.ilike(f"%{term}%") for term in terms]
+        rank = func.word_similarity(search_text, _PG_SEARCH_DOCUMENT)
+        return AppSearchClause(filters=filters, rank=rank)
+
+    @staticmethod
+    def _like_filter(term: str) -> ColumnElement:
+        pattern = f"%{term}%"
+        return or_(App.app_name.like(pattern), App.init_prompt.like(pattern))
+
+    @classmethod
+    async def _is_available(cls, db: AsyncSession, dialect: str) -> bool:
+        if cls._availability.get(dialect):
+            return True
+        if cls._missing_until.get(dialect, 0.0) > time.monotonic():
+            return False
+        if dialect == "sqlite":
+            probe = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name")
+            params = {"name": APP_FTS_TABLE}
+        else:
+            probe = text("SELECT 1 FROM pg_extension WHERE extname = :name")
+            params = {"name": "pg_trgm"}
+        try:
+            available = (await db.scalar(probe, params)) is not None
+        except SQLAlchemyError as exc:
+            logger.warning("App search index probe failed, fallback to LIKE: %s", exc)
+            available = False
+        if available:
+            cls._availability[dialect] = True
+        else:
+            logger.warning("App search index is missing for %s, run `alembic upgrade head`", dialect)
+            cls._missing_until[dialect] = time.monotonic() + _MISSING_INDEX_RETRY_SECONDS
+        return available
@@ -1,17 +1,19 @@
+import base64
 import io
 import json
 import shutil
 import time
 import zipfile
 from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from datetime import UTC, datetime
-from math import ceil
 from pathlib import Path
 from typing import Any
 
+from pydantic import TypeAdapter
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
-from sqlalchemy import asc, desc, func, select
+from sqlalchemy import DateTime, Integer, String, asc, desc, func, literal, select, tuple_, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.code_gen_types import CODE_GEN_TYPE_HTML, SUPPORTED_CODE_GEN_TYPES
@@ -19,6 +21,9 @@ from app.core.config import Settings
 from app.core.edit_modes import EDIT_MODE_FULL, SUPPORTED_EDIT_MODES
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
+from app.core.metrics import observe_cache_load, record_cache_lookup
+from app.core.page_count import PageCounter, build_total_page, normalize_count_mode
+from app.core.ttl_cache import TTLCache
 from app.models.app import App
 from app.models.user import User
 from app.schemas.app import (
@@ -32,13 +37,45 @@ from app.schemas.app import (
     PageAppVO,
 )
 from app.schemas.user import UserVO
+from app.services.app_search_service import AppSearchClause, AppSearchService
+from app.services.user_profile_cache import UserProfileCache
 from app.services.user_service import USER_ROLE_ADMIN
 
 GOOD_APP_PRIORITY = 99
+PAGE_MODE_OFFSET = "offset"
+PAGE_MODE_CURSOR = "cursor"
+_PAGE_APP_VO_ADAPTER = TypeAdapter(PageAppVO)
+_REDIS_PAGE_CACHE_NAME = "app_page_redis"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedApp:
+    """Detached, read-only view of the app columns the hot paths need."""
+
+    id: int
+    user_id: int
+    app_name: str | None
+    code_gen_type: str
+    init_prompt: str | None
+    deploy_key: str | None
+    deployed_time: datetime | None
+
+    @classmethod
+    def from_entity(cls, app_entity: App) -> "CachedApp":
+        return cls(
+            id=app_entity.id,
+            user_id=app_entity.user_id,
+            app_name=app_entity.app_name,
+            code_gen_type=app_entity.code_gen_type,
+            init_prompt=app_entity.init_prompt,
+            deploy_key=app_entity.deploy_key,
+            deployed_time=app_entity.deployed_time,
+        )
 
 
 class AppService:
-    _memory_cache: dict[str, tuple[str, float]] = {}
+    _memory_cache: TTLCache[str, bytes] = TTLCache(max_size=1024, name="app_page")
+    _entity_cache: TTLCache[int, CachedApp] = TTLCache(max_size=2048, name="app_entity")
     _sortable_fields = {
         "id": App.id,
         "createTime": App.create_time,
@@ -47,10 +84,15 @@ class AppService:
         "priority": App.priority,
         "deployedTime": App.deployed_time,
     }
+    # Each has a ``(column, id)`` index (migration 20261019_0004) matching the keyset order.
+    _keyset_sortable_fields = {"id", "createTime", "updateTime", "priority"}
 
     def __init__(self, settings: Settings | None = None, redis_client: Redis | None = None) -> None:
         self.settings = settings
         self.redis_client = redis_client
+        self.page_counter = PageCounter(settings.list_count_cache_ttl_seconds if settings is not None else 10)
+        self.search_service = AppSearchService()
+        self.user_profile_cache = UserProfileCache(redis_client, settings)
 
     async def add_app(
         self,
@@ -82,6 +124,7 @@ class AppService:
         if app_name:
             app_entity.app_name = app_name[:128]
         await db.commit()
+        self.invalidate_app_cache(app_id)
         await self._invalidate_query_cache()
         return True
 
@@ -91,6 +134,7 @@ class AppService:
             raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
         app_entity.is_delete = 1
         await db.commit()
+        self.invalidate_app_cache(app_id)
         await self._invalidate_query_cache()
         return True
 
@@ -98,6 +142,7 @@ class AppService:
         app_entity = await self.get_app_entity_by_id(db, app_id)
         app_entity.is_delete = 1
         await db.commit()
+        self.invalidate_app_cache(app_id)
         await self._invalidate_query_cache()
         return True
 
@@ -114,6 +159,7 @@ class AppService:
         if payload.code_gen_type is not None:
             app_entity.code_gen_type = self._normalize_code_gen_type(payload.code_gen_type)
         await db.commit()
+        self.invalidate_app_cache(app_id)
         await self._invalidate_query_cache()
         return True
 
@@ -124,7 +170,7 @@ class AppService:
 
     async def list_my_app_vo_by_page(
         self, db: AsyncSession, payload: AppQueryRequest, login_user: User
-    ) -> PageAppVO:
+    ) -> bytes:
         payload.user_id = login_user.id
         return await self._get_or_set_page_cache(
             cache_scope="my",
@@ -132,7 +178,7 @@ class AppService:
             loader=lambda: self._list_app_vo_by_page(db, payload, max_page_size=20),
         )
 
-    async def list_good_app_vo_by_page(self, db: AsyncSession, payload: AppQueryRequest) -> PageAppVO:
+    async def list_good_app_vo_by_page(self, db: AsyncSession, payload: AppQueryRequest) -> bytes:
         payload.priority = GOOD_APP_PRIORITY
         return await self._get_or_set_page_cache(
             cache_scope="good",
@@ -140,7 +186,7 @@ class AppService:
             loader=lambda: self._list_app_vo_by_page(db, payload, max_page_size=20),
         )
 
-    async def list_app_vo_by_page_by_admin(self, db: AsyncSession, payload: AppQueryRequest) -> PageAppVO:
+    async def list_app_vo_by_page_by_admin(self, db: AsyncSession, payload: AppQueryRequest) -> bytes:
         return await self._get_or_set_page_cache(
             cache_scope="admin",
             payload=payload,
@@ -169,11 +215,12 @@ class AppService:
         app_entity.deploy_key = deploy_key
         app_entity.deployed_time = datetime.now(UTC)
         await db.commit()
+        self.invalidate_app_cache(app_id)
         await self._invalidate_query_cache()
         return f"{deploy_domain.rstrip('/')}/{deploy_key}/"
 
     async def build_download_zip_bytes(self, db: AsyncSession, app_id: int, login_user: User, generated_root: Path) -> bytes:
-        app_entity = await self.get_app_entity_by_id(db, app_id)
+        app_entity = await self.get_cached_app_by_id(db, app_id)
         if app_entity.user_id != login_user.id:
             raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
 
@@ -189,7 +236,7 @@ class AppService:
         login_user: User,
         generated_root: Path,
     ) -> bytes:
-        app_entity = await self.get_app_entity_by_id(db, app_id)
+        app_entity = await self.get_cached_app_by_id(db, app_id)
         if app_entity.user_id != login_user.id and login_user.user_role != USER_ROLE_ADMIN:
             raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
 
@@ -222,7 +269,7 @@ class AppService:
         message: str | None,
         edit_mode: str,
     ) -> AppVersionVO:
-        app_entity = await self.get_app_entity_by_id(db, app_id)
+        app_entity = await self.get_cached_app_by_id(db, app_id)
         self._assert_access(app_entity, login_user)
 
         normalized_mode = self.normalize_edit_mode(edit_mode)
@@ -257,7 +304,7 @@ class AppService:
         login_user: User,
         generated_root: Path,
     ) -> list[AppVersionVO]:
-        app_entity = await self.get_app_entity_by_id(db, app_id)
+        app_entity = await self.get_cached_app_by_id(db, app_id)
         self._assert_access(app_entity, login_user)
 
         source_dir = self._resolve_source_dir(app_entity, generated_root)
@@ -273,7 +320,7 @@ class AppService:
         login_user: User,
         generated_root: Path,
     ) -> bool:
-        app_entity = await self.get_app_entity_by_id(db, app_id)
+        app_entity = await self.get_cached_app_by_id(db, app_id)
         self._assert_access(app_entity, login_user)
 
         source_dir = self._resolve_source_dir(app_entity, generated_root)
@@ -303,6 +350,29 @@ class AppService:
             raise BusinessException(ErrorCode.NOT_FOUND_ERROR, "App not found")
         return app_entity
 
+    async def get_cached_app_by_id(self, db: AsyncSession, app_id: int) -> CachedApp:
+        """Read-only app lookup for permission checks and path resolution.
+
+        Mutating callers must keep using ``get_app_entity_by_id`` and call
+        ``invalidate_app_cache`` after committing.
+        """
+        if app_id <= 0:
+            raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid app id")
+
+        async def load() -> CachedApp:
+            return CachedApp.from_entity(await self.get_app_entity_by_id(db, app_id))
+
+        return await self._entity_cache.get_or_load(app_id, load, self._entity_cache_ttl_seconds())
+
+    @classmethod
+    def invalidate_app_cache(cls, app_id: int) -> None:
+        cls._entity_cache.pop(app_id)
+
+    def _entity_cache_ttl_seconds(self) -> int:
+        if self.settings is None:
+            return 10
+        return max(1, int(self.settings.app_entity_cache_ttl_seconds))
+
     @staticmethod
     def _query_cache_prefix() -> str:
         return "cache:app:list:"
@@ -312,6 +382,16 @@ class AppService:
             return 30
         return max(1, int(self.settings.app_query_cache_ttl_seconds))
 
+    def _query_cache_local_ttl_seconds(self) -> int:
+        if self.settings is None:
+            return 5
+        return max(1, int(self.settings.app_query_cache_local_ttl_seconds))
+
+    def _query_cache_stale_seconds(self) -> int:
+        if self.settings is None:
+            return 30
+        return max(0, int(self.settings.app_query_cache_stale_seconds))
+
     def _build_page_cache_key(self, cache_scope: str, payload: AppQueryRequest) -> str:
         cache_payload = payload.model_dump(by_alias=True, mode="json")
         cache_json = json.dumps(cache_payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
@@ -322,41 +402,47 @@ class AppService:
         cache_scope: str,
         payload: AppQueryRequest,
         loader: Callable[[], Awaitable[PageAppVO]],
-    ) -> PageAppVO:
+    ) -> bytes:
         cache_key = self._build_page_cache_key(cache_scope, payload)
-        cached_text = await self._cache_get(cache_key)
-        if cached_text:
-            try:
-                cached_obj = json.loads(cached_text)
-                return PageAppVO.model_validate(cached_obj)
-            except json.JSONDecodeError:
-                pass
+        cached_json = await self._cache_get(cache_key)
+        if cached_json is not None:
+            return cached_json
 
+        started = time.perf_counter()
         page = await loader()
-        payload_text = json.dumps(page.model_dump(by_alias=True, mode="json"), ensure_ascii=False)
-        await self._cache_set(cache_key, payload_text, self._query_cache_ttl_seconds())
-        return page
-
-    async def _cache_get(self, key: str) -> str | None:
-        if self.redis_client is not None:
-            try:
-                redis_value = await self.redis_client.get(key)
-                if isinstance(redis_value, str):
-                    return redis_value
-            except RedisError:
-                pass
+        page_json = _PAGE_APP_VO_ADAPTER.dump_json(page, by_alias=True)
+        observe_cache_load(self._memory_cache.name, time.perf_counter() - started)
+        await self._cache_set(cache_key, page_json, self._query_cache_ttl_seconds())
+        return page_json
 
+    async def _cache_get(self, key: str) -> bytes | None:
         cached = self._memory_cache.get(key)
-        if cached is None:
+        if cached is not None:
+            return cached
+
+        if self.redis_client is None:
             return None
-        value, expire_at = cached
-        if time.monotonic() >= expire_at:
-            self._memory_cache.pop(key, None)
+        try:
+            redis_value = await self.redis_client.get(key)
+        except RedisError:
+            # Serve a recently expired local copy instead of sending every request to the database.
+            return self._memory_cache.get_stale(key)
+        if isinstance(redis_value, str):
+            redis_value = redis_value.encode("utf-8")
+        if not isinstance(redis_value, bytes) or not redis_value:
+            record_cache_lookup(_REDIS_PAGE_CACHE_NAME, "miss")
             return None
-        return value
+        record_cache_lookup(_REDIS_PAGE_CACHE_NAME, "hit")
+        self._memory_cache.set(key, redis_value, self._query_cache_local_ttl_seconds())
+        return redis_value
 
-    async def _cache_set(self, key: str, value: str, ttl_seconds: int) -> None:
-        self._memory_cache[key] = (value, time.monotonic() + ttl_seconds)
+    async def _cache_set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        local_ttl = ttl_seconds
+        if self.redis_client is not None:
+            # The short local TTL bounds cross-worker staleness; without Redis this is the only tier.
+            local_ttl = min(ttl_seconds, self._query_cache_local_ttl_seconds())
+        self._memory_cache.stale_seconds = self._query_cache_stale_seconds()
+        self._memory_cache.set(key, value, local_ttl)
         if self.redis_client is None:
             return
         try:
@@ -366,9 +452,9 @@ class AppService:
 
     async def _invalidate_query_cache(self) -> None:
         prefix = self._query_cache_prefix()
-        stale_keys = [item for item in self._memory_cache if item.startswith(prefix)]
-        for key in stale_keys:
-            self._memory_cache.pop(key, None)
+        for key in self._memory_cache.keys():
+            if key.startswith(prefix):
+                self._memory_cache.pop(key)
 
         if self.redis_client is None:
             return
@@ -401,6 +487,7 @@ class AppService:
         if page_size <= 0:
             page_size = 10
         page_size = min(page_size, max_page_size)
+        count_mode = normalize_count_mode(payload.count_mode)
 
         filters = [App.is_delete == 0]
         if payload.id and payload.id > 0:
@@ -419,22 +506,31 @@ class AppService:
             filters.append(App.priority == payload.priority)
         if payload.user_id and payload.user_id > 0:
             filters.append(App.user_id == payload.user_id)
-
-        query_stmt = select(App).where(*filters)
-        count_stmt = select(func.count(App.id)).where(*filters)
-
-        sort_column = self._sortable_fields.get(payload.sort_field or "")
-        sort_order = (payload.sort_order or "").lower()
-        if sort_column is not None:
-            order_by = desc(sort_column) if "desc" in sort_order else asc(sort_column)
-            query_stmt = query_stmt.order_by(order_by)
+        search = AppSearchClause()
+        if payload.search_text and payload.search_text.strip():
+            search = await self.search_service.build_clause(db, payload.search_text)
+            filters.extend(search.filters)
+
+        count_stmt = search.join(select(func.count(App.id))).where(*filters)
+        next_cursor: str | None = None
+        if self._normalize_page_mode(payload.page_mode) == PAGE_MODE_CURSOR:
+            apps, next_cursor = await self._list_apps_by_cursor(db, payload, filters, page_size, search)
         else:
-            query_stmt = query_stmt.order_by(desc(App.id))
+            query_stmt = search.join(select(App)).where(*filters)
+            sort_column = self._sortable_fields.get(payload.sort_field or "")
+            sort_order = (payload.sort_order or "").lower()
+            if sort_column is not None:
+                order_by = desc(sort_column) if "desc" in sort_order else asc(sort_column)
+                query_stmt = query_stmt.order_by(order_by)
+            elif search.rank is not None:
+                query_stmt = search.order_by_rank(query_stmt)
+            else:
+                query_stmt = query_stmt.order_by(desc(App.id))
 
-        offset = (page_num - 1) * page_size
-        apps = (await db.scalars(query_stmt.offset(offset).limit(page_size))).all()
-        total_row = int(await db.scalar(count_stmt) or 0)
-        total_page = ceil(total_row / page_size) if total_row > 0 else 0
+            offset = (page_num - 1) * page_size
+            apps = list((await db.scalars(query_stmt.offset(offset).limit(page_size))).all())
+        total_row = await self.page_counter.count(db, count_stmt, count_mode)
+        total_page = build_total_page(total_row, page_size)
 
         user_ids = [app.user_id for app in apps]
         user_map = await self._load_user_vo_map(db, user_ids)
@@ -447,28 +543,94 @@ class AppService:
             total_page=total_page,
             total_row=total_row,
             optimize_count_query=True,
+            next_cursor=next_cursor,
         )
 
-    async def _load_user_vo_map(self, db: AsyncSession, user_ids: list[int]) -> dict[int, UserVO]:
-        clean_user_ids = sorted({item for item in user_ids if item > 0})
-        if not clean_user_ids:
-            return {}
-        users = (
-            await db.scalars(select(User).where(User.id.in_(clean_user_ids), User.is_delete == 0))
-        ).all()
-        return {item.id: self._to_user_vo(item) for item in users}
+    async def _list_apps_by_cursor(
+        self,
+        db: AsyncSession,
+        payload: AppQueryRequest,
+        filters: list[Any],
+        page_size: int,
+        search: AppSearchClause,
+    ) -> tuple[list[App], str | None]:
+        sort_field = payload.sort_field or "id"
+        if sort_field not in self._keyset_sortable_fields:
+            raise BusinessException(ErrorCode.PARAMS_ERROR, f"Unsupported sortField for cursor mode: {sort_field}")
+        sort_column = self._sortable_fields[sort_field]
+        descending = "asc" not in (payload.sort_order or "desc").lower()
+        # SQLite keeps datetimes as text in whichever format the writer used (CURRENT_TIMESTAMP
+        # vs. SQLAlchemy's microsecond form), so the cursor carries and compares the stored text.
+        raw_text = isinstance(sort_column.type, DateTime) and db.bind is not None and db.bind.dialect.name == "sqlite"
+        cursor_column = type_coerce(sort_column, String) if raw_text else sort_column
+
+        query_stmt = search.join(select(App, cursor_column.label("cursor_value"))).where(*filters)
+        if payload.cursor:
+            value_type = str if isinstance(sort_column.type, DateTime) else int
+            cursor_id, cursor_value = self._decode_cursor(payload.cursor, sort_field, descending, value_type)
+            if sort_column is App.id:
+                query_stmt = query_stmt.where(App.id < cursor_id if descending else App.id > cursor_id)
+            else:
+                if isinstance(sort_column.type, DateTime) and not raw_text:
+                    anchor_value = literal(self._parse_cursor_datetime(cursor_value), sort_column.type)
+                else:
+                    anchor_value = literal(cursor_value, String() if raw_text else sort_column.type)
+                row_key = tuple_(cursor_column, App.id)
+                anchor_key = tuple_(anchor_value, literal(cursor_id, Integer()))
+                query_stmt = query_stmt.where(row_key < anchor_key if descending else row_key > anchor_key)
+
+        order = desc if descending else asc
+        if sort_column is App.id:
+            query_stmt = query_stmt.order_by(order(App.id))
+        else:
+            query_stmt = query_stmt.order_by(order(sort_column), order(App.id))
+
+        rows = list((await db.execute(query_stmt.limit(page_size + 1))).all())
+        apps = [row[0] for row in rows[:page_size]]
+        if len(rows) <= page_size:
+            return apps, None
+        last_app, last_value = rows[page_size - 1]
+        return apps, self._encode_cursor(last_app.id, last_value, sort_field, descending)
 
     @staticmethod
-    def _to_user_vo(user: User) -> UserVO:
-        return UserVO(
-            id=user.id,
-            user_account=user.user_account,
-            user_name=user.user_name,
-            user_avatar=user.user_avatar,
-            user_profile=user.user_profile,
-            user_role=user.user_role,
-            create_time=user.create_time,
-        )
+    def _normalize_page_mode(page_mode: str | None) -> str:
+        value = (page_mode or PAGE_MODE_OFFSET).strip().lower()
+        if value not in {PAGE_MODE_OFFSET, PAGE_MODE_CURSOR}:
+            raise BusinessException(ErrorCode.PARAMS_ERROR, f"Unsupported pageMode: {value}")
+        return value
+
+    @staticmethod
+    def _encode_cursor(app_id: int, sort_value: Any, sort_field: str, descending: bool) -> str:
+        value = sort_value.isoformat() if isinstance(sort_value, datetime) else sort_value
+        raw = json.dumps({"id": app_id, "v": value, "s": sort_field, "d": int(descending)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_field: str, descending: bool, value_type: type) -> tuple[int, Any]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            cursor_id = int(data["id"])
+            cursor_value = data["v"]
+            cursor_sort_field = str(data["s"])
+            cursor_descending = bool(data["d"])
+        except (ValueError, KeyError, TypeError, UnicodeError):
+            raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid cursor") from None
+        if cursor_id <= 0 or cursor_sort_field != sort_field or cursor_descending != descending:
+            raise BusinessException(ErrorCode.PARAMS_ERROR, "Cursor does not match current sort")
+        if isinstance(cursor_value, bool) or not isinstance(cursor_value, value_type):
+            raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid cursor")
+        return cursor_id, cursor_value
+
+    @staticmethod
+    def _parse_cursor_datetime(value: Any) -> datetime:
+        try:
+            return datetime.fromisoformat(str(value))
+        except ValueError:
+            raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid cursor") from None
+
+    async def _load_user_vo_map(self, db: AsyncSession, user_ids: list[int]) -> dict[int, UserVO]:
+        return await self.user_profile_cache.load_many(db, user_ids)
 
     @staticmethod
     def _to_app_vo(app_entity: App, user_vo: UserVO | None) -> AppVO:
@@ -550,12 +712,12 @@ class AppService:
         return zip_buffer.getvalue()
 
     @staticmethod
-    def _assert_access(app_entity: App, login_user: User) -> None:
+    def _assert_access(app_entity: App | CachedApp, login_user: User) -> None:
         if app_entity.user_id != login_user.id and login_user.user_role != USER_ROLE_ADMIN:
             raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
 
     @staticmethod
-    def _resolve_source_dir(app_entity: App, generated_root: Path) -> Path:
+    def _resolve_source_dir(app_entity: App | CachedApp, generated_root: Path) -> Path:
         source_dir = generated_root / f"{app_entity.code_gen_type}_{app_entity.id}"
         if not source_dir.exists() or not source_dir.is_dir():
             raise BusinessException(ErrorCode.NOT_FOUND_ERROR, "Generated code not found, please generate first")
@@ -1,15 +1,16 @@
 from datetime import UTC, datetime
-from math import ceil
 
 from sqlalchemy import asc, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import Settings
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
-from app.models.app import App
+from app.core.page_count import PageCounter, build_total_page, normalize_count_mode
 from app.models.chat_history import ChatHistory
 from app.models.user import User
 from app.schemas.chat_history import ChatHistoryQueryRequest, ChatHistoryVO, PageChatHistory
+from app.services.app_service import AppService
 from app.services.user_service import USER_ROLE_ADMIN
 
 MESSAGE_TYPE_USER = "user"
@@ -27,6 +28,11 @@ class ChatHistoryService:
     }
     _valid_message_types = {MESSAGE_TYPE_USER, MESSAGE_TYPE_ASSISTANT}
 
+    def __init__(self, settings: Settings | None = None) -> None:
+        self.settings = settings
+        self.page_counter = PageCounter(settings.list_count_cache_ttl_seconds if settings is not None else 10)
+        self.app_service = AppService(settings)
+
     async def add_chat_message(
         self,
         db: AsyncSession,
@@ -65,14 +71,14 @@ class ChatHistoryService:
         page_size: int,
         last_create_time: datetime | None,
         login_user: User,
+        count_mode: str | None = None,
     ) -> PageChatHistory:
-        app_entity = await db.scalar(select(App).where(App.id == app_id, App.is_delete == 0).limit(1))
-        if app_entity is None:
-            raise BusinessException(ErrorCode.NOT_FOUND_ERROR, "App not found")
+        app_entity = await self.app_service.get_cached_app_by_id(db, app_id)
         if app_entity.user_id != login_user.id and login_user.user_role != USER_ROLE_ADMIN:
             raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
 
         page_size = min(max(page_size, 1), 50)
+        count_mode = normalize_count_mode(count_mode)
         filters = [ChatHistory.app_id == app_id, ChatHistory.is_delete == 0]
         if last_create_time is not None:
             filters.append(ChatHistory.create_time < last_create_time)
@@ -85,8 +91,8 @@ class ChatHistoryService:
         )
         count_stmt = select(func.count(ChatHistory.id)).where(*filters)
         records = (await db.scalars(query_stmt)).all()
-        total_row = int(await db.scalar(count_stmt) or 0)
-        total_page = ceil(total_row / page_size) if total_row > 0 else 0
+        total_row = await self.page_counter.count(db, count_stmt, count_mode)
+        total_page = build_total_page(total_row, page_size)
 
         return PageChatHistory(
             records=[self._to_chat_history_vo(item) for item in records],
@@ -107,6 +113,7 @@ class ChatHistoryService:
         if page_size <= 0:
             page_size = 10
         page_size = min(page_size, 100)
+        count_mode = normalize_count_mode(payload.count_mode)
 
         filters = [ChatHistory.is_delete == 0]
         if payload.id and payload.id > 0:
@@ -134,8 +141,8 @@ class ChatHistoryService:
 
         offset = (page_num - 1) * page_size
         records = (await db.scalars(query_stmt.offset(offset).limit(page_size))).all()
-        total_row = int(await db.scalar(count_stmt) or 0)
-        total_page = ceil(total_row / page_size) if total_row > 0 else 0
+        total_row = await self.page_counter.count(db, count_stmt, count_mode)
+        total_page = build_total_page(total_row, page_size)
         return PageChatHistory(
             records=[self._to_chat_history_vo(item) for item in records],
             page_number=page_num,
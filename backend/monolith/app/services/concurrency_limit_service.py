@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import secrets
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import Settings
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+# KEYS = scope zsets, ARGV[1] = lease id, ARGV[2] = lease TTL in ms, ARGV[2 + i] = cap of KEYS[i].
+# Members are lease ids scored by their expiry, so leases of crashed workers age out on their own.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local ttl = tonumber(ARGV[2])
+for i, key in ipairs(KEYS) do
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
+  if redis.call('ZCARD', key) >= tonumber(ARGV[i + 2]) then return i end
+end
+for _, key in ipairs(KEYS) do
+  redis.call('ZADD', key, now + ttl, ARGV[1])
+  redis.call('PEXPIRE', key, ttl * 2)
+end
+return 0
+"""
+
+_HEARTBEAT_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local ttl = tonumber(ARGV[2])
+for _, key in ipairs(KEYS) do
+  if redis.call('ZSCORE', key, ARGV[1]) then
+    redis.call('ZADD', key, now + ttl, ARGV[1])
+    redis.call('PEXPIRE', key, ttl * 2)
+  end
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+for _, key in ipairs(KEYS) do redis.call('ZREM', key, ARGV[1]) end
+return 0
+"""
+
+_SCOPE_MESSAGES = {
+    "user": "当前账号进行中的生成任务过多，请等待已有任务完成后再试",
+    "app": "该应用已有生成任务在进行中，请稍后再试",
+    "global": "系统生成任务繁忙，请稍后再试",
+}
+
+
+class GenerationLease:
+    """A held generation slot; keeps itself alive with heartbeats until ``release``.
+
+    ``release`` lets the caller's cancellation through, so callers that release while being
+    cancelled (a disconnected SSE client) run it inside a shielded cancel scope.
+    """
+
+    def __init__(self, service: "ConcurrencyLimitService", lease_id: str, scopes: list[tuple[str, str]]) -> None:
+        self.service = service
+        self.lease_id = lease_id
+        self.scopes = scopes
+        self._heartbeat_task: asyncio.Task | None = None
+        self._released = False
+
+    def start_heartbeat(self) -> None:
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        task = self._heartbeat_task
+        if task is not None:
+            task.cancel()
+            # ``wait`` swallows the task's own outcome but still raises if the caller is cancelled.
+            await asyncio.wait([task])
+            if not task.cancelled() and task.exception() is not None:
+                # A failed heartbeat only shortens the lease; the slot must still be released.
+                logger.warning("Generation lease heartbeat failed: %s", self.lease_id, exc_info=task.exception())
+        await self.service._release(self)
+
+    async def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.service.lease_ttl_ms / 3000)
+        while True:
+            await asyncio.sleep(interval)
+            await self.service._heartbeat(self)
+
+
+class ConcurrencyLimitService:
+    """Cap in-flight generation streams per user, per app and globally with expiring leases.
+
+    Leases live in Redis sorted sets so the caps hold across workers; when Redis cannot run
+    scripts the same leases are tracked in process.
+    """
+
+    _memory_leases: dict[str, dict[str, float]] = {}
+
+    def __init__(self, redis_client: Redis | None, settings: Settings) -> None:
+        self.redis_client = redis_client
+        self.settings = settings
+        self.lease_ttl_ms = max(3, int(settings.generation_lease_ttl_seconds)) * 1000
+
+    async def acquire(self, user_id: int, app_id: int) -> GenerationLease:
+        scopes = self._build_scopes(user_id, app_id)
+        lease = GenerationLease(self, secrets.token_hex(12), [(scope, key) for scope, key, _ in scopes])
+        if not scopes:
+            return lease
+
+        keys = [key for _, key, _ in scopes]
+        caps = [cap for _, _, cap in scopes]
+        with start_span("generation.lease.acquire") as span:
+            rejected = await self._run_script(_ACQUIRE_SCRIPT, keys, [lease.lease_id, self.lease_ttl_ms, *caps])
+            if rejected is None:
+                rejected = self._memory_acquire(lease.lease_id, keys, caps)
+            if span is not None and rejected:
+                span.set_attribute("generation.lease.rejected_scope", scopes[rejected - 1][0])
+        if rejected:
+            raise BusinessException(ErrorCode.PARAMS_ERROR, _SCOPE_MESSAGES[scopes[rejected - 1][0]])
+        lease.start_heartbeat()
+        return lease
+
+    def _build_scopes(self, user_id: int, app_id: int) -> list[tuple[str, str, int]]:
+        candidates = [
+            ("user", f"concurrency:gen:user:{user_id}", int(self.settings.generation_max_concurrent_per_user)),
+            ("app", f"concurrency:gen:app:{app_id}", int(self.settings.generation_max_concurrent_per_app)),
+            ("global", "concurrency:gen:global", int(self.settings.generation_max_concurrent_global)),
+        ]
+        # A cap of 0 disables that scope.
+        return [item for item in candidates if item[2] > 0]
+
+    async def _heartbeat(self, lease: GenerationLease) -> None:
+        keys = [key for _, key in lease.scopes]
+        if await self._run_script(_HEARTBEAT_SCRIPT, keys, [lease.lease_id, self.lease_ttl_ms]) is None:
+            expire_at = time.monotonic() * 1000 + self.lease_ttl_ms
+            for key in keys:
+                leases = self._memory_leases.get(key)
+                if leases is not None and lease.lease_id in leases:
+                    leases[lease.lease_id] = expire_at
+
+    async def _release(self, lease: GenerationLease) -> None:
+        keys = [key for _, key in lease.scopes]
+        if not keys:
+            return
+        await self._run_script(_RELEASE_SCRIPT, keys, [lease.lease_id])
+        # Drop any in-process copy too, in case Redis failed over mid-stream.
+        for key in keys:
+            leases = self._memory_leases.get(key)
+            if leases is not None:
+                leases.pop(lease.lease_id, None)
+                if not leases:
+                    self._memory_leases.pop(key, None)
+
+    async def _run_script(self, script_text: str, keys: list[str], args: list[object]) -> int | None:
+        register_script = getattr(self.redis_client, "register_script", None)
+        if not callable(register_script):
+            return None
+        try:
+            return int(await register_script(script_text)(keys=keys, args=args))
+        except (RedisError, OSError) as exc:
+            logger.warning("Redis concurrency lease script failed, fallback to memory leases: %s", exc)
+            return None
+
+    def _memory_acquire(self, lease_id: str, keys: list[str], caps: list[int]) -> int:
+        now_ms = time.monotonic() * 1000
+        for index, (key, cap) in enumerate(zip(keys, caps, strict=True), start=1):
+            leases = self._memory_leases.get(key, {})
+            for expired_id in [item for item, expire_at in leases.items() if expire_at <= now_ms]:
+                leases.pop(expired_id, None)
+            if len(leases) >= cap:
+                return index
+        for key in keys:
+            self._memory_leases.setdefault(key, {})[lease_id] = now_ms + self.lease_ttl_ms
+        return 0
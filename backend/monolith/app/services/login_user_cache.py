@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import Settings
+from app.core.ttl_cache import TTLCache
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+SESSION_INVALIDATION_CHANNEL = "session:invalidate"
+_CACHE_NAME = "login_user"
+# The password hash never leaves the login path, so it is not kept in memory here.
+_CACHED_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key != "user_password")
+
+
+class LoginUserCache:
+    """Short-TTL session id -> login user cache in front of the Redis session and user row.
+
+    Logout, user update and user deletion drop entries locally and broadcast the invalidation on
+    ``SESSION_INVALIDATION_CHANNEL`` so other workers drop theirs; the TTL bounds staleness when
+    the broadcast is missed.
+    """
+
+    _entries: TTLCache[str, dict[str, Any]] = TTLCache(max_size=8192, name=_CACHE_NAME)
+
+    def __init__(self, redis_client: Redis | None, settings: Settings) -> None:
+        self.redis_client = redis_client
+        self.settings = settings
+
+    def _ttl_seconds(self) -> int:
+        return max(0, int(self.settings.session_user_cache_ttl_seconds))
+
+    def get(self, session_id: str) -> User | None:
+        if self._ttl_seconds() <= 0:
+            return None
+        values = self._entries.get(session_id)
+        if values is None:
+            return None
+        # A fresh transient instance per request, so callers never share mutable ORM state.
+        return User(**values)
+
+    def set(self, session_id: str, user: User) -> None:
+        ttl_seconds = self._ttl_seconds()
+        if ttl_seconds <= 0:
+            return
+        values = {key: getattr(user, key) for key in _CACHED_COLUMNS}
+        self._entries.set(session_id, values, ttl_seconds)
+
+    async def invalidate_session(self, session_id: str) -> None:
+        self.drop_session(session_id)
+        await self._publish({"sessionId": session_id})
+
+    async def invalidate_user(self, user_id: int) -> None:
+        self.drop_user(user_id)
+        await self._publish({"userId": user_id})
+
+    @classmethod
+    def drop_session(cls, session_id: str) -> None:
+        cls._entries.pop(session_id)
+
+    @classmethod
+    def drop_user(cls, user_id: int) -> None:
+        for session_id, values in cls._entries.items():
+            if values.get("id") == user_id:
+                cls._entries.pop(session_id)
+
+    @classmethod
+    def apply_invalidation(cls, message: str) -> None:
+        try:
+            payload = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(payload, dict):
+            return
+        if payload.get("sessionId"):
+            cls.drop_session(str(payload["sessionId"]))
+        if payload.get("userId") is not None:
+            try:
+                cls.drop_user(int(payload["userId"]))
+            except (TypeError, ValueError):
+                return
+
+    async def _publish(self, payload: dict[str, Any]) -> None:
+        publish = getattr(self.redis_client, "publish", None)
+        if not callable(publish):
+            return
+        try:
+            await publish(SESSION_INVALIDATION_CHANNEL, json.dumps(payload))
+        except (RedisError, OSError) as exc:
+            logger.warning("Redis publish failed for session invalidation: %s", exc)
+
+
+async def listen_session_invalidations(redis_client: Redis, retry_seconds: float = 5.0) -> None:
+    """Apply invalidations broadcast by other workers until cancelled."""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    LoginUserCache.apply_invalidation(message.get("data"))
+        except asyncio.CancelledError:
+            raise
+        except (RedisError, OSError) as exc:
+            # Missed broadcasts are covered by the TTL; drop everything we may have missed.
+            LoginUserCache._entries.clear()
+            logger.warning("Session invalidation listener disconnected, retrying: %s", exc)
+            await asyncio.sleep(retry_seconds)
+        finally:
+            try:
+                await pubsub.aclose()
+            except (RedisError, OSError):
+                pass
@@ -1,5 +1,11 @@
 import asyncio
+import logging
+import math
+import secrets
 import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
 
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
@@ -7,50 +13,139 @@ from redis.exceptions import RedisError
 from app.core.config import Settings
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
+from app.core.expiring_store import ExpiringStore
+from app.core.rate_limit import (
+    LUA_SCRIPTS,
+    MemoryRateLimiter,
+    RateLimitDecision,
+    RateLimitRule,
+    normalize_rate_limit_algorithm,
+    parse_rate_limit_routes,
+)
+from app.core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+_LOCK_STRIPES = 64
+_MEMORY_STORE_NAME = "rate_limit_memory"
+
+
+@lru_cache(maxsize=8)
+def _route_rules(raw: str) -> dict[str, RateLimitRule]:
+    # The service is built per request; parse each distinct routes setting once per process.
+    return parse_rate_limit_routes(raw)
+
+
+@dataclass(slots=True)
+class _LocalAllotment:
+    tokens: int = 0
+    blocked_until_ms: float = 0.0
 
 
 class RateLimitService:
-    _memory_store: dict[str, tuple[int, float]] = {}
-    _memory_lock = asyncio.Lock()
+    """Per-user chat rate limiting backed by Redis Lua scripts, with a local fast path.
+
+    Each worker leases up to ``limit * chat_rate_limit_local_tolerance`` tokens per Redis
+    round-trip and spends them locally; denials are remembered until their retry time. Leased but
+    unused tokens may strand on a worker, so the tolerance bounds under-admission and the global
+    limit is never exceeded. Refills and the in-process fallback serialize on a lock stripe picked
+    by key hash instead of one global lock.
+    """
+
+    _memory_store: ExpiringStore[str, Any] = ExpiringStore(name=_MEMORY_STORE_NAME)
+    _memory_locks = tuple(asyncio.Lock() for _ in range(_LOCK_STRIPES))
+    _local_allotments: ExpiringStore[str, _LocalAllotment] = ExpiringStore(
+        max_entries=10_000,
+        name="rate_limit_allotments",
+    )
 
     def __init__(self, redis_client: Redis | None, settings: Settings) -> None:
         self.redis_client = redis_client
         self.settings = settings
+        self._route_rules = _route_rules(settings.chat_rate_limit_routes)
+        self._default_rule = RateLimitRule(
+            limit=max(1, int(settings.chat_rate_limit_count)),
+            window_seconds=max(1, int(settings.chat_rate_limit_window_seconds)),
+        )
 
     async def assert_chat_rate_limit(self, user_id: int, route: str) -> None:
         if user_id <= 0:
             raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid user id")
 
-        limit = max(1, int(self.settings.chat_rate_limit_count))
-        window_seconds = max(1, int(self.settings.chat_rate_limit_window_seconds))
-        key = f"ratelimit:chat:{route}:{user_id}"
+        algorithm = normalize_rate_limit_algorithm(self.settings.chat_rate_limit_algorithm)
+        rule = self._resolve_rule(route)
+        key = f"ratelimit:chat:{algorithm}:{route}:{user_id}"
 
-        current = await self._incr(key, window_seconds)
-        if current > limit:
+        attributes = {"rate_limit.algorithm": algorithm, "rate_limit.route": route}
+        with start_span("rate_limit.check", attributes=attributes) as span:
+            decision = await self._check(algorithm, key, rule)
+            if span is not None:
+                span.set_attribute("rate_limit.allowed", decision.allowed)
+        if not decision.allowed:
+            retry_seconds = max(1, math.ceil(decision.retry_after_ms / 1000))
             raise BusinessException(
                 ErrorCode.PARAMS_ERROR,
-                f"请求过于频繁，请在 {window_seconds} 秒后重试",
+                f"请求过于频繁，请在 {retry_seconds} 秒后重试",
             )
 
-    async def _incr(self, key: str, window_seconds: int) -> int:
-        if self.redis_client is not None:
-            incr_fn = getattr(self.redis_client, "incr", None)
-            expire_fn = getattr(self.redis_client, "expire", None)
-            try:
-                if callable(incr_fn) and callable(expire_fn):
-                    current = int(await incr_fn(key))
-                    if current == 1:
-                        await expire_fn(key, window_seconds)
-                    return current
-            except RedisError:
-                pass
-
-        now = time.monotonic()
-        async with self._memory_lock:
-            count, expire_at = self._memory_store.get(key, (0, 0.0))
-            if now >= expire_at:
-                count = 0
-                expire_at = now + window_seconds
-            count += 1
-            self._memory_store[key] = (count, expire_at)
-            return count
+    def _resolve_rule(self, route: str) -> RateLimitRule:
+        return self._route_rules.get(route, self._default_rule)
+
+    def _lease_size(self, rule: RateLimitRule) -> int:
+        tolerance = max(0.0, float(self.settings.chat_rate_limit_local_tolerance))
+        return max(1, int(rule.limit * tolerance))
+
+    @classmethod
+    def _lock_for(cls, key: str) -> asyncio.Lock:
+        return cls._memory_locks[hash(key) % _LOCK_STRIPES]
+
+    @classmethod
+    def _take_local(cls, key: str) -> RateLimitDecision | None:
+        allotment = cls._local_allotments.get(key)
+        if allotment is None:
+            return None
+        now_ms = time.monotonic() * 1000
+        if allotment.blocked_until_ms > now_ms:
+            return RateLimitDecision(False, math.ceil(allotment.blocked_until_ms - now_ms))
+        if allotment.tokens > 0:
+            allotment.tokens -= 1
+            return RateLimitDecision(True)
+        return None
+
+    async def _check(self, algorithm: str, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        register_script = getattr(self.redis_client, "register_script", None)
+        if callable(register_script):
+            decision = self._take_local(key)
+            if decision is not None:
+                return decision
+            async with self._lock_for(key):
+                # Another request on this key may have refilled while we waited.
+                decision = self._take_local(key)
+                if decision is not None:
+                    return decision
+                try:
+                    script = register_script(LUA_SCRIPTS[algorithm])
+                    granted, retry_after_ms = await script(
+                        keys=[key],
+                        args=[rule.limit, rule.window_ms, secrets.token_hex(8), self._lease_size(rule)],
+                    )
+                    return self._store_lease(key, rule, int(granted), int(retry_after_ms))
+                except (RedisError, OSError) as exc:
+                    logger.warning("Redis rate limit script failed, fallback to memory limiter: %s", exc)
+
+        async with self._lock_for(key):
+            return MemoryRateLimiter(self._memory_store).check(algorithm, key, rule)
+
+    def _store_lease(self, key: str, rule: RateLimitRule, granted: int, retry_after_ms: int) -> RateLimitDecision:
+        if granted <= 0:
+            retry_after_ms = max(1, retry_after_ms)
+            blocked_until_ms = time.monotonic() * 1000 + retry_after_ms
+            self._local_allotments.set(key, _LocalAllotment(blocked_until_ms=blocked_until_ms), retry_after_ms / 1000)
+            return RateLimitDecision(False, retry_after_ms)
+        if granted > 1:
+            self._local_allotments.set(key, _LocalAllotment(tokens=granted - 1), rule.window_seconds)
+        else:
+            self._local_allotments.pop(key)
+        return RateLimitDecision(True)
+
@@ -5,12 +5,14 @@ from datetime import UTC, datetime
 from pathlib import Path
 
 from PIL import Image, ImageDraw
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.code_gen_types import CODE_GEN_TYPE_VUE_PROJECT
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
 from app.core.config import Settings
+from app.models.app import App
 from app.models.user import User
 from app.services.app_service import AppService
 from app.services.user_service import USER_ROLE_ADMIN
@@ -27,7 +29,7 @@ class ScreenshotService:
         app_service: AppService,
         settings: Settings,
     ) -> str:
-        app_entity = await app_service.get_app_entity_by_id(db, app_id)
+        app_entity = await app_service.get_cached_app_by_id(db, app_id)
         if app_entity.user_id != login_user.id and login_user.user_role != USER_ROLE_ADMIN:
             raise BusinessException(ErrorCode.NO_AUTH_ERROR, "No permission")
 
@@ -51,7 +53,7 @@ class ScreenshotService:
         screenshot_url = (
             f"{settings.deploy_domain.rstrip('/')}/{source_dir_name}/.screenshots/{file_name}"
         )
-        app_entity.cover = screenshot_url
+        await db.execute(update(App).where(App.id == app_entity.id).values(cover=screenshot_url))
         await db.commit()
         return screenshot_url
 
@@ -1,13 +1,14 @@
+import asyncio
 import json
 import logging
 import secrets
-import time
 from dataclasses import dataclass
 
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
 
 from app.core.config import Settings
+from app.core.expiring_store import ExpiringStore
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,7 @@ class SessionPayload:
 
 
 class SessionService:
-    _memory_store: dict[str, tuple[str, float]] = {}
+    _memory_store: ExpiringStore[str, str] = ExpiringStore(name="session_memory")
 
     def __init__(self, redis_client: Redis | None, settings: Settings) -> None:
         self.redis_client = redis_client
@@ -31,33 +32,21 @@ class SessionService:
     def _session_ttl(self) -> int:
         return max(int(self.settings.session_ttl_seconds), 60)
 
-    @classmethod
-    def _cleanup_memory_store(cls) -> None:
-        now = time.time()
-        expired_keys = [key for key, (_, expire_at) in cls._memory_store.items() if expire_at <= now]
-        for key in expired_keys:
-            cls._memory_store.pop(key, None)
-
-    @classmethod
-    def _memory_set(cls, session_key: str, payload_json: str, ttl_seconds: int) -> None:
-        expire_at = time.time() + ttl_seconds
-        cls._memory_store[session_key] = (payload_json, expire_at)
+    def _memory_set(self, session_key: str, payload_json: str, ttl_seconds: int) -> None:
+        self._memory_store.max_entries = max(1, int(self.settings.session_memory_max_entries))
+        self._memory_store.set(session_key, payload_json, ttl_seconds)
 
     @classmethod
     def _memory_get(cls, session_key: str) -> str | None:
-        cls._cleanup_memory_store()
-        value = cls._memory_store.get(session_key)
-        if value is None:
-            return None
-        payload_json, expire_at = value
-        if expire_at <= time.time():
-            cls._memory_store.pop(session_key, None)
-            return None
-        return payload_json
+        return cls._memory_store.get(session_key)
 
     @classmethod
     def _memory_delete(cls, session_key: str) -> None:
-        cls._memory_store.pop(session_key, None)
+        cls._memory_store.pop(session_key)
+
+    @classmethod
+    def purge_expired_memory_sessions(cls) -> int:
+        return cls._memory_store.purge_expired()
 
     async def create_session(self, user_id: int, user_role: str) -> str:
         session_id = secrets.token_urlsafe(32)
@@ -112,3 +101,12 @@ class SessionService:
             await self.redis_client.delete(session_key)
         except (RedisError, OSError) as exc:
             logger.warning("Redis delete failed, fallback to memory session store: %s", exc)
+
+
+async def sweep_memory_sessions(interval_seconds: float) -> None:
+    """Drop expired fallback sessions periodically so idle entries do not linger until read."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        removed = SessionService.purge_expired_memory_sessions()
+        if removed:
+            logger.debug("Purged %s expired memory sessions", removed)
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections.abc import Iterable
+
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings
+from app.core.metrics import observe_cache_load, record_cache_lookup
+from app.core.ttl_cache import TTLCache
+from app.models.user import User
+from app.schemas.user import UserVO
+
+logger = logging.getLogger(__name__)
+
+_REDIS_CACHE_NAME = "user_profile_redis"
+
+
+class _PendingBatch:
+    __slots__ = ("user_ids", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.user_ids: set[int] = set()
+        self.future: asyncio.Future[dict[int, UserVO]] = loop.create_future()
+
+
+class UserProfileCache:
+    """Resolve ``UserVO`` by id through an in-process LRU, Redis and finally the database.
+
+    Lookups that miss the LRU within ``USER_PROFILE_BATCH_WINDOW_MS`` are coalesced into one
+    batch: the first caller waits for the window, then issues a single Redis ``MGET`` and one
+    ``SELECT ... WHERE id IN (...)`` for whatever Redis did not have.
+    """
+
+    _local_cache: TTLCache[int, UserVO] = TTLCache(max_size=4096, name="user_profile")
+    _open_batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PendingBatch]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def __init__(self, redis_client: Redis | None, settings: Settings | None = None) -> None:
+        self.redis_client = redis_client
+        self.settings = settings
+
+    @staticmethod
+    def _cache_key(user_id: int) -> str:
+        return f"cache:user:vo:{user_id}"
+
+    def _redis_ttl_seconds(self) -> int:
+        if self.settings is None:
+            return 300
+        return max(1, int(self.settings.user_profile_cache_ttl_seconds))
+
+    def _local_ttl_seconds(self) -> int:
+        if self.settings is None:
+            return 30
+        return max(1, int(self.settings.user_profile_cache_local_ttl_seconds))
+
+    def _batch_window_seconds(self) -> float:
+        if self.settings is None:
+            return 0.002
+        return max(0, int(self.settings.user_profile_batch_window_ms)) / 1000
+
+    async def load_many(self, db: AsyncSession, user_ids: Iterable[int]) -> dict[int, UserVO]:
+        result: dict[int, UserVO] = {}
+        missing: set[int] = set()
+        for user_id in {item for item in user_ids if item > 0}:
+            cached = self._local_cache.get(user_id)
+            if cached is None:
+                missing.add(user_id)
+            else:
+                result[user_id] = cached
+        if missing:
+            loaded = await self._load_coalesced(db, missing)
+            result.update({user_id: loaded[user_id] for user_id in missing if user_id in loaded})
+        return result
+
+    async def invalidate(self, user_id: int) -> None:
+        self._local_cache.pop(user_id)
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.delete(self._cache_key(user_id))
+        except RedisError as exc:
+            logger.warning("Redis delete failed for user profile cache: %s", exc)
+
+    async def _load_coalesced(self, db: AsyncSession, user_ids: set[int]) -> dict[int, UserVO]:
+        loop = asyncio.get_running_loop()
+        batch = self._open_batches.get(loop)
+        if batch is not None:
+            batch.user_ids.update(user_ids)
+            try:
+                return await asyncio.shield(batch.future)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its client disconnected): load our own ids instead.
+                if not batch.future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await self._load_from_backends(db, user_ids)
+
+        batch = _PendingBatch(loop)
+        batch.user_ids.update(user_ids)
+        self._open_batches[loop] = batch
+        try:
+            try:
+                window = self._batch_window_seconds()
+                if window > 0:
+                    await asyncio.sleep(window)
+            finally:
+                if self._open_batches.get(loop) is batch:
+                    del self._open_batches[loop]
+            loaded = await self._load_from_backends(db, batch.user_ids)
+        except asyncio.CancelledError:
+            batch.future.cancel()
+            raise
+        except BaseException as exc:
+            batch.future.set_exception(exc)
+            # Mark retrieved so an unobserved follower-less batch does not log a warning.
+            batch.future.exception()
+            raise
+        batch.future.set_result(loaded)
+        return loaded
+
+    async def _load_from_backends(self, db: AsyncSession, user_ids: set[int]) -> dict[int, UserVO]:
+        ordered_ids = sorted(user_ids)
+        result = await self._redis_get_many(ordered_ids)
+        db_ids = [user_id for user_id in ordered_ids if user_id not in result]
+        if db_ids:
+            started = time.perf_counter()
+            users = (await db.scalars(select(User).where(User.id.in_(db_ids), User.is_delete == 0))).all()
+            fetched = {item.id: self._to_user_vo(item) for item in users}
+            observe_cache_load(self._local_cache.name, time.perf_counter() - started)
+            await self._redis_set_many(fetched)
+            result.update(fetched)
+
+        local_ttl = self._local_ttl_seconds()
+        for user_id, user_vo in result.items():
+            self._local_cache.set(user_id, user_vo, local_ttl)
+        return result
+
+    async def _redis_get_many(self, user_ids: list[int]) -> dict[int, UserVO]:
+        mget = getattr(self.redis_client, "mget", None)
+        if not callable(mget) or not user_ids:
+            return {}
+        try:
+            values = await mget([self._cache_key(user_id) for user_id in user_ids])
+        except RedisError as exc:
+            logger.warning("Redis mget failed for user profile cache: %s", exc)
+            return {}
+
+        result: dict[int, UserVO] = {}
+        for user_id, value in zip(user_ids, values, strict=False):
+            if not value:
+                continue
+            try:
+                result[user_id] = UserVO.model_validate_json(value)
+            except ValidationError:
+                continue
+        record_cache_lookup(_REDIS_CACHE_NAME, "hit", len(result))
+        record_cache_lookup(_REDIS_CACHE_NAME, "miss", len(user_ids) - len(result))
+        return result
+
+    async def _redis_set_many(self, user_vos: dict[int, UserVO]) -> None:
+        if self.redis_client is None or not user_vos:
+            return
+        ttl_seconds = self._redis_ttl_seconds()
+        items = [
+            (self._cache_key(user_id), user_vo.model_dump_json(by_alias=True)) for user_id, user_vo in user_vos.items()
+        ]
+        pipeline = getattr(self.redis_client, "pipeline", None)
+        try:
+            if callable(pipeline):
+                # One round trip for the whole page of misses, mirroring the batched MGET.
+                pipe = pipeline(transaction=False)
+                for key, value in items:
+                    pipe.setex(key, ttl_seconds, value)
+                await pipe.execute()
+                return
+            for key, value in items:
+                await self.redis_client.setex(key, ttl_seconds, value)
+        except RedisError as exc:
+            logger.warning("Redis setex failed for user profile cache: %s", exc)
+
+    @staticmethod
+    def _to_user_vo(user: User) -> UserVO:
+        return UserVO(
+            id=user.id,
+            user_account=user.user_account,
+            user_name=user.user_name,
+            user_avatar=user.user_avatar,
+            user_profile=user.user_profile,
+            user_role=user.user_role,
+            create_time=user.create_time,
+        )
@@ -1,5 +1,4 @@
 import re
-from math import ceil
 
 from sqlalchemy import Select, asc, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,7 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import Settings
 from app.core.error_codes import ErrorCode
 from app.core.exceptions import BusinessException
-from app.core.security import hash_password, verify_password
+from app.core.page_count import PageCounter, build_total_page, normalize_count_mode
+from app.core.security import PasswordHasher
+from app.core.tracing import start_span
 from app.models.user import User
 from app.schemas.user import (
     LoginUserVO,
@@ -20,7 +21,9 @@ from app.schemas.user import (
     UserUpdateRequest,
     UserVO,
 )
+from app.services.login_user_cache import LoginUserCache
 from app.services.session_service import SessionService
+from app.services.user_profile_cache import UserProfileCache
 
 USER_ROLE_USER = "user"
 USER_ROLE_ADMIN = "admin"
@@ -41,6 +44,16 @@ class UserService:
     def __init__(self, settings: Settings, session_service: SessionService) -> None:
         self.settings = settings
         self.session_service = session_service
+        self.page_counter = PageCounter(settings.list_count_cache_ttl_seconds)
+        self.user_profile_cache = UserProfileCache(session_service.redis_client, settings)
+        self.login_user_cache = LoginUserCache(session_service.redis_client, settings)
+        self.password_hasher = PasswordHasher(
+            max_workers=settings.password_hash_workers,
+            max_pending=settings.password_hash_max_pending,
+            algorithm=settings.password_hash_algorithm,
+            cost=settings.password_hash_cost,
+            legacy_salt=settings.password_salt,
+        )
 
     async def register(self, db: AsyncSession, payload: UserRegisterRequest) -> int:
         user_account = (payload.user_account or "").strip()
@@ -54,7 +67,7 @@ class UserService:
 
         new_user = User(
             user_account=user_account,
-            user_password=hash_password(user_password, self.settings.password_salt),
+            user_password=await self.password_hasher.hash(user_password),
             user_name=f"user_{user_account}",
             user_role=USER_ROLE_USER,
         )
@@ -72,8 +85,13 @@ class UserService:
         user = await db.scalar(self._active_user_select().where(User.user_account == user_account).limit(1))
         if user is None:
             raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid account or password")
-        if not verify_password(user_password, user.user_password, self.settings.password_salt):
+        if not await self.password_hasher.verify(user_password, user.user_password):
             raise BusinessException(ErrorCode.PARAMS_ERROR, "Invalid account or password")
+        if self.password_hasher.needs_rehash(user.user_password):
+            # Upgrade legacy or outdated-cost hashes while the plaintext is at hand.
+            user.user_password = await self.password_hasher.hash(user_password)
+            await db.commit()
+            await db.refresh(user)
 
         session_id = await self.session_service.create_session(user.id, user.user_role)
         return self._to_login_vo(user), session_id
@@ -85,6 +103,16 @@ class UserService:
     async def get_login_user_entity(self, db: AsyncSession, session_id: str | None) -> User:
         if not session_id:
             raise BusinessException(ErrorCode.NOT_LOGIN_ERROR, "Not logged in")
+        with start_span("auth.login_user") as span:
+            user = await self._resolve_login_user(db, session_id)
+            if span is not None:
+                span.set_attribute("enduser.id", user.id)
+            return user
+
+    async def _resolve_login_user(self, db: AsyncSession, session_id: str) -> User:
+        cached_user = self.login_user_cache.get(session_id)
+        if cached_user is not None:
+            return cached_user
 
         session_payload = await self.session_service.get_session(session_id)
         if session_payload is None:
@@ -96,12 +124,14 @@ class UserService:
         if user is None:
             await self.session_service.delete_session(session_id)
             raise BusinessException(ErrorCode.NOT_LOGIN_ERROR, "Not logged in")
+        self.login_user_cache.set(session_id, user)
         return user
 
     async def logout(self, session_id: str | None) -> bool:
         if not session_id:
             return True
         await self.session_service.delete_session(session_id)
+        await self.login_user_cache.invalidate_session(session_id)
         return True
 
     async def add_user(self, db: AsyncSession, payload: UserAddRequest) -> int:
@@ -115,7 +145,7 @@ class UserService:
         user_role = self._normalize_role(payload.user_role)
         new_user = User(
             user_account=user_account,
-            user_password=hash_password("12345678", self.settings.password_salt),
+            user_password=await self.password_hasher.hash("12345678"),
             user_name=(payload.user_name or "").strip() or f"user_{user_account}",
             user_avatar=payload.user_avatar,
             user_profile=payload.user_profile,
@@ -142,6 +172,8 @@ class UserService:
             return False
         user.is_delete = 1
         await db.commit()
+        await self.user_profile_cache.invalidate(user_id)
+        await self.login_user_cache.invalidate_user(user_id)
         return True
 
     async def update_user(self, db: AsyncSession, payload: UserUpdateRequest) -> bool:
@@ -156,6 +188,8 @@ class UserService:
         if payload.user_role is not None:
             user.user_role = self._normalize_role(payload.user_role)
         await db.commit()
+        await self.user_profile_cache.invalidate(user_id)
+        await self.login_user_cache.invalidate_user(user_id)
         return True
 
     async def list_user_vo_by_page(self, db: AsyncSession, payload: UserQueryRequest) -> PageUserVO:
@@ -166,6 +200,7 @@ class UserService:
         if page_size <= 0:
             page_size = 10
         page_size = min(page_size, 100)
+        count_mode = normalize_count_mode(payload.count_mode)
 
         filters = [User.is_delete == 0]
         if payload.id and payload.id > 0:
@@ -192,8 +227,8 @@ class UserService:
 
         offset = (page_num - 1) * page_size
         users = (await db.scalars(query_stmt.offset(offset).limit(page_size))).all()
-        total_row = int(await db.scalar(count_stmt) or 0)
-        total_page = ceil(total_row / page_size) if total_row > 0 else 0
+        total_row = await self.page_counter.count(db, count_stmt, count_mode)
+        total_page = build_total_page(total_row, page_size)
 
         return PageUserVO(
             records=[self._to_user_vo(item) for item in users],
@@ -21,6 +21,15 @@ if config.config_file_name is not None:
 
 target_metadata = metadata
 
+# Search index objects are managed by raw SQL migrations, not by the ORM metadata.
+_UNMANAGED_PREFIXES = ("app_fts", "ix_app_search_")
+
+
+def include_name(name: str | None, type_: str, parent_names: dict[str, str | None]) -> bool:
+    if name is not None and type_ in {"table", "index"}:
+        return not name.startswith(_UNMANAGED_PREFIXES)
+    return True
+
 
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
@@ -29,6 +38,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         compare_type=True,
+        include_name=include_name,
         dialect_opts={"paramstyle": "named"},
     )
     with context.begin_transaction():
@@ -40,6 +50,7 @@ def do_run_migrations(connection: Connection) -> None:
         connection=connection,
         target_metadata=target_metadata,
         compare_type=True,
+        include_name=include_name,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,32 @@
+"""add app keyset pagination indexes
+
+Revision ID: 20261019_0004
+Revises: 20260227_0003
+Create Date: 2026-10-19 10:00:00
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0004"
+down_revision: str | None = "20260227_0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_app_user_id_create_time_id"), "app", ["user_id", "create_time", "id"], unique=False)
+    op.create_index(op.f("ix_app_priority_create_time_id"), "app", ["priority", "create_time", "id"], unique=False)
+    op.create_index(op.f("ix_app_priority_id"), "app", ["priority", "id"], unique=False)
+    op.create_index(op.f("ix_app_create_time_id"), "app", ["create_time", "id"], unique=False)
+    op.create_index(op.f("ix_app_update_time_id"), "app", ["update_time", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_app_update_time_id"), table_name="app")
+    op.drop_index(op.f("ix_app_create_time_id"), table_name="app")
+    op.drop_index(op.f("ix_app_priority_id"), table_name="app")
+    op.drop_index(op.f("ix_app_priority_create_time_id"), table_name="app")
+    op.drop_index(op.f("ix_app_user_id_create_time_id"), table_name="app")
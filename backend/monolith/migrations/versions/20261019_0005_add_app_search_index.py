@@ -0,0 +1,63 @@
+"""add app full-text search index
+
+Revision ID: 20261019_0005
+Revises: 20261019_0004
+Create Date: 2026-10-19 11:00:00
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0005"
+down_revision: str | None = "20261019_0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Keep in sync with AppSearchService.
+_PG_SEARCH_DOCUMENT = "(coalesce(app_name, '') || ' ' || coalesce(init_prompt, ''))"
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        # External-content FTS5 table over app(app_name, init_prompt). The trigram tokenizer
+        # gives substring matching that also works for CJK text without a segmenter.
+        op.execute(
+            "CREATE VIRTUAL TABLE app_fts USING fts5("
+            "app_name, init_prompt, content='app', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER app_fts_ai AFTER INSERT ON app BEGIN "
+            "INSERT INTO app_fts(rowid, app_name, init_prompt) VALUES (new.id, new.app_name, new.init_prompt); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER app_fts_ad AFTER DELETE ON app BEGIN "
+            "INSERT INTO app_fts(app_fts, rowid, app_name, init_prompt) "
+            "VALUES ('delete', old.id, old.app_name, old.init_prompt); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER app_fts_au AFTER UPDATE OF app_name, init_prompt ON app BEGIN "
+            "INSERT INTO app_fts(app_fts, rowid, app_name, init_prompt) "
+            "VALUES ('delete', old.id, old.app_name, old.init_prompt); "
+            "INSERT INTO app_fts(rowid, app_name, init_prompt) VALUES (new.id, new.app_name, new.init_prompt); "
+            "END"
+        )
+        op.execute("INSERT INTO app_fts(app_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(f"CREATE INDEX ix_app_search_trgm ON app USING gin ({_PG_SEARCH_DOCUMENT} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS app_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS app_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS app_fts_ai")
+        op.execute("DROP TABLE IF EXISTS app_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_app_search_trgm")
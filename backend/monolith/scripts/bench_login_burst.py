@@ -0,0 +1,71 @@
+"""Login-burst benchmark: event-loop lag while verifying passwords inline vs. on the hash pool.
+
+Usage (from backend/monolith):
+
+    uv run python scripts/bench_login_burst.py --logins 32 --workers 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.security import PasswordHasher, check_password_hash, make_password_hash  # noqa: E402
+
+_PASSWORD = "Pass12345"
+
+
+async def _probe_loop_lag(interval: float, stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def _run_burst(mode: str, logins: int, workers: int, hashed: str) -> dict[str, float]:
+    hasher = PasswordHasher(max_workers=workers, max_pending=logins)
+
+    async def _login() -> bool:
+        if mode == "inline":
+            return check_password_hash(_PASSWORD, hashed, legacy_salt="")
+        return await hasher.verify(_PASSWORD, hashed)
+
+    samples: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(0.005, stop, samples))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    assert all(results)
+
+    lags_ms = sorted(item * 1000 for item in samples) or [0.0]
+    return {
+        "elapsed_s": elapsed,
+        "logins_per_s": logins / elapsed,
+        "lag_p50_ms": statistics.median(lags_ms),
+        "lag_p99_ms": lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))],
+        "lag_max_ms": lags_ms[-1],
+    }
+
+
+async def _main(logins: int, workers: int) -> None:
+    hashed = make_password_hash(_PASSWORD)
+    for mode in ("inline", "pool"):
+        result = await _run_burst(mode, logins, workers, hashed)
+        summary = " ".join(f"{key}={value:.2f}" for key, value in result.items())
+        print(f"{mode:<6} logins={logins} workers={workers} {summary}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(_main(args.logins, args.workers))
@@ -0,0 +1,109 @@
+"""Middleware benchmark: @app.middleware("http") wrappers vs. the pure ASGI RequestContextMiddleware.
+
+Measures JSON requests/sec and SSE chunks/sec through an in-process ASGI transport, so the numbers
+isolate middleware overhead from network and server costs.
+
+Usage (from backend/monolith):
+
+    uv run python scripts/bench_middleware.py --requests 2000 --chunks 5000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.metrics import record_http_request  # noqa: E402
+from app.core.middleware import RequestContextMiddleware  # noqa: E402
+
+
+def _build_app(mode: str, chunks: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> dict[str, int]:
+        return {"code": 0}
+
+    @app.get("/sse")
+    async def sse() -> StreamingResponse:
+        async def _events() -> AsyncIterator[str]:
+            for index in range(chunks):
+                yield f"data: {index}\n\n"
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    if mode == "asgi":
+        app.add_middleware(RequestContextMiddleware)
+        return app
+
+    # The previous stack: one decorator for request id / timing headers, one for metrics.
+    @app.middleware("http")
+    async def request_log_middleware(request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID", str(uuid4()))
+        start = time.perf_counter()
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Process-Time-Ms"] = f"{(time.perf_counter() - start) * 1000:.2f}"
+        return response
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            record_http_request(request.method, request.url.path, status_code, time.perf_counter() - start)
+
+    return app
+
+
+async def _run(mode: str, requests: int, chunks: int, concurrency: int) -> dict[str, float]:
+    transport = httpx.ASGITransport(app=_build_app(mode, chunks))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one() -> None:
+            async with semaphore:
+                response = await client.get("/ping")
+                assert response.status_code == 200 and "X-Request-ID" in response.headers
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_one() for _ in range(requests)))
+        json_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        received = 0
+        async with client.stream("GET", "/sse") as response:
+            async for _ in response.aiter_raw():
+                received += 1
+        sse_elapsed = time.perf_counter() - started
+
+    return {"req_per_s": requests / json_elapsed, "sse_chunks_per_s": chunks / sse_elapsed}
+
+
+async def _main(requests: int, chunks: int, concurrency: int) -> None:
+    for mode in ("decorator", "asgi"):
+        result = await _run(mode, requests, chunks, concurrency)
+        summary = " ".join(f"{key}={value:.0f}" for key, value in result.items())
+        print(f"{mode:<9} requests={requests} chunks={chunks} {summary}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(_main(args.requests, args.chunks, args.concurrency))
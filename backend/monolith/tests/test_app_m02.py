@@ -77,9 +77,10 @@ def test_codegen_facade_save_html_file() -> None:
 
         try:
             class FakeAiService:
-                async def generate_stream(self, system_prompt: str, user_prompt: str):
+                async def generate_stream(self, system_prompt: str, user_prompt: str, code_gen_type: str):
                     assert system_prompt
                     assert user_prompt
+                    assert code_gen_type == "html"
                     yield "```html\n<html><body><h1>Hello</h1></body></html>\n```"
 
             facade = AiCodeGeneratorFacade(settings)
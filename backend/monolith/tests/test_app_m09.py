@@ -6,6 +6,7 @@ from app.core.config import Settings, get_settings
 from app.core.error_codes import ErrorCode
 from app.dependencies import get_ai_codegen_facade, get_app_settings
 from app.main import app
+from app.services.app_service import AppService
 from app.services.rate_limit_service import RateLimitService
 
 
@@ -141,3 +142,34 @@ def test_m09_chat_rate_limit_blocks_second_request() -> None:
         finally:
             app.dependency_overrides.pop(get_ai_codegen_facade, None)
             app.dependency_overrides.pop(get_app_settings, None)
+
+
+def test_m09_page_cache_serves_serialized_bytes() -> None:
+    suffix = _unique_suffix()
+    AppService._memory_cache.clear()
+
+    with TestClient(app) as client:
+        fake_redis = FakeRedis()
+        app.state.resources.redis_client = fake_redis
+        _register_and_login(client, account=f"m09_cache_{suffix}", password="Pass12345")
+        app_id = _create_app(client, prompt="m09 page cache")
+
+        query = {"pageNum": 1, "pageSize": 10, "sortField": "createTime", "sortOrder": "desc"}
+        first_resp = client.post("/api/app/my/list/page/vo", json=query)
+        assert first_resp.status_code == 200
+        first_body = first_resp.json()
+        assert first_body["code"] == int(ErrorCode.SUCCESS)
+        assert any(item["id"] == app_id for item in first_body["data"]["records"])
+
+        cached_values = [value for _, value in AppService._memory_cache.items()]
+        assert cached_values and all(isinstance(value, bytes) for value in cached_values)
+        redis_values = [value for key, value in fake_redis.store.items() if key.startswith("cache:app:list:")]
+        assert redis_values and redis_values[0] in cached_values
+
+        second_resp = client.post("/api/app/my/list/page/vo", json=query)
+        assert second_resp.status_code == 200
+        assert second_resp.content == first_resp.content
+
+        AppService._memory_cache.clear()
+        third_resp = client.post("/api/app/my/list/page/vo", json=query)
+        assert third_resp.json() == first_body
@@ -0,0 +1,1019 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import sqlite3
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+import anyio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.ai.openai_compatible_service import OpenAICompatibleService
+from app.core import metrics
+from app.core.ai_codegen_facade import AiCodeGeneratorFacade
+from app.core.codegen_workflow import CodeGenWorkflowRunner
+from app.core.config import Settings, get_settings
+from app.core.db_metrics import statement_fingerprint
+from app.core.error_codes import ErrorCode
+from app.core.exceptions import BusinessException
+from app.core.expiring_store import ExpiringStore
+from app.core.loop_monitor import monitor_event_loop
+from app.core.memory import StreamBuffer, configure_tracemalloc
+from app.core.logging_config import JsonFormatter, RequestLogSampler
+from app.core.page_count import PageCounter
+from app.core.profiler import ContinuousProfiler
+from app.core.rate_limit import (
+    SUPPORTED_RATE_LIMIT_ALGORITHMS,
+    MemoryRateLimiter,
+    RateLimitRule,
+    parse_rate_limit_routes,
+)
+from app.core.security import PasswordHasher, hash_password
+from app.core.tracing import configure_tracing, parse_traceparent, shutdown_tracing
+from app.core.ttl_cache import TTLCache
+from app.dependencies import get_ai_codegen_facade
+from app.main import app
+from app.models.user import User
+from app.services.app_search_service import AppSearchService
+from app.services.app_service import AppService
+from app.services.concurrency_limit_service import ConcurrencyLimitService
+from app.services.login_user_cache import LoginUserCache
+from app.services.rate_limit_service import RateLimitService
+from app.services.user_profile_cache import UserProfileCache
+
+
+class _FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, str]] = []
+
+    def setex(self, key: str, _: int, value: str) -> "_FakePipeline":
+        self.commands.append((key, value))
+        return self
+
+    async def execute(self) -> list[bool]:
+        self.redis.pipeline_executions += 1
+        self.redis.store.update(self.commands)
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, str] = {}
+        self.pipeline_executions = 0
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def setex(self, key: str, _: int, value: str) -> bool:
+        self.store[key] = value
+        return True
+
+    async def get(self, key: str) -> str | None:
+        return self.store.get(key)
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        return [self.store.get(key) for key in keys]
+
+    async def aclose(self) -> None:
+        return None
+
+
+def _unique_suffix() -> str:
+    return uuid4().hex[:8]
+
+
+def _register_and_login(client: TestClient, account: str, password: str) -> None:
+    client.post(
+        "/api/user/register",
+        json={"userAccount": account, "userPassword": password, "checkPassword": password},
+    )
+    resp = client.post("/api/user/login", json={"userAccount": account, "userPassword": password})
+    assert resp.status_code == 200
+    assert resp.json()["code"] == int(ErrorCode.SUCCESS)
+
+
+def _create_app(client: TestClient, prompt: str) -> int:
+    resp = client.post("/api/app/add", json={"initPrompt": prompt, "codeGenType": "html"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["code"] == int(ErrorCode.SUCCESS)
+    return int(body["data"])
+
+
+def test_m12_my_app_list_cursor_pagination() -> None:
+    suffix = _unique_suffix()
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_cursor_{suffix}", password="Pass12345")
+        app_ids = [_create_app(client, prompt=f"m12 cursor {index}") for index in range(5)]
+
+        seen: list[int] = []
+        cursor: str | None = None
+        for _ in range(5):
+            query = {"pageMode": "cursor", "pageSize": 2, "sortField": "createTime", "sortOrder": "desc"}
+            if cursor:
+                query["cursor"] = cursor
+            resp = client.post("/api/app/my/list/page/vo", json=query)
+            body = resp.json()
+            assert body["code"] == int(ErrorCode.SUCCESS)
+            assert len(body["data"]["records"]) <= 2
+            seen.extend(item["id"] for item in body["data"]["records"])
+            cursor = body["data"]["nextCursor"]
+            if cursor is None:
+                break
+            if len(seen) == 2:
+                # The token carries the anchor's sort value, so deleting the anchor row must not end paging.
+                assert client.post("/api/app/delete", json={"id": seen[-1]}).json()["code"] == int(ErrorCode.SUCCESS)
+
+        assert seen == sorted(app_ids, reverse=True)
+
+        priority_seen: list[int] = []
+        cursor = None
+        for _ in range(5):
+            query = {"pageMode": "cursor", "pageSize": 2, "sortField": "priority", "sortOrder": "asc"}
+            if cursor:
+                query["cursor"] = cursor
+            body = client.post("/api/app/my/list/page/vo", json=query).json()
+            priority_seen.extend(item["id"] for item in body["data"]["records"])
+            cursor = body["data"]["nextCursor"]
+            if cursor is None:
+                break
+        assert priority_seen == sorted(app_ids[:3] + app_ids[4:])
+
+        offset_resp = client.post("/api/app/my/list/page/vo", json={"pageNum": 2, "pageSize": 2})
+        offset_body = offset_resp.json()
+        assert offset_body["code"] == int(ErrorCode.SUCCESS)
+        assert offset_body["data"]["nextCursor"] is None
+        remaining = [app_id for app_id in seen if app_id != seen[1]]
+        assert [item["id"] for item in offset_body["data"]["records"]] == remaining[2:4]
+
+
+def test_m12_cursor_pagination_rejects_bad_cursor() -> None:
+    suffix = _unique_suffix()
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_badcur_{suffix}", password="Pass12345")
+        _create_app(client, prompt="m12 bad cursor")
+
+        resp = client.post(
+            "/api/app/my/list/page/vo",
+            json={"pageMode": "cursor", "cursor": "not-a-cursor", "pageSize": 2},
+        )
+        assert resp.json()["code"] == int(ErrorCode.PARAMS_ERROR)
+
+        for sort_field in ("deployedTime", "appName"):
+            resp = client.post(
+                "/api/app/my/list/page/vo",
+                json={"pageMode": "cursor", "sortField": sort_field, "pageSize": 2},
+            )
+            assert resp.json()["code"] == int(ErrorCode.PARAMS_ERROR)
+
+        forged = base64.urlsafe_b64encode(b'{"id":5,"v":"high","s":"priority","d":1}').decode().rstrip("=")
+        resp = client.post(
+            "/api/app/my/list/page/vo",
+            json={"pageMode": "cursor", "sortField": "priority", "cursor": forged, "pageSize": 2},
+        )
+        assert resp.json()["code"] == int(ErrorCode.PARAMS_ERROR)
+
+
+def test_m12_list_count_modes() -> None:
+    suffix = _unique_suffix()
+    PageCounter._memory_cache.clear()
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_count_{suffix}", password="Pass12345")
+        app_id = _create_app(client, prompt="m12 count mode")
+
+        none_resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "countMode": "none"})
+        none_body = none_resp.json()
+        assert none_body["code"] == int(ErrorCode.SUCCESS)
+        assert none_body["data"]["totalRow"] == -1
+        assert none_body["data"]["totalPage"] == -1
+        assert [item["id"] for item in none_body["data"]["records"]] == [app_id]
+
+        cached_resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "countMode": "cached"})
+        assert cached_resp.json()["data"]["totalRow"] == 1
+        _create_app(client, prompt="m12 count mode second")
+        cached_again = client.post(
+            "/api/app/my/list/page/vo",
+            json={"pageSize": 10, "countMode": "cached", "sortField": "id"},
+        )
+        cached_again_body = cached_again.json()
+        assert len(cached_again_body["data"]["records"]) == 2
+        assert cached_again_body["data"]["totalRow"] == 1
+
+        exact_resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "countMode": "exact"})
+        assert exact_resp.json()["data"]["totalRow"] == 2
+        PageCounter._memory_cache.clear()
+        estimated_resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "countMode": "estimated"})
+        assert estimated_resp.json()["data"]["totalRow"] == 2
+
+        chat_resp = client.get(f"/api/chatHistory/app/{app_id}", params={"pageSize": 10, "countMode": "none"})
+        chat_body = chat_resp.json()
+        assert chat_body["code"] == int(ErrorCode.SUCCESS)
+        assert chat_body["data"]["totalRow"] == -1
+
+        bad_resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "countMode": "bogus"})
+        assert bad_resp.json()["code"] == int(ErrorCode.PARAMS_ERROR)
+
+
+def test_m12_app_list_search_text() -> None:
+    suffix = _unique_suffix()
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_search_{suffix}", password="Pass12345")
+        matched_id = _create_app(client, prompt=f"做一个番茄钟 timer{suffix} 应用")
+        other_id = _create_app(client, prompt=f"做一个天气 widget{suffix} 应用")
+
+        resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "searchText": f"timer{suffix}"})
+        body = resp.json()
+        assert body["code"] == int(ErrorCode.SUCCESS)
+        assert [item["id"] for item in body["data"]["records"]] == [matched_id]
+        assert body["data"]["totalRow"] == 1
+
+        resp = client.post("/api/app/my/list/page/vo", json={"pageSize": 10, "searchText": f"番茄 {suffix}"})
+        assert [item["id"] for item in resp.json()["data"]["records"]] == [matched_id]
+
+        update_resp = client.post("/api/app/update", json={"id": other_id, "appName": f"renamed{suffix}"})
+        assert update_resp.json()["code"] == int(ErrorCode.SUCCESS)
+        resp = client.post(
+            "/api/app/my/list/page/vo",
+            json={"pageSize": 10, "pageMode": "cursor", "searchText": f"renamed{suffix}"},
+        )
+        assert [item["id"] for item in resp.json()["data"]["records"]] == [other_id]
+
+
+def test_m12_app_search_reprobes_missing_index() -> None:
+    class _ProbeSession:
+        def __init__(self) -> None:
+            self.results: list[int | None] = [None, 1]
+            self.probes = 0
+
+        async def scalar(self, *_args: object) -> int | None:
+            self.probes += 1
+            return self.results.pop(0)
+
+    db = _ProbeSession()
+    service = AppSearchService()
+    AppSearchService._availability.pop("postgresql", None)
+    AppSearchService._missing_until.pop("postgresql", None)
+
+    async def _scenario() -> None:
+        assert await service._is_available(db, "postgresql") is False
+        assert await service._is_available(db, "postgresql") is False
+        assert db.probes == 1
+        # Once the retry window has passed, a newly created index is picked up without a restart.
+        AppSearchService._missing_until["postgresql"] = 0.0
+        assert await service._is_available(db, "postgresql") is True
+        assert await service._is_available(db, "postgresql") is True
+        assert db.probes == 2
+
+    try:
+        asyncio.run(_scenario())
+    finally:
+        AppSearchService._availability.pop("postgresql", None)
+        AppSearchService._missing_until.pop("postgresql", None)
+
+
+def test_m12_app_entity_cache_invalidated_on_write() -> None:
+    suffix = _unique_suffix()
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_entity_{suffix}", password="Pass12345")
+        app_id = _create_app(client, prompt="m12 entity cache")
+
+        resp = client.get(f"/api/chatHistory/app/{app_id}", params={"pageSize": 10})
+        assert resp.json()["code"] == int(ErrorCode.SUCCESS)
+        cached = AppService._entity_cache.get(app_id)
+        assert cached is not None
+        assert cached.init_prompt == "m12 entity cache"
+
+        client.post("/api/app/update", json={"id": app_id, "appName": f"renamed{suffix}"})
+        assert AppService._entity_cache.get(app_id) is None
+
+        client.get(f"/api/chatHistory/app/{app_id}", params={"pageSize": 10})
+        assert AppService._entity_cache.get(app_id).app_name == f"renamed{suffix}"
+
+        delete_resp = client.post("/api/app/delete", json={"id": app_id})
+        assert delete_resp.json()["code"] == int(ErrorCode.SUCCESS)
+        resp = client.get(f"/api/chatHistory/app/{app_id}", params={"pageSize": 10})
+        assert resp.json()["code"] == int(ErrorCode.NOT_FOUND_ERROR)
+
+
+def test_m12_app_page_cache_local_ttl_capped_only_with_redis() -> None:
+    settings = Settings(app_query_cache_ttl_seconds=30, app_query_cache_local_ttl_seconds=5)
+    key = f"m12:page:{_unique_suffix()}"
+
+    async def remaining_ttl(service: AppService) -> float:
+        await service._cache_set(key, b"page", 30)
+        _, expires_at = AppService._memory_cache._entries[key]
+        AppService._memory_cache.pop(key)
+        return expires_at - time.monotonic()
+
+    assert anyio.run(remaining_ttl, AppService(settings)) > 25
+    assert anyio.run(remaining_ttl, AppService(settings, FakeRedis())) <= 5
+
+
+class _CountingUserSession:
+    def __init__(self, users: list[User]) -> None:
+        self.users = users
+        self.query_count = 0
+
+    async def scalars(self, _stmt: object) -> "_CountingUserSession":
+        self.query_count += 1
+        return self
+
+    def all(self) -> list[User]:
+        return self.users
+
+
+def test_m12_user_profile_cache_coalesces_and_invalidates() -> None:
+    users = [
+        User(id=910001, user_account="m12_profile_a", user_role="user"),
+        User(id=910002, user_account="m12_profile_b", user_role="user"),
+    ]
+    db = _CountingUserSession(users)
+    redis_client = FakeRedis()
+    cache = UserProfileCache(redis_client)
+    for user in users:
+        UserProfileCache._local_cache.pop(user.id)
+
+    async def _scenario() -> None:
+        first, second = await asyncio.gather(
+            cache.load_many(db, [910001]),
+            cache.load_many(db, [910002, 910001]),
+        )
+        assert set(first) == {910001}
+        assert set(second) == {910001, 910002}
+        assert db.query_count == 1
+        assert "cache:user:vo:910002" in redis_client.store
+        assert redis_client.pipeline_executions == 1
+
+        await cache.load_many(db, [910001, 910002])
+        assert db.query_count == 1
+
+        await cache.invalidate(910002)
+        assert "cache:user:vo:910002" not in redis_client.store
+        reloaded = await cache.load_many(db, [910002])
+        assert reloaded[910002].user_account == "m12_profile_b"
+        assert db.query_count == 2
+
+    asyncio.run(_scenario())
+
+
+def test_m12_user_profile_cache_followers_survive_cancelled_leader() -> None:
+    users = [
+        User(id=910011, user_account="m12_profile_c", user_role="user"),
+        User(id=910012, user_account="m12_profile_d", user_role="user"),
+    ]
+    db = _CountingUserSession(users)
+    cache = UserProfileCache(FakeRedis(), Settings(user_profile_batch_window_ms=50))
+    for user in users:
+        UserProfileCache._local_cache.pop(user.id)
+
+    async def _scenario() -> None:
+        leader = asyncio.create_task(cache.load_many(db, [910011]))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.load_many(db, [910012]))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        loaded = await asyncio.wait_for(follower, timeout=1)
+        assert set(loaded) == {910012}
+        assert leader.cancelled()
+
+    asyncio.run(_scenario())
+
+
+def test_m12_login_user_cache_hits_and_invalidates() -> None:
+    suffix = _unique_suffix()
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_sess_{suffix}", password="Pass12345")
+
+        first = client.get("/api/user/get/login").json()
+        assert first["code"] == int(ErrorCode.SUCCESS)
+        user_id = first["data"]["id"]
+        app.state.resources.redis_client.store.clear()
+        cached = client.get("/api/user/get/login").json()
+        assert cached["code"] == int(ErrorCode.SUCCESS)
+        assert cached["data"]["id"] == user_id
+
+        metrics_text = client.get("/metrics").text
+        assert 'python_ai_mother_cache_requests_total{cache="login_user",result="hit"}' in metrics_text
+
+        session_ids = [key for key, values in LoginUserCache._entries.items() if values["id"] == user_id]
+        assert len(session_ids) == 1
+        LoginUserCache.apply_invalidation(f'{{"userId": {user_id}}}')
+        assert LoginUserCache._entries.get(session_ids[0]) is None
+
+        _register_and_login(client, account=f"m12_sess_{suffix}", password="Pass12345")
+        assert client.get("/api/user/get/login").json()["code"] == int(ErrorCode.SUCCESS)
+        client.post("/api/user/logout")
+        assert client.get("/api/user/get/login").json()["code"] == int(ErrorCode.NOT_LOGIN_ERROR)
+
+
+def test_m12_password_hasher_runs_off_loop_and_reports_queue() -> None:
+    hasher = PasswordHasher(max_workers=2, max_pending=8, legacy_salt="m12-salt")
+    hashed = hash_password("Pass12345", "m12-salt")
+
+    async def _scenario() -> list[bool]:
+        return await asyncio.gather(
+            hasher.verify("Pass12345", hashed),
+            hasher.verify("wrong-password", hashed),
+            hasher.verify("Pass12345", await hasher.hash("Pass12345")),
+        )
+
+    ok, bad, rehashed_ok = asyncio.run(_scenario())
+    assert ok is True
+    assert bad is False
+    assert rehashed_ok is True
+
+    with TestClient(app) as client:
+        metrics_text = client.get("/metrics").text
+    assert "python_ai_mother_password_hash_pending 0" in metrics_text
+    assert 'python_ai_mother_password_hash_queue_wait_seconds_count{operation="verify"}' in metrics_text
+
+
+def _sqlite_db_path() -> Path:
+    settings = get_settings()
+    prefix = "sqlite+aiosqlite:///"
+    if not settings.database_url.startswith(prefix):
+        raise RuntimeError("Tests currently only support sqlite database_url")
+    return Path(settings.database_url[len(prefix) :]).resolve()
+
+
+def test_m12_legacy_password_hash_rehashed_on_login() -> None:
+    suffix = _unique_suffix()
+    account = f"m12_legacy_{suffix}"
+    legacy_hash = hash_password("Pass12345", get_settings().password_salt)
+    with sqlite3.connect(_sqlite_db_path()) as conn:
+        conn.execute(
+            "INSERT INTO user (user_account, user_password, user_name, user_role, is_delete) VALUES (?, ?, ?, ?, 0)",
+            (account, legacy_hash, "legacy", "user"),
+        )
+        conn.commit()
+
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=account, password="Pass12345")
+        with sqlite3.connect(_sqlite_db_path()) as conn:
+            stored = conn.execute("SELECT user_password FROM user WHERE user_account = ?", (account,)).fetchone()[0]
+        algorithm, cost, salt, _ = stored.split("$")
+        assert algorithm == "pbkdf2_sha256"
+        assert cost == str(get_settings().password_hash_cost)
+        assert len(salt) == 32
+        _register_and_login(client, account=account, password="Pass12345")
+
+    scrypt_hasher = PasswordHasher(algorithm="scrypt", cost=1024)
+
+    async def _scrypt_roundtrip() -> tuple[str, str, bool]:
+        first = await scrypt_hasher.hash("Pass12345")
+        second = await scrypt_hasher.hash("Pass12345")
+        return first, second, await scrypt_hasher.verify("Pass12345", first)
+
+    first, second, verified = asyncio.run(_scrypt_roundtrip())
+    assert first.startswith("scrypt$1024$")
+    assert first != second
+    assert verified is True
+    assert scrypt_hasher.needs_rehash(legacy_hash) is True
+
+
+def test_m12_expiring_store_lazy_expiry_and_max_entries() -> None:
+    store: ExpiringStore[str, str] = ExpiringStore(max_entries=3)
+    store.set("expired", "x", 0)
+    store.set("a", "1", 60)
+    store.set("b", "2", 120)
+    assert store.get("expired") is None
+    assert store.get("a") == "1"
+
+    store.set("a", "1-new", 300)
+    store.set("c", "3", 180)
+    store.set("d", "4", 240)
+    assert len(store) == 3
+    assert store.get("b") is None
+    assert [store.get(key) for key in ("a", "c", "d")] == ["1-new", "3", "4"]
+
+    store.pop("c")
+    store.set("short", "s", 0.01)
+    time.sleep(0.02)
+    assert store.purge_expired() == 1
+    assert len(store) == 2
+
+
+def test_m12_memory_rate_limit_algorithms_and_route_rules() -> None:
+    rule = RateLimitRule(limit=3, window_seconds=60)
+    for algorithm in sorted(SUPPORTED_RATE_LIMIT_ALGORITHMS):
+        limiter = MemoryRateLimiter(ExpiringStore())
+        decisions = [limiter.check(algorithm, "ratelimit:test", rule) for _ in range(4)]
+        assert [item.allowed for item in decisions] == [True, True, True, False], algorithm
+        assert 0 < decisions[-1].retry_after_ms <= 60_000, algorithm
+
+    assert parse_rate_limit_routes(" gen-code:20/60, gen-workflow:5/30 ") == {
+        "gen-code": RateLimitRule(limit=20, window_seconds=60),
+        "gen-workflow": RateLimitRule(limit=5, window_seconds=30),
+    }
+
+    settings = Settings(**get_settings().model_dump())
+    settings.chat_rate_limit_routes = "gen-code:20/60"
+    first = RateLimitService(redis_client=None, settings=settings)
+    second = RateLimitService(redis_client=None, settings=settings)
+    assert first._route_rules is second._route_rules
+    assert first._resolve_rule("gen-code") == RateLimitRule(limit=20, window_seconds=60)
+    assert first._resolve_rule("other") == RateLimitRule(
+        limit=settings.chat_rate_limit_count,
+        window_seconds=settings.chat_rate_limit_window_seconds,
+    )
+
+
+def test_m12_memory_rate_limit_store_reports_cache_metrics() -> None:
+    settings = Settings(**get_settings().model_dump())
+    settings.chat_rate_limit_count = 2
+    settings.chat_rate_limit_algorithm = "fixed_window"
+    settings.chat_rate_limit_routes = ""
+    service = RateLimitService(redis_client=None, settings=settings)
+    RateLimitService._memory_store.clear()
+    before = metrics._CACHE_REQUESTS.collect()
+
+    async def _run() -> None:
+        for _ in range(3):
+            try:
+                await service.assert_chat_rate_limit(43, route="gen-code")
+            except BusinessException:
+                pass
+
+    try:
+        asyncio.run(_run())
+        after = metrics._CACHE_REQUESTS.collect()
+        for result, expected in (("miss", 1), ("hit", 2)):
+            labels = ("rate_limit_memory", result)
+            assert after.get(labels, 0) - before.get(labels, 0) == expected
+        entries, size = metrics.cache_sizes()["rate_limit_memory"]
+        assert entries == 1 and size
+    finally:
+        RateLimitService._memory_store.clear()
+
+
+def test_m12_generation_concurrency_limit_memory_leases() -> None:
+    settings = Settings(**get_settings().model_dump())
+    settings.generation_max_concurrent_per_user = 1
+    settings.generation_max_concurrent_per_app = 0
+    settings.generation_max_concurrent_global = 0
+    service = ConcurrencyLimitService(redis_client=None, settings=settings)
+    ConcurrencyLimitService._memory_leases.clear()
+
+    async def _run() -> None:
+        lease = await service.acquire(user_id=7, app_id=1)
+        try:
+            await service.acquire(user_id=7, app_id=2)
+        except BusinessException as exc:
+            assert exc.code == ErrorCode.PARAMS_ERROR
+        else:
+            raise AssertionError("second in-flight generation should be rejected")
+        other_user = await service.acquire(user_id=8, app_id=3)
+        await other_user.release()
+
+        await lease.release()
+        again = await service.acquire(user_id=7, app_id=2)
+
+        async def _failing_heartbeat() -> None:
+            raise OSError("heartbeat failed")
+
+        again._heartbeat_task.cancel()
+        again._heartbeat_task = asyncio.create_task(_failing_heartbeat())
+        await asyncio.sleep(0)
+        await again.release()
+
+        async def _disconnected_stream() -> None:
+            lease = await service.acquire(user_id=9, app_id=4)
+            try:
+                await asyncio.sleep(60)
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await lease.release()
+
+        # Starlette cancels the response's task group when the client goes away.
+        async with anyio.create_task_group() as group:
+            group.start_soon(_disconnected_stream)
+            await asyncio.sleep(0.01)
+            group.cancel_scope.cancel()
+
+    asyncio.run(_run())
+    assert ConcurrencyLimitService._memory_leases == {}
+
+
+class _LeasingScriptRedis:
+    """Grants tokens like the fixed-window script and counts round-trips."""
+
+    def __init__(self, limit: int) -> None:
+        self.remaining = limit
+        self.calls = 0
+
+    def register_script(self, _source: str):
+        async def _run(keys: list[str], args: list[object]) -> list[int]:
+            self.calls += 1
+            granted = min(int(args[3]), self.remaining)
+            self.remaining -= granted
+            return [granted, 0 if granted else 30_000]
+
+        return _run
+
+
+def test_m12_rate_limit_leases_tokens_locally_in_batches() -> None:
+    settings = Settings(**get_settings().model_dump())
+    settings.chat_rate_limit_count = 10
+    settings.chat_rate_limit_algorithm = "fixed_window"
+    settings.chat_rate_limit_routes = ""
+    settings.chat_rate_limit_local_tolerance = 0.4
+    redis = _LeasingScriptRedis(limit=10)
+    service = RateLimitService(redis_client=redis, settings=settings)
+    RateLimitService._local_allotments.clear()
+
+    async def _run() -> list[bool]:
+        results = []
+        for _ in range(12):
+            try:
+                await service.assert_chat_rate_limit(42, route="gen-code")
+                results.append(True)
+            except BusinessException as exc:
+                assert "30 秒" in exc.message
+                results.append(False)
+        return results
+
+    try:
+        assert asyncio.run(_run()) == [True] * 10 + [False] * 2
+        # Batches of 4, 4 and 2 tokens, then one denial that is remembered locally.
+        assert redis.calls == 4
+    finally:
+        RateLimitService._local_allotments.clear()
+
+
+def test_m12_request_log_sampling_and_json_format(caplog: pytest.LogCaptureFixture) -> None:
+    sampler = RequestLogSampler(success_rate=0.0, probe_rate=0.0, slow_ms=500, probe_paths=("/api/health", "/metrics"))
+    assert sampler.should_log("/api/health/", 200, 3) is False
+    assert sampler.should_log("/api/app/list/page/vo", 200, 3) is False
+    assert sampler.should_log("/api/app/list/page/vo", 404, 3) is True
+    assert sampler.should_log("/metrics", 200, 800) is True
+    assert RequestLogSampler(1.0, 0.0, 500, ("/metrics",)).should_log("/api/user/get/login", 200, 3) is True
+
+    record = logging.makeLogRecord(
+        {"name": "app.request", "levelname": "INFO", "msg": "GET %s", "args": ("/x",), "request_id": "rid-1"}
+    )
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "GET /x"
+    assert payload["request_id"] == "rid-1"
+    assert payload["logger"] == "app.request"
+
+    # The default text format prints only the message, so it must carry the request id itself.
+    with TestClient(app) as client, caplog.at_level(logging.INFO, logger="app.request"):
+        client.get("/api/user/get/login", headers={"X-Request-Id": "rid-text-1"})
+    assert any(
+        record.name == "app.request" and record.getMessage().endswith("request_id=rid-text-1")
+        for record in caplog.records
+    )
+
+
+def test_m12_metrics_merge_worker_snapshots(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics, "_multiproc_dir", tmp_path)
+    metrics.record_http_request("GET", "/m12/multiproc", 200, 0.02)
+    # A live sibling worker counts; an exited worker and a leftover from an earlier run are removed.
+    sibling = {
+        "pid": os.getppid(),
+        "metrics": {
+            "python_ai_mother_http_requests_total": [[["GET", "/m12/multiproc", "200"], 2]],
+            "python_ai_mother_http_request_duration_seconds": [
+                [["GET", "/m12/multiproc"], [0, 1, *([0] * 14), 1, 3.5]]
+            ],
+        },
+    }
+    exited = {
+        "pid": 2**22 + 7,
+        "metrics": {
+            "python_ai_mother_http_requests_total": [[["GET", "/m12/multiproc", "200"], 50]],
+            "python_ai_mother_password_hash_pending": [[[], 9]],
+        },
+    }
+    (tmp_path / f"metrics_{os.getppid()}.json").write_text(json.dumps(sibling), encoding="utf-8")
+    (tmp_path / "metrics_4194311.json").write_text(json.dumps(exited), encoding="utf-8")
+    leftover = tmp_path / "metrics_1.json"
+    leftover.write_text(json.dumps({**exited, "pid": 1}), encoding="utf-8")
+    os.utime(leftover, (time.time() - 3600, time.time() - 3600))
+
+    text = metrics._render_metrics()
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+    assert 'python_ai_mother_http_requests_total{method="GET",route="/m12/multiproc",status_code="200"} 3' in text
+    assert 'python_ai_mother_http_request_duration_seconds_bucket{method="GET",route="/m12/multiproc",le="0.05"} 2' in text
+    assert 'python_ai_mother_http_request_duration_seconds_count{method="GET",route="/m12/multiproc"} 3' in text
+    assert "python_ai_mother_password_hash_pending 0" in text
+    assert not (tmp_path / "metrics_4194311.json").exists() and not leftover.exists()
+
+    # Periodic and scrape-time flushes overlap on different threads; none may fail or leave temp files.
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: metrics.flush_metrics(), range(64)))
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_m12_llm_stream_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
+    sse_body = (
+        'data: {"choices":[{"delta":{"content":"<html>"}}]}\n\n'
+        'data: {"choices":[{"delta":{"content":"</html>"}}]}\n\n'
+        'data: {"choices":[],"usage":{"completion_tokens":7}}\n\n'
+        "data: [DONE]\n\n"
+    )
+    real_client = httpx.AsyncClient
+
+    def _client(**kwargs: object) -> httpx.AsyncClient:
+        transport = httpx.MockTransport(lambda _request: httpx.Response(200, text=sse_body))
+        return real_client(transport=transport, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", _client)
+    settings = Settings(**get_settings().model_dump())
+    settings.llm_base_url = "http://llm.m12.test/v1"
+    settings.llm_api_key = "test-key"
+    settings.llm_model_name = "m12-model"
+    service = OpenAICompatibleService(settings)
+
+    async def _collect() -> list[str]:
+        return [chunk async for chunk in service.generate_stream("system", "user", code_gen_type="html")]
+
+    assert asyncio.run(_collect()) == ["<html>", "</html>"]
+    text = metrics._render_metrics()
+    labels = 'model="m12-model",endpoint="llm.m12.test",code_gen_type="html"'
+    assert f"python_ai_mother_llm_time_to_first_token_seconds_count{{{labels}}} 1" in text
+    assert f"python_ai_mother_llm_inter_chunk_seconds_count{{{labels}}} 1" in text
+    assert f"python_ai_mother_llm_queue_wait_seconds_count{{{labels}}} 1" in text
+    assert f"python_ai_mother_llm_generation_seconds_count{{{labels}}} 1" in text
+    assert f"python_ai_mother_llm_output_chars_total{{{labels}}} 13" in text
+    assert f"python_ai_mother_llm_output_tokens_total{{{labels}}} 7" in text
+
+
+def test_m12_workflow_events_carry_stage_durations() -> None:
+    class FakeFacade:
+        async def generate_and_save_code_stream(self, **_kwargs: object):
+            yield "<html></html>"
+
+    runner = CodeGenWorkflowRunner(get_settings())
+    runner.facade = FakeFacade()  # type: ignore[assignment]
+
+    async def _collect() -> list[object]:
+        return [
+            item
+            async for item in runner.run_stream(
+                app_id=1,
+                user_message="生成一个带图片的页面",
+                code_gen_type="html",
+                edit_mode="full",
+            )
+        ]
+
+    events = [item for item in asyncio.run(_collect()) if isinstance(item, dict)]
+    ended = {item["node"]: item for item in events if item["event"] == "end"}
+    assert set(ended) == {"router", "asset_collector", "quality_checker", "parallel", "code_generator"}
+    assert all(isinstance(item["durationMs"], float) and item["durationMs"] >= 0 for item in ended.values())
+    assert all("durationMs" not in item for item in events if item["event"] == "start")
+
+    text = metrics._render_metrics()
+    assert 'python_ai_mother_generation_stage_seconds_count{stage="asset_collector",code_gen_type="html"}' in text
+
+
+def test_m12_db_query_metrics_and_fingerprints() -> None:
+    assert (
+        statement_fingerprint("SELECT app.id, app.app_name\nFROM app WHERE app.id IN (?, ?, ?) LIMIT 10 OFFSET 20")
+        == "SELECT … FROM app WHERE app.id IN (?) LIMIT ? OFFSET ?"
+    )
+    assert statement_fingerprint("UPDATE app SET cover=$1::text WHERE app.id = $2") == (
+        "UPDATE app SET cover=?::text WHERE app.id = ?"
+    )
+
+    with TestClient(app) as client:
+        account = f"m12_nobody_{uuid4().hex[:8]}"
+        client.post("/api/user/login", json={"userAccount": account, "userPassword": "12345678"})
+        metrics_text = client.get("/metrics").text
+
+    user_lookup = "SELECT … FROM user WHERE user.is_delete = ? AND user.user_account = ?"
+    assert f'python_ai_mother_db_query_seconds_count{{statement="{user_lookup}' in metrics_text
+    assert "python_ai_mother_db_pool_checkout_wait_seconds_count" in metrics_text
+    assert "python_ai_mother_db_pool_saturation_ratio" in metrics_text
+
+
+def test_m12_event_loop_monitor_reports_blocking_stack(caplog: pytest.LogCaptureFixture) -> None:
+    def _blocking_call() -> None:
+        time.sleep(0.4)
+
+    async def _run() -> None:
+        monitor = asyncio.create_task(monitor_event_loop(0.05, stall_ms=100, capture_stacks=True))
+        await asyncio.sleep(0.12)
+        _blocking_call()
+        await asyncio.sleep(0.12)
+        monitor.cancel()
+        await asyncio.gather(monitor, return_exceptions=True)
+
+    with caplog.at_level(logging.WARNING, logger="app.loop"):
+        asyncio.run(_run())
+
+    stalls = [record for record in caplog.records if record.name == "app.loop"]
+    assert stalls and "_blocking_call" in stalls[0].getMessage()
+    text = metrics._render_metrics()
+    assert "python_ai_mother_event_loop_lag_seconds_count" in text
+    stall_lines = [line for line in text.splitlines() if line.startswith("python_ai_mother_event_loop_stalls_total ")]
+    assert stall_lines and float(stall_lines[0].split()[-1]) >= 1
+
+
+def test_m12_cache_metrics_report_lookups_evictions_and_size(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics, "_CACHE_SOURCES", [])
+    name = f"test_cache_{uuid4().hex[:8]}"
+    cache: TTLCache[str, bytes] = TTLCache(max_size=2, name=name, stale_seconds=60)
+    cache.set("a", b"x" * 100, 0)
+    assert cache.get("a") is None
+    assert cache.get_stale("a") == b"x" * 100
+
+    async def load() -> bytes:
+        return b"loaded"
+
+    cache.set("b", b"y" * 10, 60)
+    cache.set("c", b"z" * 10, 60)
+    assert cache.get("b") == b"y" * 10
+    assert asyncio.run(cache.get_or_load("d", load, 60)) == b"loaded"
+    assert asyncio.run(cache.get_or_load("d", load, 60)) == b"loaded"
+
+    text = metrics._render_metrics()
+    assert f'python_ai_mother_cache_requests_total{{cache="{name}",result="hit"}} 2' in text
+    assert f'python_ai_mother_cache_requests_total{{cache="{name}",result="miss"}} 2' in text
+    assert f'python_ai_mother_cache_requests_total{{cache="{name}",result="stale"}} 1' in text
+    assert f'python_ai_mother_cache_evictions_total{{cache="{name}",reason="capacity"}} 2' in text
+    assert f'python_ai_mother_cache_entries{{cache="{name}"}} 2' in text
+    assert f'python_ai_mother_cache_bytes{{cache="{name}"}} 16' in text
+    assert f'python_ai_mother_cache_load_seconds_count{{cache="{name}"}} 1' in text
+
+
+def test_m12_histogram_layouts_configurable_and_sparse(monkeypatch: pytest.MonkeyPatch) -> None:
+    histogram = metrics.Histogram("python_ai_mother_test_layout_seconds", "test", ("route",))
+    monkeypatch.setitem(metrics._REGISTRY, histogram.name, histogram)
+    try:
+        settings = Settings(metrics_histogram_buckets="test_layout_seconds=exp:0.001:10:4")
+        metrics.configure_histograms(settings)
+        assert histogram.buckets == pytest.approx((0.001, 0.01, 0.1, 1.0))
+        histogram.observe(0.05, ("/a",))
+        histogram.observe(42.0, ("/a",))
+        text = histogram.render(histogram.collect())
+        assert 'python_ai_mother_test_layout_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'python_ai_mother_test_layout_seconds_bucket{route="/a",le="+Inf"} 2' in text
+
+        metrics.configure_histograms(Settings(metrics_histogram_mode="sparse", metrics_sparse_max_buckets=8))
+        assert histogram.sparse is True and histogram.collect() == {}
+        for exponent in range(-6, 4):
+            histogram.observe(10.0**exponent, ("/b",))
+        schema, zero_count, total, counts = histogram.collect()[("/b",)]
+        assert len(counts) <= 8 and schema < 3 and zero_count == 0
+        assert total == pytest.approx(sum(10.0**exponent for exponent in range(-6, 4)))
+        text = histogram.render(histogram.collect())
+        assert 'python_ai_mother_test_layout_seconds_count{route="/b"} 10' in text
+
+        merged: dict = {}
+        histogram.merge_into(merged, [(("/b",), [3, 1, 0.5, {"-8": 2}]), (("/b",), [schema, 0, 1.0, counts])])
+        assert merged[("/b",)][0] == schema and merged[("/b",)][1] == 1
+        assert sum(merged[("/b",)][3].values()) == 12
+
+        with pytest.raises(BusinessException):
+            metrics.parse_histogram_layouts("not_a_histogram=1,2")
+    finally:
+        metrics.configure_histograms(Settings())
+
+
+def test_m12_tracing_exports_otlp_spans_with_w3c_context(tmp_path: Path) -> None:
+    assert parse_traceparent("00-" + "0" * 32 + "-" + "1" * 16 + "-01") is None
+    assert parse_traceparent("garbage") is None
+    trace_id, parent_span_id = uuid4().hex, uuid4().hex[:16]
+    spans_path = tmp_path / "spans.jsonl"
+    configure_tracing("file", str(spans_path), 1.0, "test-service", "0.0.0")
+    try:
+        with TestClient(app) as client:
+            _register_and_login(client, account=f"m12_trace_{uuid4().hex[:8]}", password="Pass12345")
+            resp = client.get("/api/user/get/login", headers={"traceparent": f"00-{trace_id}-{parent_span_id}-01"})
+            assert resp.headers["X-Trace-Id"] == trace_id
+    finally:
+        shutdown_tracing()
+
+    spans = {}
+    for line in spans_path.read_text(encoding="utf-8").splitlines():
+        for resource_spans in json.loads(line)["resourceSpans"]:
+            for span in resource_spans["scopeSpans"][0]["spans"]:
+                if span["traceId"] == trace_id:
+                    spans[span["name"]] = span
+    server = spans["GET /api/user/get/login"]
+    assert server["parentSpanId"] == parent_span_id and server["kind"] == 2
+    assert spans["auth.login_user"]["parentSpanId"] == server["spanId"]
+    db_spans = [span for name, span in spans.items() if name.startswith("db ")]
+    assert db_spans and all(span["kind"] == 3 for span in db_spans)
+    assert int(server["endTimeUnixNano"]) >= int(server["startTimeUnixNano"])
+
+
+def _promote_to_admin_and_login(client: TestClient, account: str) -> None:
+    with sqlite3.connect(_sqlite_db_path()) as conn:
+        conn.execute("UPDATE user SET user_role = 'admin' WHERE user_account = ?", (account,))
+        conn.commit()
+    _register_and_login(client, account=account, password="Pass12345")
+
+
+def test_m12_admin_profile_returns_collapsed_stacks(tmp_path: Path) -> None:
+    account = f"m12_prof_{_unique_suffix()}"
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=account, password="Pass12345")
+        denied = client.get("/api/admin/profile", params={"seconds": 0.1})
+        assert denied.json()["code"] == int(ErrorCode.NO_AUTH_ERROR)
+
+        _promote_to_admin_and_login(client, account)
+        resp = client.get("/api/admin/profile", params={"seconds": 0.3, "intervalMs": 5})
+        assert resp.status_code == 200
+        assert int(resp.headers["X-Profile-Samples"]) > 0
+        lines = resp.text.splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any(";task:" in line for line in lines) and any(line.startswith("MainThread;") for line in lines)
+        assert client.get("/api/admin/profile", params={"seconds": 600}).json()["code"] == int(ErrorCode.PARAMS_ERROR)
+
+    profiler = ContinuousProfiler(str(tmp_path), 0.01, 60, max_files=2)
+    profiler.directory.mkdir(parents=True, exist_ok=True)
+    for _ in range(3):
+        profiler.sample()
+        profiler.rotate()
+        time.sleep(0.002)
+    files = sorted(tmp_path.glob(f"profile-{os.getpid()}-*.collapsed"))
+    assert len(files) == 2
+    assert "threading:Thread.run" in files[-1].read_text(encoding="utf-8")
+
+
+def test_m12_generation_stream_buffers_count_every_copy() -> None:
+    settings = Settings(**get_settings().model_dump())
+    facade = AiCodeGeneratorFacade(settings)
+    seen_usage: list[tuple[int, int]] = []
+
+    async def _fake_generate_stream(**_kwargs: object):
+        yield "```html\n<h1>中文</h1>"
+        # Both the facade and the endpoint hold the first chunk by now.
+        seen_usage.append(StreamBuffer.usage())
+        yield "\n```"
+
+    facade.ai_service.generate_stream = _fake_generate_stream
+    with TestClient(app) as client:
+        app.state.resources.redis_client = FakeRedis()
+        _register_and_login(client, account=f"m12_buf_{_unique_suffix()}", password="Pass12345")
+        app_id = _create_app(client, prompt="m12 stream buffers")
+        app.dependency_overrides[get_ai_codegen_facade] = lambda: facade
+        try:
+            with client.stream("GET", "/api/app/chat/gen/code", params={"appId": app_id, "message": "hi"}) as resp:
+                assert "event: done" in "".join(resp.iter_text())
+        finally:
+            app.dependency_overrides.pop(get_ai_codegen_facade, None)
+    chunk_bytes = len("```html\n<h1>中文</h1>".encode())
+    assert seen_usage == [(2, 2 * chunk_bytes)]
+    assert StreamBuffer.usage() == (0, 0)
+
+
+def test_m12_admin_memory_report_and_rss_gauge() -> None:
+    account = f"m12_mem_{_unique_suffix()}"
+    with StreamBuffer() as buffer:
+        buffer.append("x" * 100)
+        buffer.append("y" * 25 + "中")
+        assert StreamBuffer.usage() == (1, 128)
+        assert buffer.text().startswith("x")
+    assert StreamBuffer.usage() == (0, 0) and buffer.text() == ""
+
+    configure_tracemalloc(5)
+    try:
+        with TestClient(app) as client:
+            app.state.resources.redis_client = FakeRedis()
+            _register_and_login(client, account=account, password="Pass12345")
+            assert client.get("/api/admin/memory").json()["code"] == int(ErrorCode.NO_AUTH_ERROR)
+            _promote_to_admin_and_login(client, account)
+
+            with StreamBuffer() as buffer:
+                buffer.append("z" * 64)
+                report = client.get("/api/admin/memory", params={"top": 5, "groupBy": "traceback"}).json()
+                metrics_text = client.get("/metrics").text
+            assert report["code"] == int(ErrorCode.SUCCESS)
+            data = report["data"]
+            assert data["streamBuffers"] == {"inFlight": 1, "sizeBytes": 64}
+            assert data["tracemalloc"]["tracing"] is True
+            assert 0 < len(data["tracemalloc"]["top"]) <= 5
+            assert data["tracemalloc"]["top"][0]["location"] == data["tracemalloc"]["top"][0]["traceback"][-1]
+            assert any(cache["cache"] == "app_page" for cache in data["caches"])
+            assert "python_ai_mother_stream_buffer_bytes 64" in metrics_text
+            if data["rssBytes"] is not None:
+                assert data["rssBytes"] > 0
+                assert "python_ai_mother_process_resident_memory_bytes " in metrics_text
+
+            invalid = client.get("/api/admin/memory", params={"groupBy": "module"}).json()
+            assert invalid["code"] == int(ErrorCode.PARAMS_ERROR)
+    finally:
+        tracemalloc.stop()
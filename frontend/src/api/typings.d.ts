@@ -30,6 +30,10 @@ declare namespace API {
     deployKey?: string
     priority?: number
     userId?: number
+    pageMode?: 'offset' | 'cursor'
+    cursor?: string
+    searchText?: string
+    countMode?: 'exact' | 'cached' | 'estimated' | 'none'
   }
 
   type AppUpdateRequest = {
@@ -134,6 +138,7 @@ declare namespace API {
     appId?: number
     userId?: number
     lastCreateTime?: string
+    countMode?: 'exact' | 'cached' | 'estimated' | 'none'
   }
 
   type chatToGenCodeParams = {
@@ -174,6 +179,7 @@ declare namespace API {
     appId: number
     pageSize?: number
     lastCreateTime?: string
+    countMode?: 'exact' | 'cached' | 'estimated' | 'none'
   }
 
   type listAppVersionsParams = {
@@ -198,6 +204,7 @@ declare namespace API {
     totalPage?: number
     totalRow?: number
     optimizeCountQuery?: boolean
+    nextCursor?: string | null
   }
 
   type PageChatHistory = {
@@ -261,6 +268,7 @@ declare namespace API {
     userAccount?: string
     userProfile?: string
     userRole?: string
+    countMode?: 'exact' | 'cached' | 'estimated' | 'none'
   }
 
   type UserRegisterRequest = {